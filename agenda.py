@@ -1,194 +1,1133 @@
 import os
+import sys
 import json
+import sqlite3
+import time
+import atexit
+import heapq
+import locale
+from bisect import bisect_left, insort
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from backend.app.datas import formatar_data, formatar_data_hora, inicio_do_dia, janela, ler_data, ler_data_hora
+from backend.app.intervalos import IndiceIntervalos, fim_efetivo, livres, unir
+from backend.app.leitura import ler_arquivo
+from backend.app.recorrencia import ocorrencias, contem, validar, validar_periodo
+
+# Registros em memória: dataclasses com __slots__ em vez de dicts. Textos repetidos
+# (datas, horas, tipos) são internados e cada combinação de participantes é uma tupla
+# única compartilhada. A conversão de e para dict só acontece nos arquivos JSON.
+_PARTICIPANTES = {}
+
+def _participantes(nomes):
+    if not nomes:
+        return ()
+    chave = tuple(nomes)
+    compartilhada = _PARTICIPANTES.get(chave)
+    if compartilhada is None:
+        compartilhada = _PARTICIPANTES[chave] = tuple(map(sys.intern, chave))
+    return compartilhada
+
+def _internar(texto):
+    return sys.intern(texto) if texto else texto
+
+@dataclass(slots=True)
+class Contato:
+    id: int
+    nome: str
+    telefone: str
+    email: str = ''
+    endereco: str = ''
+    data_criacao: str = ''
+
+    @classmethod
+    def de_dict(cls, dados):
+        return cls(dados['id'], dados['nome'], dados['telefone'], dados.get('email', ''),
+                   dados.get('endereco', ''), _internar(dados.get('data_criacao', '')))
+
+    def para_dict(self):
+        return {'id': self.id, 'nome': self.nome, 'telefone': self.telefone, 'email': self.email,
+                'endereco': self.endereco, 'data_criacao': self.data_criacao}
+
+@dataclass(slots=True)
+class Recorrencia:
+    tipo: str
+    ate_data: str
+    dias_semana: Optional[Tuple[int, ...]] = None
+    excecoes: List[str] = field(default_factory=list)
+    grupo_id: Optional[str] = None
+
+    @classmethod
+    def de_dict(cls, dados):
+        dias_semana = dados.get('dias_semana')
+        return cls(sys.intern(dados['tipo']), _internar(dados['ate_data']),
+                   tuple(dias_semana) if dias_semana is not None else None,
+                   list(dados.get('excecoes') or []), dados.get('grupo_id'))
+
+    def para_dict(self):
+        return {'tipo': self.tipo, 'ate_data': self.ate_data,
+                'dias_semana': list(self.dias_semana) if self.dias_semana is not None else None,
+                'excecoes': list(self.excecoes), 'grupo_id': self.grupo_id}
+
+@dataclass(slots=True)
+class Compromisso:
+    id: int
+    titulo: str
+    data: str
+    hora_inicio: str
+    hora_fim: Optional[str] = None
+    descricao: str = ''
+    participantes: Tuple[str, ...] = ()
+    data_criacao: str = ''
+    recorrencia: Optional[Recorrencia] = None
+
+    @classmethod
+    def de_dict(cls, dados):
+        recorrencia = dados.get('recorrencia')
+        return cls(dados['id'], dados['titulo'], _internar(dados['data']), _internar(dados['hora_inicio']),
+                   _internar(dados.get('hora_fim')), dados.get('descricao', ''),
+                   _participantes(dados.get('participantes')), _internar(dados.get('data_criacao', '')),
+                   Recorrencia.de_dict(recorrencia) if recorrencia else None)
+
+    def para_dict(self):
+        dados = {'id': self.id, 'titulo': self.titulo, 'data': self.data, 'hora_inicio': self.hora_inicio,
+                 'hora_fim': self.hora_fim, 'descricao': self.descricao,
+                 'participantes': list(self.participantes), 'data_criacao': self.data_criacao}
+        # Compromissos avulsos não têm a chave nos arquivos
+        if self.recorrencia is not None:
+            dados['recorrencia'] = self.recorrencia.para_dict()
+        return dados
+
+    def ocorrencia(self, data):
+        # Ocorrência de uma série: compartilha título, participantes e a regra com o compromisso base
+        return Compromisso(self.id, self.titulo, data, self.hora_inicio, self.hora_fim, self.descricao,
+                           self.participantes, self.data_criacao, self.recorrencia)
+
+    @property
+    def grupo_id(self):
+        return self.recorrencia.grupo_id if self.recorrencia is not None else None
+
+class IndiceBusca:
+    # Índice invertido de trigramas dos campos de texto dos registros, montado só na
+    # primeira busca que precisa dele. A busca por substring consulta só os registros
+    # que contêm todos os trigramas do termo; termos mais curtos percorrem a coleção.
+    def __init__(self, *campos):
+        self.campos = campos
+        self._origem = ()
+        self._montado = False
+        self._postagens = defaultdict(set)
+        # Textos indexados de cada registro, para remover as postagens mesmo depois que o
+        # registro foi alterado no lugar; os trigramas são recalculados a partir deles
+        self._textos = {}
+        self._registros = {}
+
+    def _textos_de(self, registro):
+        return tuple((getattr(registro, campo) or '').lower() for campo in self.campos)
+
+    @staticmethod
+    def _trigramas(textos):
+        return {texto[i:i + 3] for texto in textos for i in range(len(texto) - 2)}
+
+    def adicionar(self, registro):
+        # Antes da montagem não há o que manter: a coleção de origem já reflete a alteração
+        if not self._montado:
+            return
+        chave = id(registro)
+        textos = self._textos_de(registro)
+        for grama in self._trigramas(textos):
+            self._postagens[grama].add(chave)
+        self._textos[chave] = textos
+        self._registros[chave] = registro
+
+    def remover(self, registro):
+        if not self._montado:
+            return
+        chave = id(registro)
+        for grama in self._trigramas(self._textos.pop(chave, ())):
+            self._postagens[grama].discard(chave)
+            if not self._postagens[grama]:
+                del self._postagens[grama]
+        self._registros.pop(chave, None)
+
+    def atualizar(self, registro):
+        self.remover(registro)
+        self.adicionar(registro)
+
+    def reconstruir(self, registros):
+        # registros é a coleção viva do armazenamento; o índice é montado a partir dela sob demanda
+        self._origem = registros
+        self._montado = False
+        self._postagens.clear()
+        self._textos.clear()
+        self._registros.clear()
+
+    def _montar(self):
+        self._montado = True
+        for registro in self._origem:
+            self.adicionar(registro)
+
+    def candidatos(self, termo):
+        # Superconjunto dos registros que contêm o termo; o chamador confirma a correspondência
+        termo = termo.lower()
+        if len(termo) < 3:
+            return [registro for registro in self._origem
+                    if any(termo in texto for texto in self._textos_de(registro))]
+        if not self._montado:
+            self._montar()
+        trigramas = sorted(self._trigramas((termo,)), key=lambda g: len(self._postagens.get(g, ())))
+        chaves = set(self._postagens.get(trigramas[0], ()))
+        for grama in trigramas[1:]:
+            if not chaves:
+                break
+            chaves &= self._postagens.get(grama, set())
+        return [self._registros[chave] for chave in chaves]
+
+class ListaOrdenada:
+    # Lista ordenada em blocos (no estilo do sortedcontainers): inserção e remoção
+    # custam O(log n) + O(CARGA), sem deslocar a lista inteira a cada alteração.
+    CARGA = 512
 
-class Agenda:
     def __init__(self):
-        self.contatos = []
-        self.compromissos = []
-        self.arquivo_contatos = 'contatos.json'
-        self.arquivo_compromissos = 'compromissos.json'
+        self._blocos = []
+        self._maximos = []
+        self._tamanho = 0
+
+    def __len__(self):
+        return self._tamanho
+
+    def __iter__(self):
+        for bloco in self._blocos:
+            yield from bloco
+
+    def adicionar(self, valor):
+        self._tamanho += 1
+        if not self._blocos:
+            self._blocos.append([valor])
+            self._maximos.append(valor)
+            return
+        i = bisect_left(self._maximos, valor)
+        if i == len(self._blocos):
+            i -= 1
+            self._blocos[i].append(valor)
+            self._maximos[i] = valor
+        else:
+            insort(self._blocos[i], valor)
+        bloco = self._blocos[i]
+        if len(bloco) > 2 * self.CARGA:
+            self._blocos[i:i + 1] = [bloco[:self.CARGA], bloco[self.CARGA:]]
+            self._maximos[i:i + 1] = [bloco[self.CARGA - 1], bloco[-1]]
+
+    def estender(self, valores):
+        # Inserção em lote: ordena só os novos e faz uma única intercalação com os existentes
+        novos = sorted(valores)
+        if not novos:
+            return
+        todos = list(heapq.merge(self, novos)) if self._tamanho else novos
+        self._blocos = [todos[i:i + self.CARGA] for i in range(0, len(todos), self.CARGA)]
+        self._maximos = [bloco[-1] for bloco in self._blocos]
+        self._tamanho = len(todos)
+
+    def remover(self, valor):
+        i = bisect_left(self._maximos, valor)
+        bloco = self._blocos[i]
+        del bloco[bisect_left(bloco, valor)]
+        self._tamanho -= 1
+        if bloco:
+            self._maximos[i] = bloco[-1]
+        else:
+            del self._blocos[i]
+            del self._maximos[i]
+
+    def intervalo(self, de=None, ate=None):
+        # Valores v com de <= v < ate, em ordem
+        i = bisect_left(self._maximos, de) if de is not None else 0
+        for bloco in self._blocos[i:]:
+            j = bisect_left(bloco, de) if de is not None else 0
+            de = None
+            for valor in bloco[j:]:
+                if ate is not None and valor >= ate:
+                    return
+                yield valor
+
+class Registros:
+    # Coleção de registros indexada por id. Com `chave_data`, mantém também um índice
+    # ordenado por data de início e um índice das séries por grupo_id.
+    def __init__(self, registros=(), chave_data=None):
+        self._por_id = {}
+        self._por_grupo = defaultdict(set)
+        self._grupo_de = {}
+        self._chaves = {}
+        self._por_data = ListaOrdenada()
+        self._pendentes = None
+        self._chave_data = chave_data
+        self.ultimo_id = 0
+        with self.em_lote():
+            for registro in registros:
+                self.adicionar(registro)
+
+    def __len__(self):
+        return len(self._por_id)
+
+    def __iter__(self):
+        # Compromissos saem em ordem de início; contatos, na ordem de inserção
+        if self._chave_data is None:
+            return iter(self._por_id.values())
+        self._ordenar_pendentes()
+        return (self._por_id[id] for _, id in self._por_data)
+
+    @contextmanager
+    def em_lote(self):
+        # Adia a ordenação do índice por data para uma única intercalação no fim do lote
+        if self._pendentes is not None:
+            yield
+            return
+        self._pendentes = []
+        try:
+            yield
+        finally:
+            self._ordenar_pendentes()
+            self._pendentes = None
+
+    def _ordenar_pendentes(self):
+        if self._pendentes:
+            self._por_data.estender(self._pendentes)
+            self._pendentes.clear()
+
+    def obter(self, id):
+        return self._por_id.get(id)
+
+    def proximo_id(self):
+        return self.ultimo_id + 1
+
+    def grupo(self, grupo_id):
+        return [self._por_id[id] for id in self._por_grupo.get(grupo_id, ())]
+
+    def series(self):
+        return [self._por_id[id] for id in self._grupo_de]
+
+    def inicio(self, registro):
+        # Início já convertido para datetime, guardado ao indexar o registro
+        return self._chaves[registro.id][0]
+
+    def intervalo(self, de=None, ate=None):
+        # Registros com início em [de, ate)
+        self._ordenar_pendentes()
+        return (self._por_id[id] for _, id in self._por_data.intervalo(
+            (de,) if de is not None else None, (ate,) if ate is not None else None))
+
+    def adicionar(self, registro):
+        id = registro.id
+        self._por_id[id] = registro
+        self.ultimo_id = max(self.ultimo_id, id)
+        if self._chave_data is not None:
+            self._indexar(registro)
+
+    def remover(self, registro):
+        id = registro.id
+        del self._por_id[id]
+        if self._chave_data is not None:
+            self._desindexar(id)
+
+    def atualizar(self, registro):
+        # Reindexa um registro alterado no lugar (data, hora ou recorrência)
+        if self._chave_data is not None:
+            self._desindexar(registro.id)
+            self._indexar(registro)
+
+    def _indexar(self, registro):
+        id = registro.id
+        chave = (self._chave_data(registro), id)
+        self._chaves[id] = chave
+        if self._pendentes is not None:
+            self._pendentes.append(chave)
+        else:
+            self._por_data.adicionar(chave)
+        grupo_id = registro.grupo_id
+        if grupo_id:
+            self._por_grupo[grupo_id].add(id)
+            self._grupo_de[id] = grupo_id
+
+    def _desindexar(self, id):
+        self._ordenar_pendentes()
+        self._por_data.remover(self._chaves.pop(id))
+        grupo_id = self._grupo_de.pop(id, None)
+        if grupo_id is not None:
+            self._por_grupo[grupo_id].discard(id)
+            if not self._por_grupo[grupo_id]:
+                del self._por_grupo[grupo_id]
+
+class Jornal:
+    # Log append-only (JSON lines) das alterações desde o último snapshot. Cada registro
+    # chega ao sistema operacional na hora; o fsync é feito em lotes de `lote` registros
+    # ou a cada `intervalo` segundos, e sempre ao fechar.
+    def __init__(self, caminho, lote=64, intervalo=1.0):
+        self.caminho = caminho
+        self.lote = lote
+        self.intervalo = intervalo
+        self.entradas = 0
+        self._arquivo = None
+        self._sem_sync = 0
+        self._ultimo_sync = time.monotonic()
+        self._adiado = 0
+
+    def ler(self):
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, 'rb+') as arquivo:
+            valido = 0
+            for linha in arquivo:
+                if not linha.endswith(b'\n'):
+                    # Última linha truncada por uma queda no meio da escrita; é descartada
+                    # para que os próximos registros não sejam anexados a ela
+                    arquivo.truncate(valido)
+                    break
+                valido += len(linha)
+                self.entradas += 1
+                entrada = self._decodificar(linha)
+                if entrada is not None:
+                    # Uma linha completa ilegível é pulada; as seguintes continuam valendo
+                    yield entrada
+
+    @staticmethod
+    def _decodificar(linha):
+        # O jornal é UTF-8; versões antigas gravavam na codificação do sistema
+        for codificacao in ('utf-8', locale.getpreferredencoding(False)):
+            try:
+                return json.loads(linha.decode(codificacao))
+            except ValueError:
+                continue
+        return None
+
+    def registrar(self, entrada):
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        self._arquivo.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+        self._arquivo.flush()
+        self.entradas += 1
+        self._sem_sync += 1
+        if not self._adiado and (self._sem_sync >= self.lote
+                                 or time.monotonic() - self._ultimo_sync >= self.intervalo):
+            self.sincronizar()
+
+    def sincronizar(self):
+        if self._arquivo is not None and self._sem_sync:
+            os.fsync(self._arquivo.fileno())
+        self._sem_sync = 0
+        self._ultimo_sync = time.monotonic()
+
+    @contextmanager
+    def em_lote(self):
+        # Um único fsync no fim do lote
+        self._adiado += 1
+        try:
+            yield
+        finally:
+            self._adiado -= 1
+            if not self._adiado:
+                self.sincronizar()
+
+    def truncar(self):
+        # Chamado depois que o snapshot foi gravado; se cair antes disso, o replay das
+        # entradas sobre o snapshot novo é inofensivo, pois cada entrada é idempotente.
+        self.fechar()
+        open(self.caminho, 'w', encoding='utf-8').close()
+        self.entradas = 0
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self.sincronizar()
+            self._arquivo.close()
+            self._arquivo = None
+
+def _gravar_atomico(caminho, dados):
+    # Grava em um arquivo temporário e troca de uma vez: uma queda nunca deixa o arquivo pela metade
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w') as arquivo:
+        json.dump(dados, arquivo, indent=4)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+
+def _inicio(compromisso):
+    return ler_data_hora(compromisso.data, compromisso.hora_inicio)
+
+def _inicio_dict(compromisso):
+    return ler_data_hora(compromisso['data'], compromisso['hora_inicio'])
+
+class ArmazenamentoJSON:
+    # Snapshots em JSON (contatos.json e compromissos.json) mais o jornal das alterações,
+    # com todos os registros e índices em memória
+    def __init__(self, arquivo_contatos='contatos.json', arquivo_compromissos='compromissos.json',
+                 arquivo_jornal='agenda.jornal'):
+        self.contatos = Registros()
+        self.compromissos = Registros(chave_data=_inicio)
+        self.arquivo_contatos = arquivo_contatos
+        self.arquivo_compromissos = arquivo_compromissos
+        self.busca = {'contatos': IndiceBusca('nome', 'telefone'),
+                      'compromissos': IndiceBusca('titulo', 'descricao')}
+        self.jornal = Jornal(arquivo_jornal)
         self.carregar_dados()
 
     def carregar_dados(self):
+        # Cada objeto lido vira registro na hora, sem manter a agenda inteira também como dicts
+        contatos = []
+        compromissos = []
+        alterados = set()
         if os.path.exists(self.arquivo_contatos):
-            with open(self.arquivo_contatos, 'r') as arquivo:
-                self.contatos = json.load(arquivo)
+            contatos = [Contato.de_dict(r) for r in ler_arquivo(self.arquivo_contatos)]
+            if self._renumerar_duplicados(contatos):
+                alterados.add('contatos')
         if os.path.exists(self.arquivo_compromissos):
-            with open(self.arquivo_compromissos, 'r') as arquivo:
-                self.compromissos = json.load(arquivo)
+            compromissos = self._ler_compromissos()
+            if compromissos is None:
+                legados = self._converter_series_legadas(list(ler_arquivo(self.arquivo_compromissos)))
+                compromissos = [Compromisso.de_dict(r) for r in legados]
+                alterados.add('compromissos')
+            if self._renumerar_duplicados(compromissos):
+                alterados.add('compromissos')
+
+        # Reaplica sobre o snapshot as alterações registradas no jornal depois dele
+        colecoes = {
+            'contatos': {r.id: r for r in contatos},
+            'compromissos': {r.id: r for r in compromissos},
+        }
+        classes = {'contatos': Contato, 'compromissos': Compromisso}
+        for entrada in self.jornal.ler():
+            registros = colecoes[entrada['colecao']]
+            if entrada['acao'] == 'gravar':
+                registros[entrada['registro']['id']] = classes[entrada['colecao']].de_dict(entrada['registro'])
+            else:
+                registros.pop(entrada['id'], None)
+
+        self.contatos = Registros(colecoes['contatos'].values())
+        self.compromissos = Registros(colecoes['compromissos'].values(), chave_data=_inicio)
+        self.busca['contatos'].reconstruir(self.contatos)
+        self.busca['compromissos'].reconstruir(self.compromissos)
+        if alterados or self.jornal.entradas > self._limite_jornal():
+            self.compactar()
+
+    def _ler_compromissos(self):
+        # None se o arquivo ainda tem séries gravadas uma linha por ocorrência
+        compromissos = []
+        for dados in ler_arquivo(self.arquivo_compromissos):
+            recorrencia = dados.get('recorrencia')
+            if recorrencia and 'ate_data' not in recorrencia:
+                return None
+            compromissos.append(Compromisso.de_dict(dados))
+        return compromissos
+
+    def _renumerar_duplicados(self, registros):
+        # Versões antigas geravam id = len + 1 e repetiam ids depois de exclusões
+        vistos = set()
+        ultimo_id = max((r.id for r in registros), default=0)
+        renumerados = False
+        for registro in registros:
+            if registro.id in vistos:
+                ultimo_id += 1
+                registro.id = ultimo_id
+                renumerados = True
+            vistos.add(registro.id)
+        return renumerados
+
+    def _converter_series_legadas(self, compromissos):
+        # Arquivos antigos gravavam uma linha por ocorrência; agrupa cada série em uma única regra.
+        # Retorna a nova lista, ou None se não havia nada a converter.
+        grupos = {}
+        for comp in compromissos:
+            recorrencia = comp.get('recorrencia')
+            if recorrencia and 'ate_data' not in recorrencia:
+                grupos.setdefault(recorrencia['grupo_id'], []).append(comp)
+        if not grupos:
+            return None
+
+        removidos = set()
+        for membros in grupos.values():
+            membros.sort(key=_inicio_dict)
+            base = membros[0]
+            tipo = base['recorrencia']['tipo']
+            datas = {ler_data(m['data']): m for m in membros}
+            dias_semana = sorted({d.weekday() for d in list(datas)[1:]}) if tipo == 'dias_especificos' else None
+            ate_data = max(datas)
+            inicio = _inicio_dict(base)
+            esperadas = {d.date() for d in ocorrencias(inicio, tipo, ate_data, dias_semana)}
+
+            base['recorrencia'] = {
+                'tipo': tipo,
+                'ate_data': formatar_data(ate_data),
+                'dias_semana': dias_semana,
+                'excecoes': [formatar_data(d) for d in sorted(esperadas - datas.keys())],
+                'grupo_id': base['recorrencia']['grupo_id']
+            }
+            for data, comp in datas.items():
+                if comp is base:
+                    continue
+                if data in esperadas:
+                    removidos.add(id(comp))
+                else:
+                    # Ocorrência fora da regra continua como compromisso avulso
+                    comp.pop('recorrencia', None)
+
+        return [comp for comp in compromissos if id(comp) not in removidos]
+
+    @contextmanager
+    def em_lote(self):
+        # Para importações: ordena os índices e faz o fsync do jornal uma única vez, no fim do lote
+        with self.contatos.em_lote(), self.compromissos.em_lote(), self.jornal.em_lote():
+            yield
+
+    def _limite_jornal(self):
+        # Compacta quando o jornal passa do tamanho da agenda: o custo do snapshot fica
+        # amortizado em O(1) por alteração
+        return max(1000, len(self.contatos) + len(self.compromissos))
+
+    def _registrar(self, colecao, registro=None, excluido=None):
+        if excluido is not None:
+            self.jornal.registrar({'colecao': colecao, 'acao': 'excluir', 'id': excluido})
+        else:
+            self.jornal.registrar({'colecao': colecao, 'acao': 'gravar', 'registro': registro.para_dict()})
+        if self.jornal.entradas > self._limite_jornal():
+            self.compactar()
+
+    def compactar(self):
+        # Grava os snapshots atomicamente e descarta o jornal já incorporado a eles
+        self.salvar_contatos()
+        self.salvar_compromissos()
+        self.jornal.truncar()
 
     def salvar_contatos(self):
-        with open(self.arquivo_contatos, 'w') as arquivo:
-            json.dump(self.contatos, arquivo, indent=4)
+        _gravar_atomico(self.arquivo_contatos, [contato.para_dict() for contato in self.contatos])
 
     def salvar_compromissos(self):
-        with open(self.arquivo_compromissos, 'w') as arquivo:
-            json.dump(self.compromissos, arquivo, indent=4)
+        _gravar_atomico(self.arquivo_compromissos, [compromisso.para_dict() for compromisso in self.compromissos])
+
+    def fechar(self):
+        self.jornal.fechar()
+
+    def _registros(self, colecao):
+        return self.contatos if colecao == 'contatos' else self.compromissos
+
+    def vazio(self, colecao):
+        return not self._registros(colecao)
+
+    def obter(self, colecao, id):
+        return self._registros(colecao).obter(id)
+
+    def proximo_id(self, colecao):
+        return self._registros(colecao).proximo_id()
+
+    def gravar(self, colecao, registro):
+        # Registro novo ou alterado no lugar
+        registros = self._registros(colecao)
+        atual = registros.obter(registro.id)
+        if atual is registro:
+            registros.atualizar(registro)
+            self.busca[colecao].atualizar(registro)
+        else:
+            if atual is not None:
+                registros.remover(atual)
+                self.busca[colecao].remover(atual)
+            registros.adicionar(registro)
+            self.busca[colecao].adicionar(registro)
+        self._registrar(colecao, registro)
+
+    def excluir(self, colecao, id):
+        registro = self._registros(colecao).obter(id)
+        self._registros(colecao).remover(registro)
+        self.busca[colecao].remover(registro)
+        self._registrar(colecao, excluido=id)
+
+    def candidatos(self, colecao, termo):
+        return self.busca[colecao].candidatos(termo)
+
+    def listar_contatos(self):
+        return list(self.contatos)
+
+    def inicio(self, compromisso):
+        return self.compromissos.inicio(compromisso)
+
+    def grupo_existe(self, grupo_id):
+        return bool(self.compromissos.grupo(grupo_id))
+
+    def series(self, de=None, ate=None):
+        # Todas as séries; quem expande recorta as ocorrências na janela
+        return self.compromissos.series()
+
+    def avulsos(self, de=None, ate=None):
+        # Compromissos não recorrentes com início em [de, ate), em ordem de início
+        return (compromisso for compromisso in self.compromissos.intervalo(de, ate)
+                if compromisso.recorrencia is None)
+
+ESQUEMA_SQLITE = [
+    """CREATE TABLE contatos (
+        id INTEGER PRIMARY KEY,
+        nome TEXT NOT NULL,
+        telefone TEXT NOT NULL,
+        email TEXT,
+        endereco TEXT,
+        data_criacao TEXT
+    )""",
+    # inicio (YYYY-MM-DD HH:MM) e ate_data (YYYY-MM-DD) são derivados de data, hora_inicio e
+    # recorrencia, em texto ISO para que a ordem do texto seja a ordem cronológica
+    """CREATE TABLE compromissos (
+        id INTEGER PRIMARY KEY,
+        titulo TEXT NOT NULL,
+        data TEXT NOT NULL,
+        hora_inicio TEXT NOT NULL,
+        hora_fim TEXT,
+        descricao TEXT,
+        participantes TEXT,
+        data_criacao TEXT,
+        recorrencia TEXT,
+        inicio TEXT NOT NULL,
+        grupo_id TEXT,
+        ate_data TEXT
+    )""",
+    "CREATE INDEX compromissos_avulsos_inicio ON compromissos (inicio, id) WHERE grupo_id IS NULL",
+    "CREATE INDEX compromissos_series ON compromissos (ate_data, inicio) WHERE grupo_id IS NOT NULL",
+    "CREATE INDEX compromissos_grupo ON compromissos (grupo_id) WHERE grupo_id IS NOT NULL",
+    # Busca por substring: índices de trigramas (FTS5) sincronizados por triggers
+    "CREATE VIRTUAL TABLE contatos_busca USING fts5("
+    "nome, telefone, content='contatos', content_rowid='id', tokenize='trigram')",
+    "CREATE VIRTUAL TABLE compromissos_busca USING fts5("
+    "titulo, descricao, content='compromissos', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER contatos_ai AFTER INSERT ON contatos BEGIN "
+    "INSERT INTO contatos_busca (rowid, nome, telefone) VALUES (new.id, new.nome, new.telefone); END",
+    "CREATE TRIGGER contatos_ad AFTER DELETE ON contatos BEGIN "
+    "INSERT INTO contatos_busca (contatos_busca, rowid, nome, telefone) "
+    "VALUES ('delete', old.id, old.nome, old.telefone); END",
+    "CREATE TRIGGER contatos_au AFTER UPDATE ON contatos BEGIN "
+    "INSERT INTO contatos_busca (contatos_busca, rowid, nome, telefone) "
+    "VALUES ('delete', old.id, old.nome, old.telefone); "
+    "INSERT INTO contatos_busca (rowid, nome, telefone) VALUES (new.id, new.nome, new.telefone); END",
+    "CREATE TRIGGER compromissos_ai AFTER INSERT ON compromissos BEGIN "
+    "INSERT INTO compromissos_busca (rowid, titulo, descricao) VALUES (new.id, new.titulo, new.descricao); END",
+    "CREATE TRIGGER compromissos_ad AFTER DELETE ON compromissos BEGIN "
+    "INSERT INTO compromissos_busca (compromissos_busca, rowid, titulo, descricao) "
+    "VALUES ('delete', old.id, old.titulo, old.descricao); END",
+    "CREATE TRIGGER compromissos_au AFTER UPDATE ON compromissos BEGIN "
+    "INSERT INTO compromissos_busca (compromissos_busca, rowid, titulo, descricao) "
+    "VALUES ('delete', old.id, old.titulo, old.descricao); "
+    "INSERT INTO compromissos_busca (rowid, titulo, descricao) VALUES (new.id, new.titulo, new.descricao); END",
+]
+
+COLUNAS_CONTATO = ('id', 'nome', 'telefone', 'email', 'endereco', 'data_criacao')
+COLUNAS_COMPROMISSO = ('id', 'titulo', 'data', 'hora_inicio', 'hora_fim', 'descricao', 'participantes',
+                       'data_criacao', 'recorrencia')
+
+def _linha_compromisso(compromisso):
+    recorrencia = compromisso.recorrencia
+    return (
+        compromisso.id, compromisso.titulo, compromisso.data, compromisso.hora_inicio, compromisso.hora_fim,
+        compromisso.descricao, json.dumps(list(compromisso.participantes), ensure_ascii=False),
+        compromisso.data_criacao,
+        json.dumps(recorrencia.para_dict(), ensure_ascii=False) if recorrencia else None,
+        _inicio(compromisso).isoformat(' ', 'minutes'),
+        recorrencia.grupo_id if recorrencia else None,
+        ler_data(recorrencia.ate_data).isoformat() if recorrencia else None,
+    )
+
+# Participantes gravados (texto JSON) -> tupla compartilhada
+_PARTICIPANTES_JSON = {}
+
+def _compromisso(linha):
+    id, titulo, data, hora_inicio, hora_fim, descricao, participantes, data_criacao, recorrencia = linha
+    tupla = _PARTICIPANTES_JSON.get(participantes)
+    if tupla is None:
+        tupla = _PARTICIPANTES_JSON[participantes] = _participantes(json.loads(participantes) if participantes else ())
+    return Compromisso(id, titulo, _internar(data), _internar(hora_inicio), _internar(hora_fim), descricao, tupla,
+                       _internar(data_criacao), Recorrencia.de_dict(json.loads(recorrencia)) if recorrencia else None)
+
+class ArmazenamentoSQLite:
+    # Agenda em um banco SQLite (WAL, mmap): só o que é listado ou buscado é lido para a memória.
+    # Na primeira abertura, os arquivos JSON existentes são importados e renomeados para *.migrado.
+    VERSAO = 1
+
+    def __init__(self, caminho='agenda.db', arquivos_json=('contatos.json', 'compromissos.json', 'agenda.jornal')):
+        self.conexao = sqlite3.connect(caminho, isolation_level=None)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        # Com WAL, NORMAL só adia o fsync para o checkpoint: uma queda de energia pode perder
+        # as últimas transações, mas nunca corrompe o banco
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.execute("PRAGMA mmap_size=268435456")
+        self.conexao.create_function('contem', 2, lambda texto, termo: termo in (texto or '').lower(),
+                                     deterministic=True)
+        self._transacoes = 0
+        if self.conexao.execute("PRAGMA user_version").fetchone()[0] < self.VERSAO:
+            self._criar(arquivos_json)
+
+    def _criar(self, arquivos_json):
+        existentes = [arquivo for arquivo in arquivos_json if os.path.exists(arquivo)]
+        # Esquema e migração na mesma transação: se cair no meio, a próxima abertura recomeça
+        with self.em_lote():
+            for comando in ESQUEMA_SQLITE:
+                self.conexao.execute(comando)
+            if existentes:
+                origem = ArmazenamentoJSON(*arquivos_json)
+                self.conexao.executemany(
+                    f"INSERT INTO contatos ({', '.join(COLUNAS_CONTATO)}) VALUES (?, ?, ?, ?, ?, ?)",
+                    ((c.id, c.nome, c.telefone, c.email, c.endereco, c.data_criacao) for c in origem.contatos))
+                self._inserir_compromissos(origem.compromissos)
+                origem.fechar()
+            self.conexao.execute(f"PRAGMA user_version = {self.VERSAO}")
+        for arquivo in existentes:
+            os.replace(arquivo, arquivo + '.migrado')
+
+    def _inserir_compromissos(self, compromissos):
+        self.conexao.executemany(
+            f"INSERT INTO compromissos ({', '.join(COLUNAS_COMPROMISSO)}, inicio, grupo_id, ate_data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET titulo = excluded.titulo, data = excluded.data, "
+            "hora_inicio = excluded.hora_inicio, hora_fim = excluded.hora_fim, descricao = excluded.descricao, "
+            "participantes = excluded.participantes, data_criacao = excluded.data_criacao, "
+            "recorrencia = excluded.recorrencia, inicio = excluded.inicio, grupo_id = excluded.grupo_id, "
+            "ate_data = excluded.ate_data",
+            (_linha_compromisso(compromisso) for compromisso in compromissos))
+
+    @contextmanager
+    def em_lote(self):
+        # Uma única transação (e um único fsync) para todas as alterações do bloco
+        if self._transacoes:
+            self._transacoes += 1
+            try:
+                yield
+            finally:
+                self._transacoes -= 1
+            return
+        self.conexao.execute("BEGIN IMMEDIATE")
+        self._transacoes = 1
+        try:
+            yield
+        except BaseException:
+            self.conexao.execute("ROLLBACK")
+            raise
+        else:
+            self.conexao.execute("COMMIT")
+        finally:
+            self._transacoes = 0
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+            self.conexao = None
+
+    def vazio(self, colecao):
+        return self.conexao.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {colecao})").fetchone()[0] == 1
+
+    def obter(self, colecao, id):
+        if colecao == 'contatos':
+            linha = self.conexao.execute(
+                f"SELECT {', '.join(COLUNAS_CONTATO)} FROM contatos WHERE id = ?", (id,)).fetchone()
+            return Contato(*linha) if linha else None
+        linha = self.conexao.execute(
+            f"SELECT {', '.join(COLUNAS_COMPROMISSO)} FROM compromissos WHERE id = ?", (id,)).fetchone()
+        return _compromisso(linha) if linha else None
+
+    def proximo_id(self, colecao):
+        return self.conexao.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {colecao}").fetchone()[0]
+
+    def gravar(self, colecao, registro):
+        if colecao == 'compromissos':
+            self._inserir_compromissos([registro])
+            return
+        self.conexao.execute(
+            "INSERT INTO contatos (id, nome, telefone, email, endereco, data_criacao) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET nome = excluded.nome, telefone = excluded.telefone, "
+            "email = excluded.email, endereco = excluded.endereco, data_criacao = excluded.data_criacao",
+            (registro.id, registro.nome, registro.telefone, registro.email, registro.endereco,
+             registro.data_criacao))
+
+    def excluir(self, colecao, id):
+        self.conexao.execute(f"DELETE FROM {colecao} WHERE id = ?", (id,))
+
+    def candidatos(self, colecao, termo):
+        # Superconjunto dos registros que contêm o termo, como em IndiceBusca
+        campos = ('nome', 'telefone') if colecao == 'contatos' else ('titulo', 'descricao')
+        colunas = COLUNAS_CONTATO if colecao == 'contatos' else COLUNAS_COMPROMISSO
+        if len(termo) >= 3:
+            # O índice de trigramas só atende termos com 3 caracteres ou mais
+            frase = '"' + termo.replace('"', '""') + '"'
+            linhas = self.conexao.execute(
+                f"SELECT {', '.join(colunas)} FROM {colecao} WHERE id IN "
+                f"(SELECT rowid FROM {colecao}_busca WHERE {colecao}_busca MATCH ?)", (frase,))
+        else:
+            termo = termo.lower()
+            linhas = self.conexao.execute(
+                f"SELECT {', '.join(colunas)} FROM {colecao} WHERE "
+                + " OR ".join(f"contem({campo}, ?)" for campo in campos), (termo,) * len(campos))
+        if colecao == 'contatos':
+            return [Contato(*linha) for linha in linhas]
+        return [_compromisso(linha) for linha in linhas]
+
+    def listar_contatos(self):
+        linhas = self.conexao.execute(f"SELECT {', '.join(COLUNAS_CONTATO)} FROM contatos ORDER BY id")
+        return [Contato(*linha) for linha in linhas]
+
+    def inicio(self, compromisso):
+        return _inicio(compromisso)
+
+    def grupo_existe(self, grupo_id):
+        return self.conexao.execute(
+            "SELECT EXISTS (SELECT 1 FROM compromissos WHERE grupo_id = ?)", (grupo_id,)).fetchone()[0] == 1
+
+    def series(self, de=None, ate=None):
+        # Séries que podem ter ocorrências em [de, ate): começam antes de `ate` e terminam depois de `de`
+        condicoes, parametros = ["grupo_id IS NOT NULL"], []
+        if de is not None:
+            condicoes.append("ate_data >= ?")
+            parametros.append(de.date().isoformat())
+        if ate is not None:
+            condicoes.append("inicio < ?")
+            parametros.append(ate.isoformat(' ', 'minutes'))
+        linhas = self.conexao.execute(
+            f"SELECT {', '.join(COLUNAS_COMPROMISSO)} FROM compromissos WHERE {' AND '.join(condicoes)}", parametros)
+        return [_compromisso(linha) for linha in linhas]
+
+    def avulsos(self, de=None, ate=None):
+        condicoes, parametros = ["grupo_id IS NULL"], []
+        if de is not None:
+            condicoes.append("inicio >= ?")
+            parametros.append(de.isoformat(' ', 'minutes'))
+        if ate is not None:
+            condicoes.append("inicio < ?")
+            parametros.append(ate.isoformat(' ', 'minutes'))
+        linhas = self.conexao.execute(
+            f"SELECT {', '.join(COLUNAS_COMPROMISSO)} FROM compromissos WHERE {' AND '.join(condicoes)} "
+            "ORDER BY inicio, id", parametros)
+        return (_compromisso(linha) for linha in linhas)
+
+def criar_armazenamento():
+    # AGENDA_ARMAZENAMENTO=sqlite grava em agenda.db, migrando os arquivos JSON na primeira execução
+    tipo = os.getenv('AGENDA_ARMAZENAMENTO', 'json').lower()
+    if tipo == 'sqlite':
+        return ArmazenamentoSQLite(os.getenv('AGENDA_BANCO', 'agenda.db'))
+    if tipo != 'json':
+        raise ValueError(f"AGENDA_ARMAZENAMENTO inválido: {tipo} (use json ou sqlite)")
+    return ArmazenamentoJSON()
+
+class Agenda:
+    def __init__(self, armazenamento=None):
+        self.armazenamento = armazenamento if armazenamento is not None else criar_armazenamento()
+        atexit.register(self.armazenamento.fechar)
+
+    def em_lote(self):
+        return self.armazenamento.em_lote()
+
+    def fechar(self):
+        self.armazenamento.fechar()
 
     def adicionar_contato(self, nome, telefone, email="", endereco=""):
-        contato = {
-            'id': len(self.contatos) + 1,
-            'nome': nome,
-            'telefone': telefone,
-            'email': email,
-            'endereco': endereco,
-            'data_criacao': datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        }
-        self.contatos.append(contato)
-        self.salvar_contatos()
+        contato = Contato(self.armazenamento.proximo_id('contatos'), nome, telefone, email, endereco,
+                          datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
+        self.armazenamento.gravar('contatos', contato)
         return "Contato adicionado com sucesso!"
 
     def listar_contatos(self):
-        if not self.contatos:
+        if self.armazenamento.vazio('contatos'):
             return "Nenhum contato encontrado."
-        return self.contatos
+        return self.armazenamento.listar_contatos()
 
     def buscar_contato(self, termo):
         resultados = []
-        for contato in self.contatos:
-            if (termo.lower() in contato['nome'].lower() or 
-                termo in contato['telefone']):
+        for contato in self.armazenamento.candidatos('contatos', termo):
+            if (termo.lower() in contato.nome.lower() or 
+                termo in contato.telefone):
                 resultados.append(contato)
+        resultados.sort(key=lambda x: x.id)
         return resultados if resultados else "Nenhum contato encontrado."
 
     def editar_contato(self, id, nome=None, telefone=None, email=None, endereco=None):
-        for contato in self.contatos:
-            if contato['id'] == id:
-                if nome: contato['nome'] = nome
-                if telefone: contato['telefone'] = telefone
-                if email: contato['email'] = email
-                if endereco: contato['endereco'] = endereco
-                self.salvar_contatos()
-                return "Contato atualizado com sucesso!"
-        return "Contato não encontrado."
+        contato = self.armazenamento.obter('contatos', id)
+        if not contato:
+            return "Contato não encontrado."
+        if nome: contato.nome = nome
+        if telefone: contato.telefone = telefone
+        if email: contato.email = email
+        if endereco: contato.endereco = endereco
+        self.armazenamento.gravar('contatos', contato)
+        return "Contato atualizado com sucesso!"
 
     def excluir_contato(self, id):
-        for i, contato in enumerate(self.contatos):
-            if contato['id'] == id:
-                del self.contatos[i]
-                self.salvar_contatos()
-                return "Contato excluído com sucesso!"
-        return "Contato não encontrado."
+        if not self.armazenamento.obter('contatos', id):
+            return "Contato não encontrado."
+        self.armazenamento.excluir('contatos', id)
+        return "Contato excluído com sucesso!"
 
     def adicionar_compromisso(self, titulo, data, hora_inicio, hora_fim=None, descricao="", participantes=None, recorrencia=None):
         try:
-            data_hora_inicio = datetime.strptime(f"{data} {hora_inicio}", "%d/%m/%Y %H:%M")
+            data_hora_inicio = ler_data_hora(data, hora_inicio)
             data_hora_fim = None
             if hora_fim:
-                data_hora_fim = datetime.strptime(f"{data} {hora_fim}", "%d/%m/%Y %H:%M")
+                data_hora_fim = ler_data_hora(data, hora_fim)
                 if data_hora_fim <= data_hora_inicio:
                     return "A hora de término deve ser posterior à hora de início."
 
             if data_hora_inicio < datetime.now():
                 return "Não é possível agendar compromissos no passado."
             
-            compromisso_base = {
-                'titulo': titulo,
-                'hora_inicio': hora_inicio,
-                'hora_fim': hora_fim,
-                'descricao': descricao,
-                'participantes': participantes if participantes else [],
-                'data_criacao': datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-            }
+            compromisso_base = Compromisso(
+                id=self.armazenamento.proximo_id('compromissos'),
+                titulo=titulo,
+                data=_internar(data),
+                hora_inicio=_internar(hora_inicio),
+                hora_fim=_internar(hora_fim),
+                descricao=descricao,
+                participantes=_participantes(participantes),
+                data_criacao=_internar(datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
+            )
 
             if recorrencia:
-                tipo_recorrencia = recorrencia['tipo']
-                ate_data = datetime.strptime(recorrencia['ate_data'], "%d/%m/%Y")
-                datas_compromisso = []
-                data_atual = data_hora_inicio
-
-                while data_atual.date() <= ate_data.date():
-                    datas_compromisso.append(data_atual.strftime("%d/%m/%Y"))
-                    
-                    if tipo_recorrencia == 'diaria':
-                        data_atual += timedelta(days=1)
-                    elif tipo_recorrencia == 'semanal':
-                        data_atual += timedelta(days=7)
-                    elif tipo_recorrencia == 'dias_especificos':
-                        # Avança para o próximo dia da semana especificado
-                        data_atual += timedelta(days=1)
-                        while data_atual.weekday() not in recorrencia['dias_semana']:
-                            data_atual += timedelta(days=1)
-                    elif tipo_recorrencia == 'mensal':
-                        # Avança para o mesmo dia no próximo mês
-                        proximo_mes = data_atual.month + 1
-                        proximo_ano = data_atual.year
-                        if proximo_mes > 12:
-                            proximo_mes = 1
-                            proximo_ano += 1
-                        try:
-                            data_atual = data_atual.replace(year=proximo_ano, month=proximo_mes)
-                        except ValueError:
-                            # Se o dia não existir no próximo mês, vai para o último dia
-                            data_atual = (data_atual.replace(year=proximo_ano, month=proximo_mes + 1, day=1) - timedelta(days=1))
-
-                # Cria um compromisso para cada data
-                for data_comp in datas_compromisso:
-                    novo_compromisso = compromisso_base.copy()
-                    novo_compromisso['id'] = len(self.compromissos) + 1
-                    novo_compromisso['data'] = data_comp
-                    novo_compromisso['recorrencia'] = {
-                        'tipo': tipo_recorrencia,
-                        'grupo_id': data_hora_inicio.strftime("%Y%m%d%H%M%S")  # ID único para o grupo de recorrência
-                    }
-                    self.compromissos.append(novo_compromisso)
-
-                self.compromissos.sort(key=lambda x: datetime.strptime(f"{x['data']} {x['hora_inicio']}", "%d/%m/%Y %H:%M"))
-                self.salvar_compromissos()
-                return f"Compromisso recorrente agendado com sucesso! Criados {len(datas_compromisso)} eventos."
+                tipo_recorrencia = recorrencia.get('tipo')
+                dias_semana = recorrencia.get('dias_semana')
+                ate_data = ler_data(recorrencia['ate_data'])
+                try:
+                    validar(tipo_recorrencia, dias_semana)
+                    validar_periodo(data_hora_inicio, tipo_recorrencia, ate_data, dias_semana)
+                except ValueError as e:
+                    return f"{e}."
+                total = sum(1 for _ in ocorrencias(data_hora_inicio, tipo_recorrencia, ate_data, dias_semana))
+
+                # A série é gravada uma única vez; as ocorrências são geradas ao listar
+                grupo_id = data_hora_inicio.strftime("%Y%m%d%H%M%S")  # ID único para o grupo de recorrência
+                if self.armazenamento.grupo_existe(grupo_id):
+                    grupo_id = f"{grupo_id}-{compromisso_base.id}"
+                compromisso_base.recorrencia = Recorrencia.de_dict({
+                    'tipo': tipo_recorrencia,
+                    'ate_data': recorrencia['ate_data'],
+                    'dias_semana': dias_semana,
+                    'grupo_id': grupo_id
+                })
+                self.armazenamento.gravar('compromissos', compromisso_base)
+                return f"Compromisso recorrente agendado com sucesso! Criados {total} eventos."
             else:
                 # Compromisso único
-                compromisso_base['id'] = len(self.compromissos) + 1
-                compromisso_base['data'] = data
-                self.compromissos.append(compromisso_base)
-                self.compromissos.sort(key=lambda x: datetime.strptime(f"{x['data']} {x['hora_inicio']}", "%d/%m/%Y %H:%M"))
-                self.salvar_compromissos()
+                self.armazenamento.gravar('compromissos', compromisso_base)
                 return "Compromisso agendado com sucesso!"
 
         except ValueError as e:
             return f"Erro de formato: {str(e)}. Use DD/MM/AAAA para data e HH:MM para hora."
 
+    def _expandir(self, compromisso, de=None, ate=None):
+        # Gera (início, id, ocorrência) de um compromisso recorrente com início em [de, ate)
+        recorrencia = compromisso.recorrencia
+        inicio = self.armazenamento.inicio(compromisso)
+        ate_data = ler_data(recorrencia.ate_data)
+        excecoes = [ler_data(d) for d in recorrencia.excecoes]
+        for data_ocorrencia in ocorrencias(inicio, recorrencia.tipo, ate_data,
+                                           recorrencia.dias_semana, excecoes, de, ate):
+            yield data_ocorrencia, compromisso.id, compromisso.ocorrencia(_internar(formatar_data(data_ocorrencia)))
+
+    def _remover_ocorrencia(self, compromisso, data_ocorrencia):
+        # Registra a data como exceção da série; retorna False se não for uma ocorrência válida
+        recorrencia = compromisso.recorrencia
+        try:
+            data = ler_data(data_ocorrencia)
+            inicio = self.armazenamento.inicio(compromisso)
+            ate_data = ler_data(recorrencia.ate_data)
+            excecoes = [ler_data(d) for d in recorrencia.excecoes]
+        except ValueError:
+            return False
+        if not contem(inicio, recorrencia.tipo, ate_data, recorrencia.dias_semana, excecoes, data):
+            return False
+        recorrencia.excecoes.append(data_ocorrencia)
+        return True
+
     def listar_compromissos(self, periodo=None):
-        if not self.compromissos:
+        if self.armazenamento.vazio('compromissos'):
             return "Nenhum compromisso encontrado."
         
-        hoje = datetime.now()
-        compromissos_filtrados = []
-        
-        for compromisso in self.compromissos:
-            data_comp = datetime.strptime(f"{compromisso['data']} {compromisso['hora_inicio']}", "%d/%m/%Y %H:%M")
-            
-            if periodo == "hoje" and data_comp.date() == hoje.date():
-                compromissos_filtrados.append(compromisso)
-            elif periodo == "semana" and data_comp.date() <= (hoje + timedelta(days=7)).date():
-                compromissos_filtrados.append(compromisso)
-            elif periodo == "mes" and data_comp.date() <= (hoje + timedelta(days=30)).date():
-                compromissos_filtrados.append(compromisso)
-            elif not periodo:
-                compromissos_filtrados.append(compromisso)
-        
+        de, ate = janela(periodo) if periodo else (None, None)
+        if periodo != "hoje":
+            # Na agenda local, semana e mês incluem também os compromissos passados
+            de = None
+
+        # Séries são expandidas apenas dentro do período pedido; avulsos saem direto do índice
+        # por data de início. Todos os fluxos já vêm ordenados e são apenas intercalados.
+        fluxos = [self._expandir(compromisso, de, ate) for compromisso in self.armazenamento.series(de, ate)]
+        fluxos.append((self.armazenamento.inicio(compromisso), compromisso.id, compromisso)
+                      for compromisso in self.armazenamento.avulsos(de, ate))
+        compromissos_filtrados = [compromisso for _, _, compromisso in heapq.merge(*fluxos)]
         return compromissos_filtrados if compromissos_filtrados else "Nenhum compromisso encontrado para o período especificado."
 
+    def _ocupacao(self, de, ate, filtro=None):
+        # (inicio, fim, ocorrência) de cada compromisso que cruza [de, ate); o término é sempre
+        # no mesmo dia do início, então basta olhar os inícios a partir de um dia antes
+        desde = de - timedelta(days=1)
+        itens = []
+        for compromisso in self.armazenamento.series(desde, ate):
+            if filtro is None or filtro(compromisso):
+                fim = self._fim(compromisso)
+                duracao = fim - self.armazenamento.inicio(compromisso)
+                itens.extend((inicio, inicio + duracao, ocorrencia)
+                             for inicio, _, ocorrencia in self._expandir(compromisso, desde, ate))
+        for compromisso in self.armazenamento.avulsos(desde, ate):
+            if filtro is None or filtro(compromisso):
+                itens.append((self.armazenamento.inicio(compromisso), self._fim(compromisso), compromisso))
+        return [item for item in itens if item[1] > de]
+
+    def _fim(self, compromisso):
+        inicio = self.armazenamento.inicio(compromisso)
+        fim = None
+        if compromisso.hora_fim:
+            fim = ler_data_hora(compromisso.data, compromisso.hora_fim)
+        return fim_efetivo(inicio, fim)
+
+    def verificar_conflitos(self, data, hora_inicio, hora_fim=None, recorrencia=None, ignorar_id=None):
+        # Ocorrências existentes que se sobrepõem ao compromisso proposto (ou a alguma ocorrência da série)
+        try:
+            inicio = ler_data_hora(data, hora_inicio)
+            fim = ler_data_hora(data, hora_fim) if hora_fim else None
+            inicios = [inicio]
+            if recorrencia:
+                ate_data = ler_data(recorrencia['ate_data'])
+                inicios = list(ocorrencias(inicio, recorrencia['tipo'], ate_data, recorrencia.get('dias_semana')))
+        except (ValueError, KeyError):
+            return []
+        if not inicios:
+            return []
+
+        duracao = fim_efetivo(inicio, fim) - inicio
+        indice = IndiceIntervalos(self._ocupacao(
+            inicios[0], inicios[-1] + duracao, lambda c: c.id != ignorar_id))
+        conflitos = []
+        for inicio in inicios:
+            conflitos.extend(indice.sobrepostos(inicio, inicio + duracao))
+        return conflitos
+
+    def disponibilidade(self, participantes, de, ate):
+        # Períodos ocupados e livres dos participantes entre as datas de e ate (DD/MM/AAAA, inclusivas)
+        try:
+            inicio = inicio_do_dia(de)
+            fim = inicio_do_dia(ate) + timedelta(days=1)
+        except ValueError as e:
+            return f"Erro de formato: {str(e)}. Use DD/MM/AAAA para data."
+        nomes = set(participantes)
+        ocupado = unir((max(i, inicio), min(f, fim)) for i, f, _ in self._ocupacao(
+            inicio, fim, lambda c: nomes.intersection(c.participantes)))
+        return {'ocupado': ocupado, 'livre': livres(ocupado, inicio, fim)}
+
     def buscar_compromisso(self, termo):
         resultados = []
-        for compromisso in self.compromissos:
-            if (termo.lower() in compromisso['titulo'].lower() or 
-                termo.lower() in compromisso['descricao'].lower()):
+        for compromisso in self.armazenamento.candidatos('compromissos', termo):
+            if (termo.lower() in compromisso.titulo.lower() or 
+                termo.lower() in compromisso.descricao.lower()):
                 resultados.append(compromisso)
+        resultados.sort(key=lambda x: (self.armazenamento.inicio(x), x.id))
         return resultados if resultados else "Nenhum compromisso encontrado."
 
     def editar_compromisso(self, id, titulo=None, data=None, hora_inicio=None, hora_fim=None, descricao=None, participantes=None):
-        compromisso = None
-        for comp in self.compromissos:
-            if comp['id'] == id:
-                compromisso = comp
-                break
-
+        compromisso = self.armazenamento.obter('compromissos', id)
         if not compromisso:
             return "Compromisso não encontrado."
 
-        grupo_id = compromisso.get('recorrencia', {}).get('grupo_id')
+        try:
+            ler_data_hora(data or compromisso.data, hora_inicio or compromisso.hora_inicio)
+        except ValueError as e:
+            return f"Erro de formato: {str(e)}. Use DD/MM/AAAA para data e HH:MM para hora."
+
+        grupo_id = compromisso.grupo_id
         editar_serie = False
 
         if grupo_id:
@@ -196,43 +1135,46 @@ class Agenda:
             editar_serie = resposta == 's'
 
         if editar_serie:
-            # Edita todos os compromissos do mesmo grupo
-            for comp in self.compromissos:
-                if comp.get('recorrencia', {}).get('grupo_id') == grupo_id:
-                    if titulo: comp['titulo'] = titulo
-                    if hora_inicio: comp['hora_inicio'] = hora_inicio
-                    if hora_fim: comp['hora_fim'] = hora_fim
-                    if descricao: comp['descricao'] = descricao
-                    if participantes is not None: comp['participantes'] = participantes
-            self.salvar_compromissos()
+            # A série é um único registro: alterar a regra altera todas as ocorrências
+            if titulo: compromisso.titulo = titulo
+            if hora_inicio: compromisso.hora_inicio = _internar(hora_inicio)
+            if hora_fim: compromisso.hora_fim = _internar(hora_fim)
+            if descricao: compromisso.descricao = descricao
+            if participantes is not None: compromisso.participantes = _participantes(participantes)
+            self.armazenamento.gravar('compromissos', compromisso)
             return "Série de compromissos atualizada com sucesso!"
         else:
-            # Edita apenas o compromisso específico
-            if titulo: compromisso['titulo'] = titulo
-            if data: compromisso['data'] = data
-            if hora_inicio: compromisso['hora_inicio'] = hora_inicio
-            if hora_fim: compromisso['hora_fim'] = hora_fim
-            if descricao: compromisso['descricao'] = descricao
-            if participantes is not None: compromisso['participantes'] = participantes
-            
-            # Remove a recorrência se for um evento de série
             if grupo_id:
-                compromisso.pop('recorrencia', None)
+                # Edita uma única ocorrência: ela sai da série e vira um compromisso avulso
+                data_ocorrencia = input("Data da ocorrência a editar (DD/MM/AAAA): ")
+                if not self._remover_ocorrencia(compromisso, data_ocorrencia):
+                    return "Ocorrência não encontrada na série."
+                serie = compromisso
+                compromisso = compromisso.ocorrencia(_internar(data_ocorrencia))
+                compromisso.id = self.armazenamento.proximo_id('compromissos')
+                compromisso.recorrencia = None
+
+            # Edita apenas o compromisso específico
+            if titulo: compromisso.titulo = titulo
+            if data: compromisso.data = _internar(data)
+            if hora_inicio: compromisso.hora_inicio = _internar(hora_inicio)
+            if hora_fim: compromisso.hora_fim = _internar(hora_fim)
+            if descricao: compromisso.descricao = descricao
+            if participantes is not None: compromisso.participantes = _participantes(participantes)
             
-            self.salvar_compromissos()
+            # A exceção na série e a nova ocorrência avulsa são gravadas juntas
+            with self.armazenamento.em_lote():
+                if grupo_id:
+                    self.armazenamento.gravar('compromissos', serie)
+                self.armazenamento.gravar('compromissos', compromisso)
             return "Compromisso atualizado com sucesso!"
 
     def excluir_compromisso(self, id):
-        compromisso = None
-        for comp in self.compromissos:
-            if comp['id'] == id:
-                compromisso = comp
-                break
-
+        compromisso = self.armazenamento.obter('compromissos', id)
         if not compromisso:
             return "Compromisso não encontrado."
 
-        grupo_id = compromisso.get('recorrencia', {}).get('grupo_id')
+        grupo_id = compromisso.grupo_id
         excluir_serie = False
 
         if grupo_id:
@@ -240,15 +1182,19 @@ class Agenda:
             excluir_serie = resposta == 's'
 
         if excluir_serie:
-            # Remove todos os compromissos do mesmo grupo
-            self.compromissos = [comp for comp in self.compromissos 
-                               if comp.get('recorrencia', {}).get('grupo_id') != grupo_id]
-            self.salvar_compromissos()
+            # A série inteira é um único registro
+            self.armazenamento.excluir('compromissos', id)
             return "Série de compromissos excluída com sucesso!"
+        elif grupo_id:
+            # Remove apenas uma ocorrência, registrada como exceção da série
+            data_ocorrencia = input("Data da ocorrência a excluir (DD/MM/AAAA): ")
+            if not self._remover_ocorrencia(compromisso, data_ocorrencia):
+                return "Ocorrência não encontrada na série."
+            self.armazenamento.gravar('compromissos', compromisso)
+            return "Compromisso excluído com sucesso!"
         else:
             # Remove apenas o compromisso específico
-            self.compromissos.remove(compromisso)
-            self.salvar_compromissos()
+            self.armazenamento.excluir('compromissos', id)
             return "Compromisso excluído com sucesso!"
 
 def menu():
@@ -265,7 +1211,8 @@ def menu():
     print("8. Buscar Compromisso")
     print("9. Editar Compromisso")
     print("10. Excluir Compromisso")
-    print("11. Sair")
+    print("11. Consultar Disponibilidade")
+    print("12. Sair")
     return input("Escolha uma opção: ")
 
 def main():
@@ -285,12 +1232,12 @@ def main():
             contatos = agenda.listar_contatos()
             if isinstance(contatos, list):
                 for contato in contatos:
-                    print(f"\nID: {contato['id']}")
-                    print(f"Nome: {contato['nome']}")
-                    print(f"Telefone: {contato['telefone']}")
-                    print(f"Email: {contato['email']}")
-                    print(f"Endereço: {contato['endereco']}")
-                    print(f"Data de criação: {contato['data_criacao']}")
+                    print(f"\nID: {contato.id}")
+                    print(f"Nome: {contato.nome}")
+                    print(f"Telefone: {contato.telefone}")
+                    print(f"Email: {contato.email}")
+                    print(f"Endereço: {contato.endereco}")
+                    print(f"Data de criação: {contato.data_criacao}")
             else:
                 print(contatos)
 
@@ -299,11 +1246,11 @@ def main():
             resultados = agenda.buscar_contato(termo)
             if isinstance(resultados, list):
                 for contato in resultados:
-                    print(f"\nID: {contato['id']}")
-                    print(f"Nome: {contato['nome']}")
-                    print(f"Telefone: {contato['telefone']}")
-                    print(f"Email: {contato['email']}")
-                    print(f"Endereço: {contato['endereco']}")
+                    print(f"\nID: {contato.id}")
+                    print(f"Nome: {contato.nome}")
+                    print(f"Telefone: {contato.telefone}")
+                    print(f"Email: {contato.email}")
+                    print(f"Endereço: {contato.endereco}")
             else:
                 print(resultados)
 
@@ -358,15 +1305,26 @@ def main():
                     recorrencia['tipo'] = 'dias_especificos'
                     print("\nSelecione os dias da semana (0-6, sendo 0=Segunda e 6=Domingo):")
                     dias = input("Digite os números separados por vírgula (ex: 1,3,5): ")
-                    recorrencia['dias_semana'] = [int(d.strip()) for d in dias.split(',')]
+                    try:
+                        recorrencia['dias_semana'] = [int(d.strip()) for d in dias.split(',')]
+                    except ValueError:
+                        print("Dias da semana inválidos: use números de 0 a 6 separados por vírgula.")
+                        continue
                 elif tipo_rec == "4":
                     recorrencia['tipo'] = 'mensal'
-                
-                print(agenda.adicionar_compromisso(titulo, data, hora_inicio, hora_fim, 
-                                                 descricao, participantes, recorrencia))
             else:
-                print(agenda.adicionar_compromisso(titulo, data, hora_inicio, hora_fim, 
-                                                 descricao, participantes))
+                recorrencia = None
+
+            conflitos = agenda.verificar_conflitos(data, hora_inicio, hora_fim or None, recorrencia)
+            if conflitos:
+                print("\nConflita com:")
+                for comp in conflitos:
+                    print(f"- {comp.data} {comp.hora_inicio}: {comp.titulo}")
+                if input("Agendar mesmo assim? (s/n): ").lower() != 's':
+                    continue
+
+            print(agenda.adicionar_compromisso(titulo, data, hora_inicio, hora_fim,
+                                             descricao, participantes, recorrencia))
 
         elif opcao == "7":
             print("\nPeriodo de listagem:")
@@ -385,15 +1343,15 @@ def main():
             compromissos = agenda.listar_compromissos(periodo)
             if isinstance(compromissos, list):
                 for comp in compromissos:
-                    print(f"\nID: {comp['id']}")
-                    print(f"Título: {comp['titulo']}")
-                    print(f"Data: {comp['data']}")
-                    print(f"Hora início: {comp['hora_inicio']}")
-                    print(f"Hora término: {comp['hora_fim'] if comp.get('hora_fim') else 'Não definida'}")
-                    print(f"Descrição: {comp['descricao']}")
-                    print(f"Participantes: {', '.join(comp['participantes']) if comp['participantes'] else 'Nenhum'}")
-                    if comp.get('recorrencia'):
-                        print(f"Recorrência: {comp['recorrencia']['tipo']}")
+                    print(f"\nID: {comp.id}")
+                    print(f"Título: {comp.titulo}")
+                    print(f"Data: {comp.data}")
+                    print(f"Hora início: {comp.hora_inicio}")
+                    print(f"Hora término: {comp.hora_fim if comp.hora_fim else 'Não definida'}")
+                    print(f"Descrição: {comp.descricao}")
+                    print(f"Participantes: {', '.join(comp.participantes) if comp.participantes else 'Nenhum'}")
+                    if comp.recorrencia:
+                        print(f"Recorrência: {comp.recorrencia.tipo}")
             else:
                 print(compromissos)
 
@@ -402,15 +1360,15 @@ def main():
             resultados = agenda.buscar_compromisso(termo)
             if isinstance(resultados, list):
                 for comp in resultados:
-                    print(f"\nID: {comp['id']}")
-                    print(f"Título: {comp['titulo']}")
-                    print(f"Data: {comp['data']}")
-                    print(f"Hora início: {comp['hora_inicio']}")
-                    print(f"Hora término: {comp['hora_fim'] if comp.get('hora_fim') else 'Não definida'}")
-                    print(f"Descrição: {comp['descricao']}")
-                    print(f"Participantes: {', '.join(comp['participantes']) if comp['participantes'] else 'Nenhum'}")
-                    if comp.get('recorrencia'):
-                        print(f"Recorrência: {comp['recorrencia']['tipo']}")
+                    print(f"\nID: {comp.id}")
+                    print(f"Título: {comp.titulo}")
+                    print(f"Data: {comp.data}")
+                    print(f"Hora início: {comp.hora_inicio}")
+                    print(f"Hora término: {comp.hora_fim if comp.hora_fim else 'Não definida'}")
+                    print(f"Descrição: {comp.descricao}")
+                    print(f"Participantes: {', '.join(comp.participantes) if comp.participantes else 'Nenhum'}")
+                    if comp.recorrencia:
+                        print(f"Recorrência: {comp.recorrencia.tipo}")
             else:
                 print(resultados)
 
@@ -440,6 +1398,21 @@ def main():
             print(agenda.excluir_compromisso(id))
 
         elif opcao == "11":
+            participantes = [p.strip() for p in input("Participantes (separados por vírgula): ").split(',') if p.strip()]
+            de = input("De (DD/MM/AAAA): ")
+            ate = input("Até (DD/MM/AAAA): ")
+            resultado = agenda.disponibilidade(participantes, de, ate)
+            if isinstance(resultado, dict):
+                print("\nOcupado:")
+                for inicio, fim in resultado['ocupado']:
+                    print(f"- {formatar_data_hora(inicio)} às {formatar_data_hora(fim)}")
+                print("Livre:")
+                for inicio, fim in resultado['livre']:
+                    print(f"- {formatar_data_hora(inicio)} às {formatar_data_hora(fim)}")
+            else:
+                print(resultado)
+
+        elif opcao == "12":
             print("Saindo da agenda...")
             break
 
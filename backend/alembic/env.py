@@ -11,6 +11,7 @@ from app.database import Base
 from app.models import *
 
 config = context.config
+config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL", config.get_main_option("sqlalchemy.url")))
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
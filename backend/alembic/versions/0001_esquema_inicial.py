@@ -0,0 +1,57 @@
+"""esquema inicial
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bancos existentes já tiveram as tabelas criadas pelo create_all da aplicação
+    tabelas = sa.inspect(op.get_bind()).get_table_names()
+
+    if "contatos" not in tabelas:
+        op.create_table(
+            "contatos",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("nome", sa.String()),
+            sa.Column("telefone", sa.String()),
+            sa.Column("email", sa.String()),
+            sa.Column("endereco", sa.String()),
+            sa.Column("data_criacao", sa.DateTime()),
+        )
+        op.create_index("ix_contatos_id", "contatos", ["id"])
+        op.create_index("ix_contatos_nome", "contatos", ["nome"])
+
+    if "compromissos" not in tabelas:
+        op.create_table(
+            "compromissos",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("titulo", sa.String()),
+            sa.Column("data", sa.String()),
+            sa.Column("hora_inicio", sa.String()),
+            sa.Column("hora_fim", sa.String()),
+            sa.Column("descricao", sa.String()),
+            sa.Column("participantes", sa.JSON()),
+            sa.Column("recorrencia", sa.JSON()),
+            sa.Column("data_criacao", sa.DateTime()),
+        )
+        op.create_index("ix_compromissos_id", "compromissos", ["id"])
+        op.create_index("ix_compromissos_titulo", "compromissos", ["titulo"])
+
+
+def downgrade() -> None:
+    op.drop_table("compromissos")
+    op.drop_table("contatos")
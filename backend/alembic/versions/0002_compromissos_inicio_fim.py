@@ -0,0 +1,62 @@
+"""compromissos: colunas inicio/fim no lugar de data/hora em texto
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspetor = sa.inspect(op.get_bind())
+    colunas = {c["name"] for c in inspetor.get_columns("compromissos")}
+    indices = {i["name"] for i in inspetor.get_indexes("compromissos")}
+
+    if "inicio" not in colunas:
+        op.add_column("compromissos", sa.Column("inicio", sa.DateTime(), nullable=True))
+        op.add_column("compromissos", sa.Column("fim", sa.DateTime(), nullable=True))
+
+    if "data" in colunas:
+        # Backfill a partir dos campos em texto (DD/MM/YYYY e HH:MM)
+        op.execute("""
+            UPDATE compromissos
+            SET inicio = to_timestamp(data || ' ' || hora_inicio, 'DD/MM/YYYY HH24:MI')::timestamp,
+                fim = CASE
+                    WHEN coalesce(hora_fim, '') <> ''
+                    THEN to_timestamp(data || ' ' || hora_fim, 'DD/MM/YYYY HH24:MI')::timestamp
+                END
+        """)
+        op.drop_column("compromissos", "data")
+        op.drop_column("compromissos", "hora_inicio")
+        op.drop_column("compromissos", "hora_fim")
+
+    op.alter_column("compromissos", "inicio", nullable=False)
+
+    if "ix_compromissos_inicio_id" not in indices:
+        op.create_index("ix_compromissos_inicio_id", "compromissos", ["inicio", "id"])
+
+
+def downgrade() -> None:
+    op.add_column("compromissos", sa.Column("data", sa.String()))
+    op.add_column("compromissos", sa.Column("hora_inicio", sa.String()))
+    op.add_column("compromissos", sa.Column("hora_fim", sa.String()))
+    op.execute("""
+        UPDATE compromissos
+        SET data = to_char(inicio, 'DD/MM/YYYY'),
+            hora_inicio = to_char(inicio, 'HH24:MI'),
+            hora_fim = to_char(fim, 'HH24:MI')
+    """)
+    op.drop_index("ix_compromissos_inicio_id", table_name="compromissos")
+    op.drop_column("compromissos", "fim")
+    op.drop_column("compromissos", "inicio")
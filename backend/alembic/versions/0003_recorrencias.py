@@ -0,0 +1,136 @@
+"""recorrências como regra em vez de uma linha por ocorrência
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00
+
+"""
+from typing import Sequence, Union
+from datetime import datetime
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.recorrencia import TIPOS, ocorrencias
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _converter_series(conexao) -> None:
+    """Agrupa as linhas materializadas de cada série em uma regra + compromisso base."""
+    linhas = conexao.execute(sa.text(
+        "SELECT id, titulo, inicio, fim, descricao, recorrencia::text AS recorrencia "
+        "FROM compromissos WHERE recorrencia IS NOT NULL ORDER BY inicio, id"
+    )).mappings().all()
+
+    grupos = {}
+    for linha in linhas:
+        recorrencia = json.loads(linha["recorrencia"]) or {}
+        if recorrencia.get("tipo") not in TIPOS:
+            continue
+        # Linhas antigas nem sempre têm grupo_id; usa os campos copiados para todas as ocorrências
+        chave = recorrencia.get("grupo_id") or (
+            linha["recorrencia"], linha["titulo"], linha["descricao"],
+            linha["inicio"].time(), linha["fim"] and linha["fim"] - linha["inicio"],
+        )
+        grupos.setdefault(chave, (recorrencia, []))[1].append(linha)
+
+    for recorrencia, membros in grupos.values():
+        base = membros[0]
+        datas = {m["inicio"].date(): m["id"] for m in membros}
+        ate_data = max(datas)
+        if recorrencia.get("ate_data"):
+            ate_data = datetime.strptime(recorrencia["ate_data"], "%d/%m/%Y").date()
+        dias_semana = recorrencia.get("dias_semana")
+        if recorrencia["tipo"] == "dias_especificos" and not dias_semana:
+            dias_semana = sorted({m["inicio"].weekday() for m in membros[1:]})
+
+        recorrencia_id = conexao.execute(
+            sa.text("INSERT INTO recorrencias (tipo, dias_semana, ate_data) "
+                    "VALUES (:tipo, CAST(:dias_semana AS JSON), :ate_data) RETURNING id"),
+            {"tipo": recorrencia["tipo"], "dias_semana": json.dumps(dias_semana), "ate_data": ate_data},
+        ).scalar()
+
+        esperadas = {i.date() for i in ocorrencias(base["inicio"], recorrencia["tipo"], ate_data, dias_semana)}
+        # Ocorrências apagadas viram exceções; linhas fora da regra continuam como avulsas
+        for data in sorted(esperadas - datas.keys()):
+            conexao.execute(
+                sa.text("INSERT INTO recorrencia_excecoes (recorrencia_id, data) VALUES (:r, :d)"),
+                {"r": recorrencia_id, "d": data},
+            )
+        conexao.execute(
+            sa.text("UPDATE compromissos SET recorrencia_id = :r WHERE id = :id"),
+            {"r": recorrencia_id, "id": base["id"]},
+        )
+        redundantes = [id for data, id in datas.items() if data in esperadas and id != base["id"]]
+        if redundantes:
+            conexao.execute(
+                sa.text("DELETE FROM compromissos WHERE id = ANY(:ids)"),
+                {"ids": redundantes},
+            )
+
+
+def upgrade() -> None:
+    inspetor = sa.inspect(op.get_bind())
+    tabelas = inspetor.get_table_names()
+    colunas = {c["name"] for c in inspetor.get_columns("compromissos")}
+
+    if "recorrencias" not in tabelas:
+        op.create_table(
+            "recorrencias",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("tipo", sa.String(), nullable=False),
+            sa.Column("dias_semana", sa.JSON()),
+            sa.Column("ate_data", sa.Date(), nullable=False),
+        )
+        op.create_index("ix_recorrencias_id", "recorrencias", ["id"])
+
+    if "recorrencia_id" not in colunas:
+        op.add_column("compromissos", sa.Column(
+            "recorrencia_id", sa.Integer(),
+            sa.ForeignKey("recorrencias.id", ondelete="CASCADE"),
+        ))
+        op.create_index("ix_compromissos_recorrencia_id", "compromissos", ["recorrencia_id"])
+
+    if "recorrencia_excecoes" not in tabelas:
+        op.create_table(
+            "recorrencia_excecoes",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("recorrencia_id", sa.Integer(),
+                      sa.ForeignKey("recorrencias.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("data", sa.Date(), nullable=False),
+            sa.Column("substituto_id", sa.Integer(),
+                      sa.ForeignKey("compromissos.id", ondelete="SET NULL")),
+            sa.UniqueConstraint("recorrencia_id", "data"),
+        )
+        op.create_index("ix_recorrencia_excecoes_id", "recorrencia_excecoes", ["id"])
+
+    if "recorrencia" in colunas:
+        _converter_series(op.get_bind())
+        op.drop_column("compromissos", "recorrencia")
+
+
+def downgrade() -> None:
+    op.add_column("compromissos", sa.Column("recorrencia", sa.JSON()))
+    # Apenas o compromisso base de cada série mantém a recorrência; as ocorrências não são recriadas
+    op.execute("""
+        UPDATE compromissos c
+        SET recorrencia = json_build_object(
+            'tipo', r.tipo,
+            'ate_data', to_char(r.ate_data, 'DD/MM/YYYY'),
+            'dias_semana', r.dias_semana,
+            'grupo_id', r.id::text
+        )
+        FROM recorrencias r
+        WHERE c.recorrencia_id = r.id
+    """)
+    op.drop_table("recorrencia_excecoes")
+    op.drop_index("ix_compromissos_recorrencia_id", table_name="compromissos")
+    op.drop_column("compromissos", "recorrencia_id")
+    op.drop_table("recorrencias")
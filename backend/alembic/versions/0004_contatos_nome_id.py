@@ -0,0 +1,28 @@
+"""contatos: índice (nome, id) para paginação por cursor
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    indices = {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("contatos")}
+    if "ix_contatos_nome_id" not in indices:
+        op.create_index("ix_contatos_nome_id", "contatos", ["nome", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contatos_nome_id", table_name="contatos")
@@ -0,0 +1,40 @@
+"""busca: extensão pg_trgm e índices GIN de trigramas
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDICES = [
+    ("contatos", "nome"),
+    ("contatos", "telefone"),
+    ("compromissos", "titulo"),
+    ("compromissos", "descricao"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    inspetor = sa.inspect(op.get_bind())
+    for tabela, coluna in INDICES:
+        nome = f"ix_{tabela}_{coluna}_trgm"
+        if nome not in {i["name"] for i in inspetor.get_indexes(tabela)}:
+            op.create_index(nome, tabela, [coluna], postgresql_using="gin",
+                            postgresql_ops={coluna: "gin_trgm_ops"})
+
+
+def downgrade() -> None:
+    for tabela, coluna in INDICES:
+        op.drop_index(f"ix_{tabela}_{coluna}_trgm", table_name=tabela)
@@ -0,0 +1,36 @@
+"""participantes como JSONB com índice GIN
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspetor = sa.inspect(op.get_bind())
+    colunas = {c["name"]: c["type"] for c in inspetor.get_columns("compromissos")}
+    if not isinstance(colunas["participantes"], postgresql.JSONB):
+        op.alter_column("compromissos", "participantes", type_=postgresql.JSONB(),
+                        postgresql_using="participantes::jsonb")
+    if "ix_compromissos_participantes" not in {i["name"] for i in inspetor.get_indexes("compromissos")}:
+        op.create_index("ix_compromissos_participantes", "compromissos", ["participantes"],
+                        postgresql_using="gin", postgresql_ops={"participantes": "jsonb_path_ops"})
+
+
+def downgrade() -> None:
+    op.drop_index("ix_compromissos_participantes", table_name="compromissos")
+    op.alter_column("compromissos", "participantes", type_=sa.JSON(),
+                    postgresql_using="participantes::json")
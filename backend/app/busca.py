@@ -0,0 +1,24 @@
+"""Auxiliares de busca textual com pg_trgm.
+
+Os índices GIN com gin_trgm_ops atendem tanto ILIKE '%termo%' quanto os
+operadores de similaridade (%, <%), então a busca não varre a tabela.
+"""
+from sqlalchemy import func, literal, or_
+
+
+def padrao_like(termo: str) -> str:
+    escapado = termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escapado}%"
+
+
+def filtro(termo: str, *colunas):
+    """Condição que casa o termo como substring ou por similaridade de palavras."""
+    padrao = padrao_like(termo)
+    condicoes = [coluna.ilike(padrao, escape="\\") for coluna in colunas]
+    condicoes += [literal(termo).op("<%")(coluna) for coluna in colunas]
+    return or_(*condicoes)
+
+
+def relevancia(termo: str, *colunas):
+    """Maior similaridade de palavras entre o termo e as colunas (0 a 1)."""
+    return func.greatest(*[func.word_similarity(termo, coluna) for coluna in colunas])
@@ -0,0 +1,231 @@
+"""Cache das respostas já serializadas das listagens, com ETag e invalidação por tags.
+
+Cada entrada guarda o corpo JSON, o ETag e as tags que descrevem o que ela
+contém (a coleção e os dias da janela listada). As rotas de escrita invalidam
+apenas as tags afetadas pela alteração.
+
+Cada invalidação também avança a versão das tags. `responder` lê as versões
+antes de consultar o banco e o backend só grava a resposta se nenhuma delas
+mudou: uma escrita confirmada enquanto a listagem era produzida não deixa no
+cache um corpo anterior a ela.
+
+O backend é escolhido por CACHE_BACKEND:
+
+- `memoria` (padrão): LRU com TTL no próprio processo; cada worker tem o seu,
+  então uma escrita só invalida o cache do worker que a recebeu e os demais
+  servem a versão anterior por até CACHE_TTL segundos;
+- `redis`: compartilhado entre os workers (requer o pacote `redis` e REDIS_URL);
+- `desativado`: toda requisição vai ao banco.
+
+`configurar()` permite trocar o backend, por exemplo por um `CacheRedis` com
+um cliente substituto em testes.
+"""
+from collections import OrderedDict
+from datetime import timedelta
+from fastapi import Request, Response
+import hashlib
+import os
+import time
+from .datas import dias
+from .metricas import CACHE_CONSULTAS, WORKER
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memoria")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_MAXIMO = int(os.getenv("CACHE_MAXIMO", "1024"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Listagens sem janela de datas (ou de janela longa demais) dependem de toda a coleção
+MAXIMO_DIAS_JANELA = 62
+
+
+class CacheMemoria:
+    """LRU com TTL; o índice de tags aponta para as chaves de cada tag."""
+
+    def __init__(self, maximo: int = CACHE_MAXIMO, ttl: float = CACHE_TTL):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # chave -> (expira_em, etag, corpo, tags)
+        self._tags = {}
+        # Tag -> número de invalidações; tags nunca invalidadas estão na versão 0
+        self._versoes = {}
+
+    async def obter(self, chave: str):
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return None
+        if entrada[0] <= time.monotonic():
+            self._remover(chave)
+            return None
+        self._entradas.move_to_end(chave)
+        return entrada[1], entrada[2]
+
+    async def versoes(self, tags):
+        return tuple(self._versoes.get(tag, 0) for tag in tags)
+
+    async def gravar(self, chave: str, etag: str, corpo: bytes, tags, versoes):
+        # Sem await entre a conferência e a gravação: nenhuma invalidação se intercala
+        if await self.versoes(tags) != versoes:
+            return
+        if chave in self._entradas:
+            self._remover(chave)
+        self._entradas[chave] = (time.monotonic() + self.ttl, etag, corpo, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(chave)
+        while len(self._entradas) > self.maximo:
+            self._remover(next(iter(self._entradas)))
+
+    async def invalidar(self, *tags):
+        for tag in tags:
+            self._versoes[tag] = self._versoes.get(tag, 0) + 1
+            for chave in self._tags.pop(tag, ()):
+                self._remover(chave)
+
+    def _remover(self, chave: str):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        for tag in entrada[3]:
+            chaves = self._tags.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._tags[tag]
+
+
+class CacheRedis:
+    """Cache compartilhado em um Redis (ou servidor compatível).
+
+    `cliente` segue a interface de `redis.asyncio.Redis` (get, mget, incr,
+    expire, smembers, delete, eval); cada tag é um SET com as chaves que a
+    contêm e um contador com a sua versão.
+    """
+
+    # KEYS: a chave da entrada, as versões das n tags e os SETs das n tags.
+    # ARGV: o valor, o TTL e as n versões lidas antes de produzir o corpo.
+    # A conferência e a gravação são atômicas no servidor; o SET de cada tag vive
+    # um pouco mais que as entradas que aponta.
+    GRAVAR = """
+    local n = (#KEYS - 1) / 2
+    for i = 1, n do
+        if (redis.call('GET', KEYS[1 + i]) or '') ~= ARGV[2 + i] then
+            return 0
+        end
+    end
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    for i = 1, n do
+        redis.call('SADD', KEYS[1 + n + i], KEYS[1])
+        redis.call('EXPIRE', KEYS[1 + n + i], ARGV[2] * 2)
+    end
+    return 1
+    """
+
+    def __init__(self, cliente, ttl: float = CACHE_TTL, prefixo: str = "agenda:cache:"):
+        self.cliente = cliente
+        self.ttl = max(1, int(ttl))
+        self.prefixo = prefixo
+
+    async def obter(self, chave: str):
+        valor = await self.cliente.get(self.prefixo + chave)
+        if valor is None:
+            return None
+        # Valor gravado como "<etag>\n<corpo>"; o ETag é hexadecimal e não contém quebras de linha
+        etag, _, corpo = valor.partition(b"\n")
+        return etag.decode(), corpo
+
+    async def versoes(self, tags):
+        valores = await self.cliente.mget([self.prefixo + "versao:" + tag for tag in tags])
+        return tuple((valor or b"").decode() for valor in valores)
+
+    async def gravar(self, chave: str, etag: str, corpo: bytes, tags, versoes):
+        tags = list(tags)
+        chaves = [self.prefixo + chave]
+        chaves += [self.prefixo + "versao:" + tag for tag in tags]
+        chaves += [self.prefixo + "tag:" + tag for tag in tags]
+        await self.cliente.eval(self.GRAVAR, len(chaves), *chaves,
+                                etag.encode() + b"\n" + corpo, self.ttl, *versoes)
+
+    async def invalidar(self, *tags):
+        for tag in tags:
+            # A versão avança antes da remoção e dura mais que qualquer listagem em andamento
+            versao = self.prefixo + "versao:" + tag
+            await self.cliente.incr(versao)
+            await self.cliente.expire(versao, self.ttl * 2)
+            tag = self.prefixo + "tag:" + tag
+            chaves = await self.cliente.smembers(tag)
+            await self.cliente.delete(tag, *chaves)
+
+
+class CacheDesativado:
+    async def obter(self, chave: str):
+        return None
+
+    async def versoes(self, tags):
+        return ()
+
+    async def gravar(self, chave: str, etag: str, corpo: bytes, tags, versoes):
+        pass
+
+    async def invalidar(self, *tags):
+        pass
+
+
+def criar_cache(backend: str = CACHE_BACKEND):
+    if backend == "desativado":
+        return CacheDesativado()
+    if backend == "redis":
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requer o pacote redis (pip install redis)")
+        return CacheRedis(Redis.from_url(REDIS_URL))
+    if backend == "memoria":
+        return CacheMemoria()
+    raise RuntimeError(f"CACHE_BACKEND inválido: {backend} (use memoria, redis ou desativado)")
+
+
+cache = criar_cache()
+
+
+def configurar(novo):
+    global cache
+    cache = novo
+
+
+def tags_janela(colecao: str, de=None, ate=None) -> list:
+    """Tags de uma listagem da coleção restrita a [de, ate), ou da coleção toda sem janela."""
+    tags = [colecao]
+    if de is None or ate is None or ate - de > timedelta(days=MAXIMO_DIAS_JANELA):
+        return tags + [f"{colecao}:aberta"]
+    return tags + [f"{colecao}:dia:{dia}" for dia in dias(de, ate)]
+
+
+async def invalidar_dias(colecao: str, *datas):
+    """Invalida as listagens que podem conter registros nas datas informadas."""
+    await cache.invalidar(f"{colecao}:aberta", *{f"{colecao}:dia:{data.date().isoformat()}" for data in datas})
+
+
+async def invalidar_colecao(colecao: str):
+    await cache.invalidar(colecao)
+
+
+def _resposta(request: Request, etag: str, corpo: bytes, resultado: str) -> Response:
+    cabecalhos = {"ETag": f'"{etag}"', "Cache-Control": "no-cache", "X-Cache": resultado}
+    if_none_match = [valor.strip().removeprefix("W/") for valor in request.headers.get("if-none-match", "").split(",")]
+    if "*" in if_none_match or f'"{etag}"' in if_none_match:
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(content=corpo, media_type="application/json", headers=cabecalhos)
+
+
+async def responder(request: Request, chave: str, tags, produzir) -> Response:
+    """Serve a listagem do cache ou a produz com `produzir()` (que devolve o corpo JSON) e guarda."""
+    entrada = await cache.obter(chave)
+    if entrada is not None:
+        CACHE_CONSULTAS.labels(WORKER, "hit").inc()
+        return _resposta(request, *entrada, "HIT")
+
+    CACHE_CONSULTAS.labels(WORKER, "miss").inc()
+    versoes = await cache.versoes(tags)
+    corpo = await produzir()
+    etag = hashlib.blake2b(corpo, digest_size=16).hexdigest()
+    await cache.gravar(chave, etag, corpo, tags, versoes)
+    return _resposta(request, etag, corpo, "MISS")
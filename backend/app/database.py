@@ -1,18 +1,175 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+import asyncio
 import os
+from .metricas import PoolAssincronoMedido, PoolMedido
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://agenda:agenda123@db:5432/agenda_db")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _ativado(valor: str) -> bool:
+    return valor.lower() in ("1", "true", "sim")
+
+# Com DATABASE_ASYNC=true os handlers usam asyncpg/AsyncSession e não ocupam o threadpool
+DATABASE_ASYNC = _ativado(os.getenv("DATABASE_ASYNC", "false"))
+
+# Dimensionamento do pool por worker; some (pool_size + max_overflow) * workers contra o max_connections do Postgres
+POOL_CONFIG = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": _ativado(os.getenv("DB_POOL_PRE_PING", "true")),
+}
+
+engine = create_engine(DATABASE_URL, poolclass=PoolMedido, **POOL_CONFIG)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_ASYNC:
+    async_engine = create_async_engine(
+        make_url(DATABASE_URL).set(drivername="postgresql+asyncpg"),
+        poolclass=PoolAssincronoMedido,
+        **POOL_CONFIG,
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+class SessaoSincrona:
+    """Expõe uma Session síncrona com a mesma interface aguardável da AsyncSession.
+
+    Cada operação de banco roda no threadpool, permitindo que os handlers
+    `async def` funcionem igualmente nos modos síncrono e assíncrono.
+    """
+
+    def __init__(self, sessao):
+        self.sessao = sessao
+
+    def add(self, instancia):
+        self.sessao.add(instancia)
+
+    def add_all(self, instancias):
+        self.sessao.add_all(instancias)
+
+    async def execute(self, *args, **kwargs):
+        return await run_in_threadpool(self.sessao.execute, *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await run_in_threadpool(self.sessao.scalar, *args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return await run_in_threadpool(self.sessao.scalars, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await run_in_threadpool(self.sessao.get, *args, **kwargs)
+
+    async def delete(self, instancia):
+        await run_in_threadpool(self.sessao.delete, instancia)
+
+    async def flush(self):
+        await run_in_threadpool(self.sessao.flush)
+
+    async def refresh(self, instancia):
+        await run_in_threadpool(self.sessao.refresh, instancia)
+
+    async def commit(self):
+        await run_in_threadpool(self.sessao.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sessao.rollback)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sessao, *args, **kwargs)
+
+    async def stream(self, *args, **kwargs):
+        return ResultadoEmPartes(await run_in_threadpool(self.sessao.execute, *args, **kwargs))
+
+    async def close(self):
+        await run_in_threadpool(self.sessao.close)
+
+class ResultadoEmPartes:
+    """Equivalente ao AsyncResult.partitions() para um Result síncrono com cursor no servidor."""
+
+    def __init__(self, resultado):
+        self.resultado = resultado
+
+    async def partitions(self, tamanho=None):
+        particoes = self.resultado.partitions(tamanho)
+        while True:
+            particao = await run_in_threadpool(next, particoes, None)
+            if particao is None:
+                break
+            yield particao
+
+@asynccontextmanager
+async def abrir_sessao():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    db = SessaoSincrona(SessionLocal())
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        await db.close()
+
+async def get_db():
+    async with abrir_sessao() as db:
+        yield db
+
+async def _executar_na_conexao(conexao, funcao):
+    if async_engine is not None:
+        async with AsyncSessionLocal(bind=conexao) as db:
+            await funcao(db)
+        return
+    db = SessaoSincrona(SessionLocal(bind=conexao))
+    try:
+        await funcao(db)
+    finally:
+        await db.close()
+
+async def aquecer(funcao):
+    """Abre de uma vez as pool_size conexões do worker e executa funcao(db) em cada uma.
+
+    Cada conexão é um processo próprio no PostgreSQL, com seus caches de catálogo (e, no
+    asyncpg, de prepared statements): aquecer só uma deixaria as outras frias para as
+    primeiras requisições, que o pool distribui entre todas.
+    """
+    total = POOL_CONFIG["pool_size"]
+    if async_engine is not None:
+        abertas = await asyncio.gather(*(async_engine.connect().start() for _ in range(total)), return_exceptions=True)
+    else:
+        abertas = await asyncio.gather(*(run_in_threadpool(engine.connect) for _ in range(total)), return_exceptions=True)
+    conexoes = [conexao for conexao in abertas if not isinstance(conexao, BaseException)]
+    try:
+        if len(conexoes) < len(abertas):
+            raise next(erro for erro in abertas if isinstance(erro, BaseException))
+        await asyncio.gather(*(_executar_na_conexao(conexao, funcao) for conexao in conexoes))
+    finally:
+        for conexao in conexoes:
+            if async_engine is not None:
+                await conexao.close()
+            else:
+                await run_in_threadpool(conexao.close)
+
+async def banco_disponivel(tempo_limite: float = 2.0) -> bool:
+    """SELECT 1 por uma conexão do pool; usado pela verificação de prontidão."""
+    try:
+        async with abrir_sessao() as db:
+            await asyncio.wait_for(db.execute(text("SELECT 1")), tempo_limite)
+        return True
+    except (asyncio.TimeoutError, OSError, SQLAlchemyError):
+        return False
+
+async def fechar_engines():
+    if async_engine is not None:
+        await async_engine.dispose()
+    await run_in_threadpool(engine.dispose)
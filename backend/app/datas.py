@@ -0,0 +1,97 @@
+"""Leitura e formatação das datas e horas no formato da agenda (DD/MM/YYYY e HH:MM).
+
+`datetime.strptime` interpreta o formato a cada chamada e é lento em laços.
+Aqui os formatos fixos são lidos por posição, com um LRU dos valores já
+lidos (as mesmas datas e horas se repetem muito), e textos fora do formato
+exato caem no strptime, que mantém as mesmas regras e mensagens de erro.
+
+`janela` resolve os períodos nomeados ("hoje", "semana", "mes") em um
+intervalo [de, ate) e `dias` enumera os dias de um intervalo, para as tags de
+invalidação do cache.
+"""
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+FORMATO_DATA = "%d/%m/%Y"
+FORMATO_HORA = "%H:%M"
+FORMATO_DATA_HORA = "%d/%m/%Y %H:%M"
+
+# Dias de cada período de listagem, a partir de hoje (o dia de hoje conta)
+PERIODOS = {"hoje": 1, "semana": 8, "mes": 31}
+
+# Maior período [de, ate] aceito pela disponibilidade e pelo resumo: limita a
+# expansão de séries a um ano por consulta
+PERIODO_MAXIMO = timedelta(days=366)
+PERIODO_INVALIDO = f"Período inválido (máximo de {PERIODO_MAXIMO.days} dias)"
+
+
+@lru_cache(maxsize=8192)
+def ler_data(texto: str) -> date:
+    if len(texto) == 10 and texto[2] == "/" and texto[5] == "/" and texto[:2].isdigit() \
+            and texto[3:5].isdigit() and texto[6:].isdigit():
+        try:
+            return date(int(texto[6:]), int(texto[3:5]), int(texto[:2]))
+        except ValueError:
+            pass
+    return datetime.strptime(texto, FORMATO_DATA).date()
+
+
+@lru_cache(maxsize=2048)
+def ler_hora(texto: str) -> time:
+    if len(texto) == 5 and texto[2] == ":" and texto[:2].isdigit() and texto[3:].isdigit():
+        try:
+            return time(int(texto[:2]), int(texto[3:]))
+        except ValueError:
+            pass
+    return datetime.strptime(texto, FORMATO_HORA).time()
+
+
+def ler_data_hora(data: str, hora: str) -> datetime:
+    """Equivale a datetime.strptime(f"{data} {hora}", "%d/%m/%Y %H:%M")."""
+    try:
+        return datetime.combine(ler_data(data), ler_hora(hora))
+    except ValueError:
+        # Repete pelo strptime para a mensagem de erro citar o texto completo
+        return datetime.strptime(f"{data} {hora}", FORMATO_DATA_HORA)
+
+
+def inicio_do_dia(texto: str) -> datetime:
+    """Meia-noite da data DD/MM/YYYY, como datetime.strptime(texto, "%d/%m/%Y")."""
+    return datetime.combine(ler_data(texto), time())
+
+
+def formatar_data(valor) -> str:
+    return "%02d/%02d/%04d" % (valor.day, valor.month, valor.year)
+
+
+def formatar_hora(valor) -> str:
+    return "%02d:%02d" % (valor.hour, valor.minute)
+
+
+def formatar_data_hora(valor) -> str:
+    return "%02d/%02d/%04d %02d:%02d" % (valor.day, valor.month, valor.year, valor.hour, valor.minute)
+
+
+@lru_cache(maxsize=64)
+def _janela(periodo: str, hoje: date):
+    dias = PERIODOS.get(periodo)
+    if dias is None:
+        return None, None
+    inicio = datetime.combine(hoje, time())
+    return inicio, inicio + timedelta(days=dias)
+
+
+def janela(periodo: str):
+    """(de, ate) do período (hoje, semana ou mes) a partir da meia-noite de hoje; (None, None) se desconhecido."""
+    return _janela(periodo, date.today())
+
+
+@lru_cache(maxsize=256)
+def dias(de: datetime, ate: datetime) -> tuple:
+    """Datas ISO (YYYY-MM-DD) de cada dia que cruza [de, ate)."""
+    dia, ultimo = de.date(), max(de, ate - timedelta(microseconds=1)).date()
+    resultado = []
+    while dia <= ultimo:
+        resultado.append(dia.isoformat())
+        dia += timedelta(days=1)
+    return tuple(resultado)
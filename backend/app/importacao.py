@@ -0,0 +1,280 @@
+"""Importação em massa de contatos e compromissos (arquivos do agenda.py ou NDJSON exportado).
+
+Os registros chegam já decodificados por `leitura.LeitorJSON`, são validados
+em partes de TAMANHO_PARTE e gravados com INSERTs de várias linhas; cada parte
+é confirmada em sua própria transação, então o progresso informado corresponde
+ao que já está no banco.
+
+Os arquivos JSON do agenda.py são só o último snapshot: as alterações feitas
+depois dele ficam no `agenda.jornal` ao lado, até a próxima compactação. Ao
+importar contatos.json ou compromissos.json pela linha de comando, o jornal
+encontrado ao lado é reaplicado sobre o snapshot durante a leitura.
+
+Uso pela linha de comando, a partir de backend/:
+
+    python -m app.importacao contatos ../contatos.json
+    python -m app.importacao compromissos ../compromissos.json
+"""
+from datetime import datetime
+from sqlalchemy import insert
+import asyncio
+import json
+import locale
+import os
+import sys
+from .cache import invalidar_colecao
+from .database import abrir_sessao
+from .datas import ler_data, ler_data_hora
+from .leitura import em_partes, ler_arquivo
+from .recorrencia import validar, validar_periodo
+from . import models
+
+TAMANHO_PARTE = 1000
+
+# Mensagens de erro guardadas por importação; as demais são apenas contadas
+MAXIMO_ERROS = 100
+
+TIPOS_IMPORTACAO = ("contatos", "compromissos")
+
+# Jornal que o agenda.py mantém ao lado de contatos.json e compromissos.json
+JORNAL_AGENDA = "agenda.jornal"
+
+
+def _data_criacao(valor):
+    # agenda.py grava DD/MM/YYYY HH:MM:SS; a exportação da API usa ISO 8601
+    if not valor:
+        return datetime.now()
+    try:
+        return datetime.strptime(valor, "%d/%m/%Y %H:%M:%S")
+    except ValueError:
+        return datetime.fromisoformat(valor)
+
+
+def _texto(registro, campo, obrigatorio=False):
+    valor = registro.get(campo)
+    if valor is None or valor == "":
+        if obrigatorio:
+            raise ValueError(f"Campo obrigatório ausente: {campo}")
+        return None
+    if not isinstance(valor, str):
+        raise ValueError(f"Campo {campo} deve ser texto")
+    return valor
+
+
+def converter_contato(registro: dict) -> dict:
+    return {
+        "nome": _texto(registro, "nome", obrigatorio=True),
+        "telefone": _texto(registro, "telefone", obrigatorio=True),
+        "email": _texto(registro, "email"),
+        "endereco": _texto(registro, "endereco"),
+        "data_criacao": _data_criacao(registro.get("data_criacao")),
+    }
+
+
+def converter_compromisso(registro: dict):
+    """Devolve (colunas do compromisso, colunas da regra ou None, datas de exceção)."""
+    data = _texto(registro, "data", obrigatorio=True)
+    inicio = ler_data_hora(data, _texto(registro, "hora_inicio", obrigatorio=True))
+    fim = None
+    if registro.get("hora_fim"):
+        fim = ler_data_hora(data, registro["hora_fim"])
+        if fim <= inicio:
+            raise ValueError("A hora de término deve ser posterior à hora de início")
+    participantes = registro.get("participantes") or []
+    if not isinstance(participantes, list) or not all(isinstance(p, str) for p in participantes):
+        raise ValueError("participantes deve ser uma lista de nomes")
+
+    campos = {
+        "titulo": _texto(registro, "titulo", obrigatorio=True),
+        "inicio": inicio,
+        "fim": fim,
+        "descricao": _texto(registro, "descricao"),
+        "participantes": participantes,
+        "data_criacao": _data_criacao(registro.get("data_criacao")),
+    }
+
+    recorrencia = registro.get("recorrencia")
+    if not recorrencia:
+        return campos, None, []
+    if not isinstance(recorrencia, dict):
+        raise ValueError("recorrencia deve ser um objeto JSON")
+    if "ate_data" not in recorrencia:
+        raise ValueError("Recorrência no formato antigo (uma linha por ocorrência); abra o arquivo no agenda.py para convertê-lo")
+    validar(recorrencia.get("tipo"), recorrencia.get("dias_semana"))
+    regra = {
+        "tipo": recorrencia["tipo"],
+        "ate_data": ler_data(recorrencia["ate_data"]),
+        "dias_semana": recorrencia.get("dias_semana"),
+    }
+    validar_periodo(inicio, regra["tipo"], regra["ate_data"], regra["dias_semana"])
+    excecoes = sorted({ler_data(d) for d in recorrencia.get("excecoes") or []})
+    return campos, regra, excecoes
+
+
+class Importacao:
+    def __init__(self, db, tipo: str):
+        if tipo not in TIPOS_IMPORTACAO:
+            raise ValueError(f"Tipo de importação inválido: {tipo} (use contatos ou compromissos)")
+        self.db = db
+        self.tipo = tipo
+        self.lidos = 0
+        self.importados = 0
+        self.total_erros = 0
+        self.erros = []
+
+    def progresso(self) -> dict:
+        return {
+            "tipo": self.tipo,
+            "lidos": self.lidos,
+            "importados": self.importados,
+            "total_erros": self.total_erros,
+            "erros": self.erros,
+        }
+
+    def _erro(self, posicao: int, mensagem: str):
+        self.total_erros += 1
+        if len(self.erros) < MAXIMO_ERROS:
+            self.erros.append({"registro": posicao, "erro": mensagem})
+
+    def erro_jornal(self, linha: int, mensagem: str):
+        self.total_erros += 1
+        if len(self.erros) < MAXIMO_ERROS:
+            self.erros.append({"jornal": linha, "erro": mensagem})
+
+    async def processar(self, registros: list):
+        """Valida e grava uma parte dos registros em uma transação."""
+        convertidos = []
+        for registro in registros:
+            posicao = self.lidos
+            self.lidos += 1
+            try:
+                if not isinstance(registro, dict):
+                    raise ValueError("Registro deve ser um objeto JSON")
+                if self.tipo == "contatos":
+                    convertidos.append(converter_contato(registro))
+                else:
+                    convertidos.append(converter_compromisso(registro))
+            except (ValueError, TypeError, AttributeError) as e:
+                self._erro(posicao, str(e))
+
+        if self.tipo == "contatos":
+            if convertidos:
+                await self.db.execute(insert(models.Contato.__table__), convertidos)
+        else:
+            await self._gravar_compromissos(convertidos)
+        await self.db.commit()
+        self.importados += len(convertidos)
+        if convertidos:
+            await invalidar_colecao(self.tipo)
+
+    async def _gravar_compromissos(self, convertidos: list):
+        avulsos = [campos for campos, regra, _ in convertidos if regra is None]
+        series = [item for item in convertidos if item[1] is not None]
+        if avulsos:
+            await self.db.execute(insert(models.Compromisso.__table__), avulsos)
+        if not series:
+            return
+
+        # Regras primeiro, na mesma ordem dos compromissos, para ligar cada série à sua regra
+        tabela_regras = models.Recorrencia.__table__
+        ids = (await self.db.execute(
+            insert(tabela_regras).returning(tabela_regras.c.id, sort_by_parameter_order=True),
+            [regra for _, regra, _ in series],
+        )).scalars().all()
+        await self.db.execute(
+            insert(models.Compromisso.__table__),
+            [{**campos, "recorrencia_id": id} for (campos, _, _), id in zip(series, ids)],
+        )
+        excecoes = [
+            {"recorrencia_id": id, "data": data}
+            for (_, _, datas), id in zip(series, ids) for data in datas
+        ]
+        if excecoes:
+            await self.db.execute(insert(models.RecorrenciaExcecao.__table__), excecoes)
+
+
+def _entrada_jornal(linha: bytes) -> dict:
+    # Como no agenda.py: UTF-8, ou a codificação do sistema nos jornais de versões antigas
+    try:
+        return json.loads(linha.decode("utf-8"))
+    except UnicodeDecodeError:
+        return json.loads(linha.decode(locale.getpreferredencoding(False)))
+
+
+def ler_jornal(caminho: str, tipo: str, erro=None) -> dict:
+    """Estado final, por id, dos registros de `tipo` alterados no jornal (None = excluído).
+
+    Linhas malformadas são puladas e informadas a `erro(numero_da_linha, mensagem)`.
+    """
+    alterados = {}
+    jornal = os.path.join(os.path.dirname(caminho), JORNAL_AGENDA)
+    if os.path.basename(caminho) != f"{tipo}.json" or not os.path.exists(jornal):
+        return alterados
+    with open(jornal, "rb") as arquivo:
+        for numero, linha in enumerate(arquivo, 1):
+            # Como no agenda.py, uma última linha truncada por queda é ignorada
+            if not linha.endswith(b"\n"):
+                break
+            try:
+                entrada = _entrada_jornal(linha)
+                if entrada["colecao"] != tipo:
+                    continue
+                if entrada["acao"] == "gravar":
+                    alterados[entrada["registro"]["id"]] = entrada["registro"]
+                else:
+                    alterados[entrada["id"]] = None
+            except ValueError as e:
+                if erro:
+                    erro(numero, f"JSON inválido: {e}")
+            except KeyError as e:
+                if erro:
+                    erro(numero, f"Entrada sem o campo {e}")
+            except TypeError:
+                if erro:
+                    erro(numero, "Entrada fora do formato do jornal")
+    return alterados
+
+
+def com_jornal(registros, alterados: dict):
+    """Substitui ou omite os registros alterados no jornal e acrescenta os novos no fim."""
+    for registro in registros:
+        id = registro.get("id") if isinstance(registro, dict) else None
+        if isinstance(id, int) and id in alterados:
+            registro = alterados.pop(id)
+            if registro is None:
+                continue
+        yield registro
+    yield from (registro for registro in alterados.values() if registro is not None)
+
+
+async def importar_arquivo(tipo: str, caminho: str, progresso=None) -> dict:
+    """Importa um arquivo JSON/NDJSON; `progresso(dict)` é chamado ao fim de cada parte."""
+    async with abrir_sessao() as db:
+        importacao = Importacao(db, tipo)
+        registros = com_jornal(ler_arquivo(caminho), ler_jornal(caminho, tipo, importacao.erro_jornal))
+        for parte in em_partes(registros, TAMANHO_PARTE):
+            await importacao.processar(parte)
+            if progresso:
+                progresso(importacao.progresso())
+        return importacao.progresso()
+
+
+def main(argumentos):
+    if len(argumentos) != 2 or argumentos[0] not in TIPOS_IMPORTACAO:
+        print("Uso: python -m app.importacao {contatos|compromissos} ARQUIVO")
+        return 2
+
+    def mostrar(progresso):
+        print(f"\r{progresso['lidos']} lidos, {progresso['importados']} importados, "
+              f"{progresso['total_erros']} com erro", end="", flush=True)
+
+    resultado = asyncio.run(importar_arquivo(argumentos[0], argumentos[1], mostrar))
+    print()
+    for erro in resultado["erros"]:
+        origem = f"Registro {erro['registro']}" if "registro" in erro else f"{JORNAL_AGENDA}, linha {erro['jornal']}"
+        print(f"{origem}: {erro['erro']}")
+    return 1 if resultado["total_erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
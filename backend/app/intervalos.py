@@ -0,0 +1,92 @@
+"""Consultas de sobreposição entre compromissos (conflitos e livre/ocupado).
+
+`IndiceIntervalos` é uma árvore de intervalos estática: os intervalos ficam
+ordenados pelo início e cada nó da árvore implícita guarda o maior término da
+sua subárvore, o que permite descartar ramos inteiros. Cada consulta custa
+O(log n + k).
+
+Os intervalos são meio-abertos, [início, fim), em datetimes; um
+compromisso sem término ocupa DURACAO_MINIMA (`fim_efetivo`). `unir` e
+`livres` montam as respostas de livre/ocupado a partir das ocupações já
+expandidas, na rota de disponibilidade e no agenda.py.
+"""
+from datetime import timedelta
+
+# Compromisso sem hora de término ocupa apenas o minuto de início
+DURACAO_MINIMA = timedelta(minutes=1)
+
+
+def fim_efetivo(inicio, fim=None):
+    return fim if fim is not None and fim > inicio else inicio + DURACAO_MINIMA
+
+
+class IndiceIntervalos:
+    def __init__(self, intervalos=()):
+        # intervalos: (inicio, fim, item)
+        self._intervalos = sorted(intervalos, key=lambda intervalo: intervalo[:2])
+        self._maior_fim = [None] * len(self._intervalos)
+        self._construir(0, len(self._intervalos))
+
+    def __len__(self):
+        return len(self._intervalos)
+
+    def _construir(self, inicio, fim):
+        if inicio >= fim:
+            return None
+        meio = (inicio + fim) // 2
+        maior = self._intervalos[meio][1]
+        for lado in (self._construir(inicio, meio), self._construir(meio + 1, fim)):
+            if lado is not None and lado > maior:
+                maior = lado
+        self._maior_fim[meio] = maior
+        return maior
+
+    def sobrepostos(self, de, ate):
+        """Gera, em ordem de início, os itens cujo intervalo [inicio, fim) cruza [de, ate)."""
+        pilha = [(0, len(self._intervalos))]
+        encontrados = []
+        while pilha:
+            inicio, fim = pilha.pop()
+            if inicio >= fim:
+                continue
+            meio = (inicio + fim) // 2
+            if self._maior_fim[meio] <= de:
+                # Nada nesta subárvore termina depois de `de`
+                continue
+            intervalo = self._intervalos[meio]
+            if intervalo[0] < ate:
+                if intervalo[1] > de:
+                    encontrados.append(meio)
+                pilha.append((meio + 1, fim))
+            pilha.append((inicio, meio))
+        for posicao in sorted(encontrados):
+            yield self._intervalos[posicao][2]
+
+
+def unir(intervalos):
+    """Une intervalos (inicio, fim) sobrepostos ou encostados, em uma varredura ordenada."""
+    unidos = []
+    for inicio, fim in sorted(intervalos):
+        if unidos and inicio <= unidos[-1][1]:
+            if fim > unidos[-1][1]:
+                unidos[-1][1] = fim
+        else:
+            unidos.append([inicio, fim])
+    return [tuple(intervalo) for intervalo in unidos]
+
+
+def livres(ocupados, de, ate):
+    """Lacunas de [de, ate) não cobertas pelos intervalos ocupados (já unidos e ordenados)."""
+    lacunas = []
+    atual = de
+    for inicio, fim in ocupados:
+        if fim <= atual:
+            continue
+        if inicio >= ate:
+            break
+        if inicio > atual:
+            lacunas.append((atual, inicio))
+        atual = max(atual, fim)
+    if atual < ate:
+        lacunas.append((atual, ate))
+    return lacunas
@@ -0,0 +1,69 @@
+"""Leitura incremental de arquivos JSON (array de objetos) ou NDJSON.
+
+Os objetos são decodificados à medida que os pedaços chegam, sem carregar o
+arquivo inteiro na memória. `LeitorJSON` não faz E/S: recebe texto já
+decodificado, seja do corpo de uma requisição (importação pela API) ou de um
+arquivo (`ler_arquivo`, usado pelo agenda.py e por app.importacao).
+"""
+import json
+
+# Separadores entre os objetos de um array JSON ou de um NDJSON
+_SEPARADORES = " \t\r\n,[]"
+
+# Um objeto maior que isso sem conseguir ser decodificado é considerado inválido
+TAMANHO_MAXIMO_OBJETO = 1 << 20
+
+
+class LeitorJSON:
+    def __init__(self):
+        self._buffer = ""
+        self._decodificador = json.JSONDecoder()
+
+    def alimentar(self, texto):
+        """Recebe mais um pedaço do texto e devolve os objetos completos encontrados."""
+        buffer = self._buffer + texto
+        objetos = []
+        posicao = 0
+        while True:
+            while posicao < len(buffer) and buffer[posicao] in _SEPARADORES:
+                posicao += 1
+            if posicao >= len(buffer):
+                break
+            try:
+                objeto, posicao = self._decodificador.raw_decode(buffer, posicao)
+            except ValueError:
+                # Objeto ainda incompleto: espera o próximo pedaço
+                if len(buffer) - posicao > TAMANHO_MAXIMO_OBJETO:
+                    raise ValueError(f"JSON inválido perto de: {buffer[posicao:posicao + 80]!r}")
+                break
+            objetos.append(objeto)
+        self._buffer = buffer[posicao:]
+        return objetos
+
+    def finalizar(self):
+        if self._buffer.strip(_SEPARADORES):
+            raise ValueError(f"JSON incompleto no fim da entrada: {self._buffer[:80]!r}")
+
+
+def ler_arquivo(caminho, tamanho_pedaco=1 << 16):
+    """Gera os objetos de um arquivo JSON ou NDJSON, lendo-o em pedaços."""
+    leitor = LeitorJSON()
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        while True:
+            pedaco = arquivo.read(tamanho_pedaco)
+            if not pedaco:
+                break
+            yield from leitor.alimentar(pedaco)
+    leitor.finalizar()
+
+
+def em_partes(iteravel, tamanho):
+    """Agrupa um iterável em listas de até `tamanho` itens."""
+    parte = []
+    for item in iteravel:
+        parte.append(item)
+        if len(parte) >= tamanho:
+            yield parte
+            parte = []
+    if parte:
+        yield parte
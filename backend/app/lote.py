@@ -0,0 +1,115 @@
+"""Operações em lote (upsert/delete) aplicadas em uma única transação.
+
+Cada operação recebe um resultado próprio; operações inválidas (inclusive as
+que não passam na validação do schema) são recusadas individualmente sem
+impedir as demais. As gravações usam INSERT de várias
+linhas (ON CONFLICT (id) DO UPDATE quando o id é informado) e as exclusões um
+único DELETE ... WHERE id = ANY(...).
+"""
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import Integer, any_, bindparam, cast, delete, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, REGCLASS, insert
+
+LIMITE_LOTE = 10000
+
+
+def preparar(operacoes, modelo, converter):
+    """Separa as operações em (upserts, exclusoes, resultados).
+
+    Cada operação chega como recebida e é validada com `modelo` (OperacaoContato,
+    OperacaoCompromisso). `converter(dados)` devolve o que será gravado ou lança
+    ValueError/HTTPException; as falhas já entram em `resultados` (indice -> resultado).
+    """
+    if len(operacoes) > LIMITE_LOTE:
+        raise HTTPException(status_code=413, detail=f"O lote excede o limite de {LIMITE_LOTE} operações")
+
+    upserts, exclusoes, resultados = [], [], {}
+    vistos = set()
+    for indice, bruta in enumerate(operacoes):
+        try:
+            operacao = modelo.model_validate(bruta)
+        except ValidationError as e:
+            id = bruta.get("id") if isinstance(bruta, dict) else None
+            resultados[indice] = _erro(indice, id if isinstance(id, int) else None, _mensagem(e))
+            continue
+        try:
+            if operacao.id is not None:
+                # ON CONFLICT não pode alterar a mesma linha duas vezes no mesmo comando
+                if operacao.id in vistos:
+                    raise ValueError("Operação repetida para o mesmo id no lote")
+                vistos.add(operacao.id)
+            if operacao.acao == "delete":
+                if operacao.id is None:
+                    raise ValueError("Informe o id a excluir")
+                exclusoes.append((indice, operacao.id))
+            else:
+                if operacao.dados is None:
+                    raise ValueError("Informe os dados a gravar")
+                upserts.append((indice, operacao.id, converter(operacao.dados)))
+        except ValueError as e:
+            resultados[indice] = _erro(indice, operacao.id, str(e))
+        except HTTPException as e:
+            resultados[indice] = _erro(indice, operacao.id, e.detail)
+    return upserts, exclusoes, resultados
+
+
+async def gravar(db, tabela, upserts, resultados):
+    """Insere as operações sem id e faz upsert das que têm id, uma instrução para cada grupo."""
+    novos = [(indice, campos) for indice, id, campos in upserts if id is None]
+    if novos:
+        stmt = insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True)
+        linhas = (await db.execute(stmt, [campos for _, campos in novos])).all()
+        for (indice, _), linha in zip(novos, linhas):
+            resultados[indice] = {"indice": indice, "id": linha.id, "status": "criado"}
+
+    existentes = [(indice, {**campos, "id": id}) for indice, id, campos in upserts if id is not None]
+    if existentes:
+        # Ids do cliente e inserções pela sequência não podem se cruzar até o setval abaixo:
+        # o lock bloqueia os INSERTs concorrentes (e outros lotes com id) até o commit
+        await db.execute(text(f"LOCK TABLE {tabela.name} IN SHARE ROW EXCLUSIVE MODE"))
+        stmt = insert(tabela)
+        colunas = [nome for nome in existentes[0][1] if nome not in ("id", "data_criacao")]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tabela.c.id],
+            set_={nome: stmt.excluded[nome] for nome in colunas},
+        ).returning(tabela.c.id, literal_column("xmax = 0").label("inserido"), sort_by_parameter_order=True)
+        linhas = (await db.execute(stmt, [campos for _, campos in existentes])).all()
+        for (indice, _), linha in zip(existentes, linhas):
+            resultados[indice] = {"indice": indice, "id": linha.id, "status": "criado" if linha.inserido else "atualizado"}
+        if any(linha.inserido for linha in linhas):
+            # Ids informados pelo cliente não passam pela sequência; evita colisões nas próximas
+            # inserções sem nunca recuar a sequência (ela pode estar à frente do maior id)
+            sequencia = func.pg_get_serial_sequence(tabela.name, "id")
+            await db.execute(select(func.setval(sequencia, func.greatest(
+                select(func.max(tabela.c.id)).scalar_subquery(),
+                func.pg_sequence_last_value(cast(sequencia, REGCLASS)),
+            ))))
+
+
+async def excluir(db, tabela, exclusoes, resultados, *colunas):
+    """Exclui em um único comando e devolve as linhas excluídas (id e `colunas`)."""
+    if not exclusoes:
+        return []
+    ids = bindparam("ids", [id for _, id in exclusoes], type_=ARRAY(Integer))
+    stmt = delete(tabela).where(tabela.c.id == any_(ids))
+    linhas = (await db.execute(stmt.returning(tabela.c.id, *colunas))).all()
+    excluidos = {linha.id for linha in linhas}
+    for indice, id in exclusoes:
+        if id in excluidos:
+            resultados[indice] = {"indice": indice, "id": id, "status": "excluido"}
+        else:
+            resultados[indice] = _erro(indice, id, "Registro não encontrado")
+    return linhas
+
+
+def ordenar(resultados):
+    return [resultados[indice] for indice in sorted(resultados)]
+
+
+def _mensagem(erro):
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'operação'}: {e['msg']}" for e in erro.errors())
+
+
+def _erro(indice, id, mensagem):
+    return {"indice": indice, "id": id, "status": "erro", "erro": mensagem}
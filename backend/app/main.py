@@ -1,13 +1,38 @@
+from contextlib import asynccontextmanager
+import logging
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_fastapi_instrumentator import Instrumentator
-from .database import engine, Base
-from .routers import contatos, compromissos
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import configure_mappers
+from .database import aquecer, async_engine, engine, fechar_engines
+from .metricas import AQUECIMENTO, WORKER, MedirRequisicao, instrumentar_consultas, instrumentar_pool
+from .routers import contatos, compromissos, disponibilidade, exportacao, importacao, saude
 
-# Cria as tabelas no banco de dados
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Agenda API")
+async def _aquecer_consultas(db):
+    await compromissos.aquecer(db)
+    await contatos.aquecer(db)
+
+# O esquema do banco é das migrações (alembic upgrade head): importar a aplicação não
+# abre conexões, e cada worker só fala com o banco no aquecimento abaixo.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    inicio = time.perf_counter()
+    configure_mappers()
+    try:
+        # Abre as conexões do pool e compila as consultas mais usadas antes da primeira requisição
+        await aquecer(_aquecer_consultas)
+    except (OSError, SQLAlchemyError) as e:
+        # Sem banco o worker sobe assim mesmo; /health/ready responde 503 até ele voltar
+        logger.warning("Aquecimento do banco falhou: %s", e)
+    AQUECIMENTO.labels(WORKER).set(time.perf_counter() - inicio)
+    yield
+    await fechar_engines()
+
+app = FastAPI(title="Agenda API", lifespan=lifespan)
 
 # Configuração do CORS
 app.add_middleware(
@@ -19,11 +44,22 @@ app.add_middleware(
 )
 
 # Configuração do Prometheus
-Instrumentator().instrument(app).expose(app)
+Instrumentator(excluded_handlers=["/health/.*"]).instrument(app).expose(app)
+# Gauges do pool de conexões do worker, expostos no mesmo /metrics
+engine_ativo = async_engine.sync_engine if async_engine is not None else engine
+instrumentar_pool(engine_ativo)
+# Consultas, duração e linhas por comando SQL e por rota
+instrumentar_consultas(engine_ativo)
+app.add_middleware(MedirRequisicao)
 
 # Rotas
 app.include_router(contatos.router, prefix="/api/contatos", tags=["contatos"])
 app.include_router(compromissos.router, prefix="/api/compromissos", tags=["compromissos"])
+app.include_router(disponibilidade.router, prefix="/api/disponibilidade", tags=["disponibilidade"])
+app.include_router(exportacao.router, prefix="/api/export", tags=["exportacao"])
+app.include_router(importacao.router, prefix="/api/import", tags=["importacao"])
+# Liveness e readiness para o orquestrador
+app.include_router(saude.router, prefix="/health", tags=["saude"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,177 @@
+"""Métricas Prometheus próprias da aplicação.
+
+Registradas no registry padrão do prometheus_client, são expostas no mesmo
+/metrics configurado pelo Instrumentator em main.py.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.routing import Match
+
+# Cada worker do uvicorn/gunicorn tem seu próprio pool
+WORKER = str(os.getpid())
+
+POOL_TAMANHO = Gauge(
+    "agenda_db_pool_size", "Tamanho configurado do pool de conexões", ["worker"]
+)
+POOL_EM_USO = Gauge(
+    "agenda_db_pool_checked_out", "Conexões do pool em uso (checked out)", ["worker"]
+)
+POOL_OVERFLOW = Gauge(
+    "agenda_db_pool_overflow", "Conexões abertas além do pool_size (overflow)", ["worker"]
+)
+POOL_ESPERA = Histogram(
+    "agenda_db_pool_checkout_wait_seconds",
+    "Tempo para obter uma conexão do pool",
+    ["worker"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_TIMEOUTS = Counter(
+    "agenda_db_pool_checkout_timeouts_total", "Checkouts que estouraram o pool_timeout", ["worker"]
+)
+AQUECIMENTO = Gauge(
+    "agenda_startup_warmup_seconds", "Duração do aquecimento do pool e das consultas na partida do worker", ["worker"]
+)
+CACHE_CONSULTAS = Counter(
+    "agenda_cache_requests_total", "Consultas ao cache de respostas das listagens", ["worker", "resultado"]
+)
+
+# Por requisição, rotuladas pelo template da rota (/api/compromissos/{compromisso_id})
+LATENCIAS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_CONSULTAS_POR_REQUISICAO = Histogram(
+    "agenda_db_queries_per_request", "Comandos SQL executados por requisição", ["worker", "rota", "metodo"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 250, 1000),
+)
+DB_TEMPO_POR_REQUISICAO = Histogram(
+    "agenda_db_time_per_request_seconds", "Tempo total no banco por requisição", ["worker", "rota", "metodo"],
+    buckets=LATENCIAS,
+)
+DB_CONSULTA = Histogram(
+    "agenda_db_query_duration_seconds", "Duração de cada comando SQL", ["worker", "rota", "operacao"],
+    buckets=LATENCIAS,
+)
+DB_LINHAS = Histogram(
+    "agenda_db_rows_returned", "Linhas devolvidas por cada SELECT (ou RETURNING)", ["worker", "rota"],
+    buckets=(0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000),
+)
+EXPANSAO = Histogram(
+    "agenda_recurrence_expansion_seconds", "Expansão das séries e intercalação com os avulsos", ["worker", "rota"],
+    buckets=LATENCIAS,
+)
+SERIALIZACAO = Histogram(
+    "agenda_serialization_seconds", "Conversão das listagens em JSON", ["worker", "rota"],
+    buckets=LATENCIAS,
+)
+
+
+class _MedirEspera:
+    """Mede o tempo de espera do checkout, incluindo a abertura de conexões de overflow."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.labels(WORKER).inc()
+            raise
+        finally:
+            POOL_ESPERA.labels(WORKER).observe(time.perf_counter() - inicio)
+
+
+class PoolMedido(_MedirEspera, QueuePool):
+    pass
+
+
+class PoolAssincronoMedido(_MedirEspera, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrumentar_pool(engine) -> None:
+    """Lê o estado do pool do engine (síncrono) no momento de cada coleta do /metrics."""
+    # engine.pool é consultado a cada leitura, pois dispose() troca o pool
+    POOL_TAMANHO.labels(WORKER).set_function(lambda: engine.pool.size())
+    POOL_EM_USO.labels(WORKER).set_function(lambda: engine.pool.checkedout())
+    POOL_OVERFLOW.labels(WORKER).set_function(lambda: max(0, engine.pool.overflow()))
+
+
+class _Requisicao:
+    __slots__ = ("rota", "consultas", "tempo_db")
+
+    def __init__(self, rota: str):
+        self.rota = rota
+        self.consultas = 0
+        self.tempo_db = 0.0
+
+
+# Requisição em andamento; as sessões síncronas herdam o contexto no threadpool
+_REQUISICAO: ContextVar = ContextVar("agenda_requisicao", default=None)
+_SEM_REQUISICAO = _Requisicao("sem_requisicao")
+
+
+def _rota(scope) -> str:
+    for route in scope["app"].routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return route.path
+    return "sem_rota"
+
+
+class MedirRequisicao:
+    """Middleware ASGI que acumula as consultas ao banco de cada requisição, por template da rota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        requisicao = _Requisicao(_rota(scope))
+        token = _REQUISICAO.set(requisicao)
+        try:
+            # Respostas em streaming (exportação, importação) consultam o banco até o fim do corpo
+            await self.app(scope, receive, send)
+        finally:
+            _REQUISICAO.reset(token)
+            rotulos = (WORKER, requisicao.rota, scope["method"])
+            DB_CONSULTAS_POR_REQUISICAO.labels(*rotulos).observe(requisicao.consultas)
+            DB_TEMPO_POR_REQUISICAO.labels(*rotulos).observe(requisicao.tempo_db)
+
+
+def rota_atual() -> str:
+    return (_REQUISICAO.get() or _SEM_REQUISICAO).rota
+
+
+@contextmanager
+def cronometrar(histograma):
+    """Observa no histograma (EXPANSAO, SERIALIZACAO) a duração do bloco, rotulada pela rota atual."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        histograma.labels(WORKER, rota_atual()).observe(time.perf_counter() - inicio)
+
+
+def instrumentar_consultas(engine) -> None:
+    """Mede cada comando SQL executado pelo engine (síncrono) e o soma à requisição em andamento."""
+
+    # O início fica no contexto de execução do próprio comando: um comando que falha
+    # (e não chega ao after_cursor_execute) não afeta a medição dos seguintes
+    @event.listens_for(engine, "before_cursor_execute")
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        context.inicio_consulta = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def depois(conn, cursor, statement, parameters, context, executemany):
+        duracao = time.perf_counter() - context.inicio_consulta
+        requisicao = _REQUISICAO.get() or _SEM_REQUISICAO
+        requisicao.consultas += 1
+        requisicao.tempo_db += duracao
+        operacao = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+        DB_CONSULTA.labels(WORKER, requisicao.rota, operacao).observe(duracao)
+        # Cursores no servidor (exportação) não informam o total antes de serem lidos
+        if cursor.description is not None and cursor.rowcount >= 0:
+            DB_LINHAS.labels(WORKER, requisicao.rota).observe(cursor.rowcount)
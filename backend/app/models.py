@@ -1,10 +1,22 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, JSON, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from .database import Base
+from .datas import formatar_data, formatar_hora
 from datetime import datetime
 
+# Os índices de busca (gin_trgm_ops) dependem da extensão pg_trgm, criada pela migração 0005
+def _indice_trigramas(tabela, coluna):
+    return Index(f"ix_{tabela}_{coluna}_trgm", coluna, postgresql_using="gin", postgresql_ops={coluna: "gin_trgm_ops"})
+
 class Contato(Base):
     __tablename__ = "contatos"
+    __table_args__ = (
+        # Paginação por cursor ordenada por (nome, id)
+        Index("ix_contatos_nome_id", "nome", "id"),
+        _indice_trigramas("contatos", "nome"),
+        _indice_trigramas("contatos", "telefone"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, index=True)
@@ -13,15 +25,72 @@ class Contato(Base):
     endereco = Column(String)
     data_criacao = Column(DateTime, default=datetime.now)
 
+class Recorrencia(Base):
+    """Regra de uma série recorrente; as ocorrências são expandidas sob demanda."""
+    __tablename__ = "recorrencias"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String, nullable=False)
+    dias_semana = Column(JSON)
+    ate_data = Column(Date, nullable=False)
+
+    excecoes = relationship("RecorrenciaExcecao", cascade="all, delete-orphan", lazy="selectin")
+
+class RecorrenciaExcecao(Base):
+    """Ocorrência removida da série, opcionalmente substituída por um compromisso avulso."""
+    __tablename__ = "recorrencia_excecoes"
+    __table_args__ = (
+        UniqueConstraint("recorrencia_id", "data"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recorrencia_id = Column(Integer, ForeignKey("recorrencias.id", ondelete="CASCADE"), nullable=False)
+    data = Column(Date, nullable=False)
+    substituto_id = Column(Integer, ForeignKey("compromissos.id", ondelete="SET NULL"))
+
 class Compromisso(Base):
     __tablename__ = "compromissos"
+    __table_args__ = (
+        # Permite range scan ordenado por início (inicio >= :a AND inicio < :b ORDER BY inicio)
+        Index("ix_compromissos_inicio_id", "inicio", "id"),
+        _indice_trigramas("compromissos", "titulo"),
+        _indice_trigramas("compromissos", "descricao"),
+        # Agenda por participante: participantes @> '["Nome"]'
+        Index("ix_compromissos_participantes", "participantes", postgresql_using="gin",
+              postgresql_ops={"participantes": "jsonb_path_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     titulo = Column(String, index=True)
-    data = Column(String)
-    hora_inicio = Column(String)
-    hora_fim = Column(String)
+    inicio = Column(DateTime, nullable=False)
+    fim = Column(DateTime)
     descricao = Column(String)
-    participantes = Column(JSON)
-    recorrencia = Column(JSON)
-    data_criacao = Column(DateTime, default=datetime.now) 
\ No newline at end of file
+    participantes = Column(JSONB)
+    recorrencia_id = Column(Integer, ForeignKey("recorrencias.id", ondelete="CASCADE"), index=True)
+    data_criacao = Column(DateTime, default=datetime.now)
+
+    regra = relationship("Recorrencia", lazy="joined")
+
+    # Campos no formato da API (DD/MM/YYYY e HH:MM), derivados dos timestamps
+    @property
+    def data(self):
+        return formatar_data(self.inicio)
+
+    @property
+    def hora_inicio(self):
+        return formatar_hora(self.inicio)
+
+    @property
+    def hora_fim(self):
+        return formatar_hora(self.fim) if self.fim else None
+
+    @property
+    def recorrencia(self):
+        if self.regra is None:
+            return None
+        return {
+            'tipo': self.regra.tipo,
+            'ate_data': formatar_data(self.regra.ate_data),
+            'dias_semana': self.regra.dias_semana,
+            'grupo_id': str(self.recorrencia_id),
+        }
@@ -0,0 +1,37 @@
+"""Paginação por cursor (keyset) para as listagens da API.
+
+O cursor é opaco para o cliente: codifica os valores da chave de ordenação do
+último item da página, de modo que a próxima página é buscada com
+WHERE (chave) > (cursor) e custa o mesmo que a primeira.
+"""
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+# Limite rígido de itens por página, independente do que o cliente pedir
+LIMITE_PAGINA = 200
+
+
+def limitar(limit: int) -> int:
+    return max(1, min(limit, LIMITE_PAGINA))
+
+
+def codificar_cursor(*valores) -> str:
+    dados = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, *tipos):
+    """Decodifica o cursor convertendo cada valor com o tipo correspondente (str, int ou datetime)."""
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if len(dados) != len(tipos):
+            raise ValueError
+        return tuple(
+            datetime.fromisoformat(valor) if tipo is datetime else tipo(valor)
+            for tipo, valor in zip(tipos, dados)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
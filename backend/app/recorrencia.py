@@ -0,0 +1,108 @@
+"""Expansão de compromissos recorrentes.
+
+Uma série é guardada uma única vez como regra (tipo, dias_semana, ate_data e
+datas excluídas); as ocorrências são geradas sob demanda, apenas dentro da
+janela pedida.
+
+As listagens, os conflitos e o resumo da API expandem as regras lidas do banco
+com `ocorrencias`; o agenda.py faz o mesmo com as regras dos seus arquivos.
+`validar` é a checagem única de tipo e dias_semana usada na criação pela API,
+na importação e no agenda.py.
+"""
+from calendar import monthrange
+from datetime import datetime, timedelta
+
+TIPOS = ('diaria', 'semanal', 'dias_especificos', 'mensal')
+
+_UM_DIA = timedelta(days=1)
+
+
+def validar(tipo, dias_semana=None):
+    """Confere o tipo e os dias da semana (0=segunda a 6=domingo) de uma regra; levanta ValueError."""
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de recorrência inválido: {tipo}")
+    if dias_semana is not None and (
+        not isinstance(dias_semana, list)
+        or not all(isinstance(dia, int) and not isinstance(dia, bool) and 0 <= dia <= 6 for dia in dias_semana)
+    ):
+        raise ValueError("dias_semana deve ser uma lista de números de 0 (segunda) a 6 (domingo)")
+    if tipo == 'dias_especificos' and not dias_semana:
+        raise ValueError("Recorrência em dias específicos exige ao menos um dia da semana")
+
+
+def _somar_meses(data, meses, dia):
+    """Avança `meses` mantendo o dia original, limitado ao último dia do mês."""
+    ano, mes = divmod(data.month - 1 + meses, 12)
+    ano += data.year
+    mes += 1
+    return data.replace(year=ano, month=mes, day=min(dia, monthrange(ano, mes)[1]))
+
+
+def _candidatas(inicio, tipo, dias_semana, de, ate_data, ate):
+    """Gera datas candidatas em ordem, começando já perto de `de` quando possível.
+
+    O laço de dias_especificos para sozinho em `ate_data`/`ate`: sem isso, uma
+    regra cujos dias nunca ocorrem percorreria o calendário até estourar.
+    """
+    if tipo in ('diaria', 'semanal'):
+        passo = _UM_DIA if tipo == 'diaria' else timedelta(days=7)
+        atual = inicio
+        if de is not None and de > inicio:
+            # Salta direto para a primeira ocorrência >= de
+            atual = inicio + passo * -((inicio - de) // passo)
+        while True:
+            yield atual
+            atual += passo
+
+    elif tipo == 'mensal':
+        n = 0
+        if de is not None and de > inicio:
+            n = max(0, (de.year - inicio.year) * 12 + de.month - inicio.month - 1)
+        while True:
+            yield _somar_meses(inicio, n, inicio.day)
+            n += 1
+
+    elif tipo == 'dias_especificos':
+        # A data inicial sempre faz parte da série; depois, apenas os dias da semana escolhidos
+        yield inicio
+        dias = {dia for dia in dias_semana or () if isinstance(dia, int) and 0 <= dia <= 6}
+        if not dias:
+            return
+        atual = inicio + _UM_DIA
+        if de is not None and de.date() > atual.date():
+            atual = datetime.combine(de.date(), inicio.time())
+        while atual.date() <= ate_data and (ate is None or atual < ate):
+            if atual.weekday() in dias:
+                yield atual
+            atual += _UM_DIA
+
+    else:
+        raise ValueError(f"Tipo de recorrência inválido: {tipo}")
+
+
+def ocorrencias(inicio, tipo, ate_data, dias_semana=None, excecoes=(), de=None, ate=None):
+    """Gera, em ordem, o início de cada ocorrência da série com início em [de, ate).
+
+    `ate_data` (date) é inclusivo; `excecoes` é uma coleção de datas (date)
+    de ocorrências removidas ou substituídas.
+    """
+    excecoes = set(excecoes)
+    for atual in _candidatas(inicio, tipo, dias_semana, de, ate_data, ate):
+        if atual.date() > ate_data or (ate is not None and atual >= ate):
+            return
+        if (de is None or atual >= de) and atual.date() not in excecoes:
+            yield atual
+
+
+def validar_periodo(inicio, tipo, ate_data, dias_semana=None):
+    """Recusa séries sem nenhuma ocorrência, que não apareceriam em listagem alguma; levanta ValueError."""
+    if ate_data < inicio.date():
+        raise ValueError("A data final da recorrência é anterior à data do compromisso")
+    if next(ocorrencias(inicio, tipo, ate_data, dias_semana), None) is None:
+        raise ValueError("A recorrência não tem nenhuma ocorrência até a data final")
+
+
+def contem(inicio, tipo, ate_data, dias_semana=None, excecoes=(), data=None):
+    """Indica se a série possui uma ocorrência na data (date) informada."""
+    dia = datetime.combine(data, datetime.min.time())
+    return any(True for _ in ocorrencias(inicio, tipo, ate_data, dias_semana, excecoes, dia, dia + _UM_DIA))
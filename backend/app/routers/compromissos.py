@@ -1,154 +1,521 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from sqlalchemy import case, delete, func, insert, literal, literal_column, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from typing import Any, List, Literal, Optional, Union
+from datetime import date, datetime, timedelta
+from itertools import islice
+import heapq
+from ..busca import filtro, relevancia
+from ..datas import PERIODO_INVALIDO, PERIODO_MAXIMO, formatar_data, inicio_do_dia, janela, ler_data, ler_data_hora, ler_hora
 from ..database import get_db
-from .. import models, schemas
+from ..intervalos import DURACAO_MINIMA, IndiceIntervalos, fim_efetivo
+from ..paginacao import codificar_cursor, decodificar_cursor, limitar
+from .. import cache, lote, metricas, models, schemas, serializacao
+from ..recorrencia import contem, ocorrencias, validar, validar_periodo
 
 router = APIRouter()
 
-@router.post("/", response_model=schemas.Compromisso)
-def criar_compromisso(compromisso: schemas.CompromissoCreate, db: Session = Depends(get_db)):
+# Granularidade do resumo -> unidade do date_trunc do PostgreSQL (semanas começam na segunda)
+UNIDADES_RESUMO = {"dia": "day", "semana": "week", "mes": "month"}
+
+def _campos_modelo(compromisso: schemas.CompromissoCreate, data: str = None) -> dict:
+    """Converte os campos de texto da API (DD/MM/YYYY, HH:MM) nas colunas inicio/fim."""
+    dados = compromisso.dict(exclude={'data', 'hora_inicio', 'hora_fim', 'recorrencia'})
+    data = data or compromisso.data
+    dados['inicio'] = ler_data_hora(data, compromisso.hora_inicio)
+    dados['fim'] = None
+    if compromisso.hora_fim:
+        dados['fim'] = ler_data_hora(data, compromisso.hora_fim)
+    return dados
+
+def _campos_regra(recorrencia: schemas.Recorrencia, inicio: datetime = None) -> dict:
+    """Converte a recorrência recebida pela API nos campos de models.Recorrencia.
+
+    Com `inicio` (criação da série), recusa também regras sem nenhuma ocorrência.
+    """
+    ate_data = ler_data(recorrencia.ate_data)
+    try:
+        validar(recorrencia.tipo, recorrencia.dias_semana)
+        if inicio is not None:
+            validar_periodo(inicio, recorrencia.tipo, ate_data, recorrencia.dias_semana)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        'tipo': recorrencia.tipo,
+        'ate_data': ate_data,
+        'dias_semana': recorrencia.dias_semana,
+    }
+
+async def _inserir(db: AsyncSession, campos: dict, regra: dict = None):
+    """Grava o compromisso e, se houver, a regra da série em um único INSERT ... RETURNING."""
+    tabela = models.Compromisso.__table__
+    if regra is None:
+        stmt = insert(tabela).values(**campos)
+    else:
+        # WITH regra AS (INSERT INTO recorrencias ... RETURNING id) INSERT INTO compromissos ... SELECT
+        nova_regra = (
+            insert(models.Recorrencia.__table__).values(**regra)
+            .returning(models.Recorrencia.__table__.c.id).cte("nova_regra")
+        )
+        stmt = insert(tabela).from_select(
+            [*campos, "recorrencia_id"],
+            select(*[literal(valor, tabela.c[nome].type) for nome, valor in campos.items()], nova_regra.c.id),
+        )
+    return (await db.execute(stmt.returning(tabela.c.id, tabela.c.recorrencia_id))).one()
+
+async def _atualizar_serie(db: AsyncSession, compromisso_id: int, compromisso: schemas.CompromissoCreate):
+    """Altera a série com UPDATE direto nas tabelas, sem carregar o compromisso base e a regra.
+
+    Mantém a data inicial da série. Retorna o id da regra, ou None se o compromisso não for uma série.
+    """
+    tabela = models.Compromisso.__table__
+    campos = compromisso.dict(exclude={'data', 'hora_inicio', 'hora_fim', 'recorrencia'})
+    dia = func.date_trunc('day', tabela.c.inicio)
+    hora_inicio = ler_hora(compromisso.hora_inicio)
+    campos['inicio'] = dia + timedelta(hours=hora_inicio.hour, minutes=hora_inicio.minute)
+    campos['fim'] = None
+    if compromisso.hora_fim:
+        hora_fim = ler_hora(compromisso.hora_fim)
+        campos['fim'] = dia + timedelta(hours=hora_fim.hour, minutes=hora_fim.minute)
+    stmt = (
+        update(tabela).where(tabela.c.id == compromisso_id, tabela.c.recorrencia_id.is_not(None))
+        .values(**campos).returning(tabela.c.recorrencia_id)
+    )
+    if compromisso.recorrencia:
+        # WITH serie AS (UPDATE compromissos ... RETURNING recorrencia_id) UPDATE recorrencias ... FROM serie
+        regras = models.Recorrencia.__table__
+        serie = stmt.cte("serie")
+        stmt = (
+            update(regras).where(regras.c.id == serie.c.recorrencia_id)
+            .values(**_campos_regra(compromisso.recorrencia)).returning(regras.c.id)
+        )
+    return (await db.execute(stmt)).scalar()
+
+def _expandir(comp: models.Compromisso, de: datetime = None, ate: datetime = None):
+    """Gera (inicio, id, ocorrência) para cada ocorrência da série com início em [de, ate).
+
+    A ocorrência já é o dicionário no formato de schemas.Compromisso (ver serializacao).
+    """
+    regra = comp.regra
+    duracao = comp.fim - comp.inicio if comp.fim else None
+    excecoes = [e.data for e in regra.excecoes]
+    recorrencia = serializacao.recorrencia(comp.recorrencia_id, regra.tipo, regra.ate_data, regra.dias_semana)
+    for inicio in ocorrencias(comp.inicio, regra.tipo, regra.ate_data, regra.dias_semana, excecoes, de, ate):
+        yield inicio, comp.id, serializacao.compromisso(
+            comp.id, comp.titulo, inicio, inicio + duracao if duracao is not None else None,
+            comp.descricao, comp.participantes, comp.data_criacao, recorrencia,
+        )
+
+async def ocupacao(db: AsyncSession, de: datetime, ate: datetime, *condicoes) -> list:
+    """(inicio, fim, ocorrência) de cada compromisso avulso ou ocorrência de série que cruza [de, ate)."""
+    # O término é sempre no mesmo dia do início: basta buscar inícios a partir de um dia antes de `de`
+    desde = de - timedelta(days=1)
+    avulsos = select(*serializacao.COLUNAS_COMPROMISSO).where(
+        models.Compromisso.recorrencia_id.is_(None),
+        models.Compromisso.inicio >= desde,
+        models.Compromisso.inicio < ate,
+        *condicoes,
+    )
+    series = (
+        select(models.Compromisso)
+        .join(models.Compromisso.regra)
+        .options(contains_eager(models.Compromisso.regra))
+        .where(models.Compromisso.inicio < ate, models.Recorrencia.ate_data >= desde.date(), *condicoes)
+    )
+    itens = [
+        (linha.inicio, fim_efetivo(linha.inicio, linha.fim), serializacao.compromisso(*linha))
+        for linha in (await db.execute(avulsos)).all()
+    ]
+    series = (await db.scalars(series)).all()
+    with metricas.cronometrar(metricas.EXPANSAO):
+        for comp in series:
+            duracao = fim_efetivo(comp.inicio, comp.fim) - comp.inicio
+            itens.extend((inicio, inicio + duracao, ocorrencia) for inicio, _, ocorrencia in _expandir(comp, desde, ate))
+    return [item for item in itens if item[1] > de]
+
+async def _conflitos(db: AsyncSession, compromisso: schemas.CompromissoCreate, campos: dict, regra: dict = None,
+                     ignorar_id: int = None) -> list:
+    """Ocorrências existentes que se sobrepõem a alguma ocorrência do compromisso proposto."""
+    duracao = fim_efetivo(campos['inicio'], campos['fim']) - campos['inicio']
+    inicios = [campos['inicio']]
+    if regra:
+        inicios = list(ocorrencias(campos['inicio'], regra['tipo'], regra['ate_data'], regra['dias_semana']))
+    if not inicios:
+        return []
+
+    condicoes = [models.Compromisso.id != ignorar_id] if ignorar_id else []
+    indice = IndiceIntervalos(await ocupacao(db, inicios[0], inicios[-1] + duracao, *condicoes))
+    conflitos = []
+    for inicio in inicios:
+        for existente in indice.sobrepostos(inicio, inicio + duracao):
+            conflitos.append(schemas.Conflito(
+                data=formatar_data(inicio),
+                hora_inicio=compromisso.hora_inicio,
+                hora_fim=compromisso.hora_fim,
+                compromisso=existente,
+            ))
+    return conflitos
+
+def _excluir_ocorrencia(comp: models.Compromisso, ocorrencia: Optional[str]) -> models.RecorrenciaExcecao:
+    """Registra uma exceção na série para a ocorrência informada (DD/MM/YYYY)."""
+    regra = comp.regra
+    data = ler_data(ocorrencia or comp.data)
+    excecoes = [e.data for e in regra.excecoes]
+    if not contem(comp.inicio, regra.tipo, regra.ate_data, regra.dias_semana, excecoes, data):
+        raise HTTPException(status_code=404, detail="Ocorrência não encontrada na série")
+    excecao = models.RecorrenciaExcecao(data=data)
+    regra.excecoes.append(excecao)
+    return excecao
+
+async def _invalidar(*inicios):
+    """Invalida as listagens em cache dos dias alterados; sem data (séries), todas as listagens."""
+    if None in inicios:
+        await cache.invalidar_colecao("compromissos")
+    else:
+        await cache.invalidar_dias("compromissos", *inicios)
+
+@router.post("/", response_model=Union[schemas.Compromisso, schemas.CompromissoCriado])
+async def criar_compromisso(
+    compromisso: schemas.CompromissoCreate,
+    compacto: bool = False,
+    verificar_conflitos: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
     # Validação de data e hora
     try:
-        data_hora_inicio = datetime.strptime(f"{compromisso.data} {compromisso.hora_inicio}", "%d/%m/%Y %H:%M")
-        if compromisso.hora_fim:
-            data_hora_fim = datetime.strptime(f"{compromisso.data} {compromisso.hora_fim}", "%d/%m/%Y %H:%M")
-            if data_hora_fim <= data_hora_inicio:
-                raise HTTPException(status_code=400, detail="A hora de término deve ser posterior à hora de início")
+        campos = _campos_modelo(compromisso)
+        if campos['fim'] and campos['fim'] <= campos['inicio']:
+            raise HTTPException(status_code=400, detail="A hora de término deve ser posterior à hora de início")
 
-        if data_hora_inicio < datetime.now():
+        if campos['inicio'] < datetime.now():
             raise HTTPException(status_code=400, detail="Não é possível agendar compromissos no passado")
 
-        # Criar compromisso base
-        compromisso_dict = compromisso.dict()
-        
-        # Se for compromisso recorrente
-        if compromisso.recorrencia:
-            compromissos_criados = []
-            tipo_recorrencia = compromisso.recorrencia.get('tipo')
-            ate_data = datetime.strptime(compromisso.recorrencia.get('ate_data'), "%d/%m/%Y")
-            data_atual = data_hora_inicio
-
-            while data_atual.date() <= ate_data.date():
-                novo_compromisso = models.Compromisso(
-                    **{**compromisso_dict, 'data': data_atual.strftime("%d/%m/%Y")}
-                )
-                db.add(novo_compromisso)
-                compromissos_criados.append(novo_compromisso)
-
-                if tipo_recorrencia == 'diaria':
-                    data_atual += timedelta(days=1)
-                elif tipo_recorrencia == 'semanal':
-                    data_atual += timedelta(days=7)
-                elif tipo_recorrencia == 'dias_especificos':
-                    data_atual += timedelta(days=1)
-                    while data_atual.weekday() not in compromisso.recorrencia.get('dias_semana', []):
-                        data_atual += timedelta(days=1)
-                elif tipo_recorrencia == 'mensal':
-                    proximo_mes = data_atual.month + 1
-                    proximo_ano = data_atual.year
-                    if proximo_mes > 12:
-                        proximo_mes = 1
-                        proximo_ano += 1
-                    try:
-                        data_atual = data_atual.replace(year=proximo_ano, month=proximo_mes)
-                    except ValueError:
-                        data_atual = (data_atual.replace(year=proximo_ano, month=proximo_mes + 1, day=1) 
-                                    - timedelta(days=1))
-
-            db.commit()
-            for comp in compromissos_criados:
-                db.refresh(comp)
-            return compromissos_criados[0]
+        # Compromisso recorrente: a regra é gravada junto com o compromisso base, no mesmo comando
+        regra = _campos_regra(compromisso.recorrencia, campos['inicio']) if compromisso.recorrencia else None
+        if verificar_conflitos and await _conflitos(db, compromisso, campos, regra):
+            raise HTTPException(status_code=409, detail="O compromisso conflita com compromissos existentes")
+        campos['data_criacao'] = datetime.now()
+        criado = await _inserir(db, campos, regra)
+        await db.commit()
+        await _invalidar(campos['inicio'] if regra is None else None)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Erro de formato: {str(e)}")
+
+    # A resposta é montada com os dados enviados, sem um SELECT extra após o commit
+    grupo_id = str(criado.recorrencia_id) if regra else None
+    if compacto:
+        total = 1
+        if regra:
+            total = sum(1 for _ in ocorrencias(campos['inicio'], regra['tipo'], regra['ate_data'], regra['dias_semana']))
+        return schemas.CompromissoCriado(id=criado.id, grupo_id=grupo_id, ocorrencias=total)
+
+    dados = compromisso.dict()
+    if regra:
+        dados['recorrencia']['grupo_id'] = grupo_id
+    return schemas.Compromisso(**dados, id=criado.id, data_criacao=campos['data_criacao'])
+
+@router.post("/batch", response_model=List[schemas.ResultadoLote])
+async def processar_lote(operacoes: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    # Sincronizações trazem também compromissos passados, então aqui não há a checagem de data futura
+    agora = datetime.now()
+
+    def converter(dados: schemas.CompromissoCreate):
+        # Devolve as colunas e a regra da série (ou None), que seguem juntas com o índice do item
+        campos = _campos_modelo(dados)
+        if campos['fim'] and campos['fim'] <= campos['inicio']:
+            raise ValueError("A hora de término deve ser posterior à hora de início")
+        campos['data_criacao'] = agora
+        return campos, _campos_regra(dados.recorrencia, campos['inicio']) if dados.recorrencia else None
+
+    tabela = models.Compromisso.__table__
+    upserts, exclusoes, resultados = lote.preparar(operacoes, schemas.OperacaoCompromisso, converter)
+    regras = {indice: regra for indice, _, (_, regra) in upserts}
+
+    # Novas séries precisam da regra: cada uma é criada pelo INSERT ... RETURNING com CTE
+    simples = []
+    for indice, compromisso_id, (campos, _) in upserts:
+        regra = regras[indice]
+        if regra is None:
+            simples.append((indice, compromisso_id, campos))
+        elif compromisso_id is not None:
+            resultados[indice] = {"indice": indice, "id": compromisso_id, "status": "erro",
+                                  "erro": "A recorrência só pode ser definida ao criar o compromisso"}
         else:
-            # Compromisso único
-            db_compromisso = models.Compromisso(**compromisso_dict)
-            db.add(db_compromisso)
-            db.commit()
-            db.refresh(db_compromisso)
-            return db_compromisso
+            criado = await _inserir(db, campos, regra)
+            resultados[indice] = {"indice": indice, "id": criado.id, "status": "criado"}
+
+    await lote.gravar(db, tabela, simples, resultados)
+    excluidos = await lote.excluir(db, tabela, exclusoes, resultados, tabela.c.recorrencia_id)
+    # Excluir o compromisso base de uma série exclui a série inteira
+    series = [linha.recorrencia_id for linha in excluidos if linha.recorrencia_id is not None]
+    if series:
+        await db.execute(delete(models.Recorrencia).where(models.Recorrencia.id.in_(series)))
+    await db.commit()
+    # Upserts não informam a data anterior de cada registro: invalida todas as listagens
+    await _invalidar(None)
+    return lote.ordenar(resultados)
+
+@router.get("/", response_model=schemas.PaginaCompromissos)
+async def listar_compromissos(
+    request: Request,
+    periodo: str = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db)
+):
+    limit = limitar(limit)
+    de, ate = janela(periodo) if periodo else (None, None)
+
+    async def produzir():
+        pagina = await _pagina_compromissos(db, de, ate, cursor, limit)
+        return serializacao.para_json(serializacao.PAGINA_COMPROMISSOS, pagina)
+
+    # A janela já resolvida entra na chave: "hoje" muda de entrada na virada do dia
+    chave = f"compromissos:lista:{de}:{ate}:{cursor}:{limit}"
+    return await cache.responder(request, chave, cache.tags_janela("compromissos", de, ate), produzir)
+
+async def _pagina_compromissos(db: AsyncSession, de: Optional[datetime], ate: Optional[datetime],
+                               cursor: Optional[str], limit: int) -> dict:
+    avulsos = select(*serializacao.COLUNAS_COMPROMISSO).where(models.Compromisso.recorrencia_id.is_(None))
+    series = (
+        select(models.Compromisso)
+        .join(models.Compromisso.regra)
+        .options(contains_eager(models.Compromisso.regra))
+    )
+    if de:
+        avulsos = avulsos.where(models.Compromisso.inicio >= de, models.Compromisso.inicio < ate)
+        series = series.where(models.Compromisso.inicio < ate)
+
+    chave = None
+    if cursor:
+        # Keyset: continua a partir do último (inicio, id) entregue
+        chave = decodificar_cursor(cursor, datetime, int)
+        avulsos = avulsos.where(tuple_(models.Compromisso.inicio, models.Compromisso.id) > chave)
+        de = max(de, chave[0]) if de else chave[0]
+    if de:
+        series = series.where(models.Recorrencia.ate_data >= de.date())
+
+    avulsos = avulsos.order_by(models.Compromisso.inicio, models.Compromisso.id).limit(limit + 1)
+    fluxos = [[(linha.inicio, linha.id, serializacao.compromisso(*linha)) for linha in (await db.execute(avulsos)).all()]]
+    # Séries são expandidas sob demanda apenas dentro da janela, e o merge para ao completar a página
+    fluxos.extend(_expandir(comp, de, ate) for comp in (await db.scalars(series)).all())
+    itens = heapq.merge(*fluxos, key=lambda item: item[:2])
+    if chave:
+        itens = (item for item in itens if item[:2] > chave)
+
+    # _expandir é preguiçoso: as séries são expandidas durante o merge
+    with metricas.cronometrar(metricas.EXPANSAO):
+        pagina = list(islice(itens, limit + 1))
+    next_cursor = None
+    if len(pagina) > limit:
+        pagina = pagina[:limit]
+        next_cursor = codificar_cursor(*pagina[-1][:2])
+    return {"itens": [item[2] for item in pagina], "next_cursor": next_cursor}
+
+async def aquecer(db: AsyncSession):
+    """Executa uma vez as listagens (com e sem período) e a leitura por id, deixando o SQL compilado no cache do engine."""
+    await _pagina_compromissos(db, None, None, None, 1)
+    await _pagina_compromissos(db, *janela("hoje"), None, 1)
+    await db.get(models.Compromisso, 0)
 
+@router.post("/conflitos", response_model=List[schemas.Conflito])
+async def verificar_conflitos(
+    compromisso: schemas.CompromissoCreate,
+    ignorar_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    # ignorar_id permite checar a edição de um compromisso sem que ele conflite consigo mesmo
+    try:
+        campos = _campos_modelo(compromisso)
+        regra = _campos_regra(compromisso.recorrencia, campos['inicio']) if compromisso.recorrencia else None
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Erro de formato: {str(e)}")
+    return await _conflitos(db, compromisso, campos, regra, ignorar_id)
+
+@router.get("/search", response_model=List[schemas.Compromisso])
+async def buscar_compromissos(q: str = Query(..., min_length=1), limit: int = 20, db: AsyncSession = Depends(get_db)):
+    # Séries aparecem uma única vez, pelo compromisso base
+    colunas = (models.Compromisso.titulo, models.Compromisso.descricao)
+    query = (
+        select(*serializacao.COLUNAS_COMPROMISSO, *serializacao.COLUNAS_REGRA)
+        .outerjoin(models.Compromisso.regra)
+        .where(filtro(q, *colunas))
+        .order_by(relevancia(q, *colunas).desc(), models.Compromisso.inicio, models.Compromisso.id)
+        .limit(limitar(limit))
+    )
+    linhas = (await db.execute(query)).all()
+    return serializacao.resposta_json(serializacao.COMPROMISSOS, [serializacao.compromisso_com_regra(linha) for linha in linhas])
+
+def _grupo(dia: date, granularidade: str) -> date:
+    """Primeiro dia do grupo (dia, semana ou mês) que contém `dia`, como o date_trunc."""
+    if granularidade == "semana":
+        return dia - timedelta(days=dia.weekday())
+    if granularidade == "mes":
+        return dia.replace(day=1)
+    return dia
 
-@router.get("/", response_model=List[schemas.Compromisso])
-def listar_compromissos(periodo: str = None, db: Session = Depends(get_db)):
-    query = db.query(models.Compromisso)
-    
-    if periodo:
-        hoje = datetime.now()
-        if periodo == "hoje":
-            query = query.filter(models.Compromisso.data == hoje.strftime("%d/%m/%Y"))
-        elif periodo == "semana":
-            proxima_semana = hoje + timedelta(days=7)
-            datas = [(hoje + timedelta(days=x)).strftime("%d/%m/%Y") for x in range(8)]
-            query = query.filter(models.Compromisso.data.in_(datas))
-        elif periodo == "mes":
-            proximo_mes = hoje + timedelta(days=30)
-            datas = [(hoje + timedelta(days=x)).strftime("%d/%m/%Y") for x in range(31)]
-            query = query.filter(models.Compromisso.data.in_(datas))
-    
-    return query.all()
+def _proximo_grupo(dia: date, granularidade: str) -> date:
+    if granularidade == "semana":
+        return dia + timedelta(days=7)
+    if granularidade == "mes":
+        return (dia.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return dia + timedelta(days=1)
+
+async def _resumo(db: AsyncSession, inicio: datetime, fim: datetime, granularidade: str) -> list:
+    # Avulsos: GROUP BY no banco pelo range de ix_compromissos_inicio_id; só as contagens voltam
+    tabela = models.Compromisso.__table__
+    grupo = func.date_trunc(literal_column(f"'{UNIDADES_RESUMO[granularidade]}'"), tabela.c.inicio)
+    segundos = case(
+        (tabela.c.fim > tabela.c.inicio, func.extract("epoch", tabela.c.fim - tabela.c.inicio)),
+        else_=DURACAO_MINIMA.total_seconds(),
+    )
+    avulsos = (
+        select(grupo, func.count(), func.sum(segundos))
+        .where(tabela.c.recorrencia_id.is_(None), tabela.c.inicio >= inicio, tabela.c.inicio < fim)
+        .group_by(grupo)
+    )
+    totais = {}
+    for dia, quantidade, duracao in (await db.execute(avulsos)).all():
+        totais[dia.date()] = [quantidade, float(duracao)]
+
+    # Séries: as ocorrências são contadas enquanto são geradas, sem montar os compromissos
+    series = (
+        select(models.Compromisso)
+        .join(models.Compromisso.regra)
+        .options(contains_eager(models.Compromisso.regra))
+        .where(models.Compromisso.inicio < fim, models.Recorrencia.ate_data >= inicio.date())
+    )
+    with metricas.cronometrar(metricas.EXPANSAO):
+        for comp in (await db.scalars(series)).all():
+            regra = comp.regra
+            duracao = (fim_efetivo(comp.inicio, comp.fim) - comp.inicio).total_seconds()
+            excecoes = [e.data for e in regra.excecoes]
+            for ocorrencia in ocorrencias(comp.inicio, regra.tipo, regra.ate_data, regra.dias_semana,
+                                          excecoes, inicio, fim):
+                total = totais.setdefault(_grupo(ocorrencia.date(), granularidade), [0, 0.0])
+                total[0] += 1
+                total[1] += duracao
+
+    # Todos os grupos do período, inclusive os vazios
+    resumo = []
+    dia = _grupo(inicio.date(), granularidade)
+    while dia < fim.date():
+        quantidade, duracao = totais.get(dia, (0, 0.0))
+        resumo.append({"data": formatar_data(dia), "compromissos": quantidade, "minutos_ocupados": round(duracao / 60)})
+        dia = _proximo_grupo(dia, granularidade)
+    return resumo
+
+@router.get("/resumo", response_model=List[schemas.Resumo])
+async def resumir_compromissos(
+    request: Request,
+    de: str,
+    ate: str,
+    granularidade: Literal["dia", "semana", "mes"] = "dia",
+    db: AsyncSession = Depends(get_db)
+):
+    # Contagem e minutos ocupados por dia, semana ou mês em [de, ate] (DD/MM/YYYY, `ate` inclusivo).
+    # Grupos nas bordas contam só a parte dentro do período; sobreposições somam os dois compromissos.
+    try:
+        inicio = inicio_do_dia(de)
+        fim = inicio_do_dia(ate) + timedelta(days=1)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Erro de formato: {str(e)}")
+    if fim <= inicio or fim - inicio > PERIODO_MAXIMO:
+        raise HTTPException(status_code=400, detail=PERIODO_INVALIDO)
+
+    async def produzir():
+        return serializacao.para_json(serializacao.RESUMO, await _resumo(db, inicio, fim, granularidade))
+
+    chave = f"compromissos:resumo:{inicio}:{fim}:{granularidade}"
+    return await cache.responder(request, chave, cache.tags_janela("compromissos", inicio, fim), produzir)
 
 @router.get("/{compromisso_id}", response_model=schemas.Compromisso)
-def obter_compromisso(compromisso_id: int, db: Session = Depends(get_db)):
-    compromisso = db.query(models.Compromisso).filter(models.Compromisso.id == compromisso_id).first()
+async def obter_compromisso(compromisso_id: int, db: AsyncSession = Depends(get_db)):
+    compromisso = await db.get(models.Compromisso, compromisso_id)
     if compromisso is None:
         raise HTTPException(status_code=404, detail="Compromisso não encontrado")
     return compromisso
 
 @router.put("/{compromisso_id}", response_model=schemas.Compromisso)
-def atualizar_compromisso(
+async def atualizar_compromisso(
     compromisso_id: int, 
     compromisso: schemas.CompromissoCreate, 
     atualizar_serie: bool = False,
-    db: Session = Depends(get_db)
+    ocorrencia: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    db_compromisso = db.query(models.Compromisso).filter(models.Compromisso.id == compromisso_id).first()
+    if atualizar_serie:
+        # Atualiza a série: mantém a data inicial e altera apenas horários, dados e regra
+        try:
+            serie = await _atualizar_serie(db, compromisso_id, compromisso)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Erro de formato: {str(e)}")
+        if serie is not None:
+            await db.commit()
+            await _invalidar(None)
+            return await db.get(models.Compromisso, compromisso_id)
+
+    db_compromisso = await db.get(models.Compromisso, compromisso_id)
     if db_compromisso is None:
         raise HTTPException(status_code=404, detail="Compromisso não encontrado")
+    # Séries podem aparecer em qualquer dia; um avulso, só no dia anterior e no novo
+    alterados = [None] if db_compromisso.regra else [db_compromisso.inicio]
 
-    if atualizar_serie and db_compromisso.recorrencia:
-        # Atualiza todos os compromissos da série
-        grupo_id = db_compromisso.recorrencia.get('grupo_id')
-        compromissos_serie = db.query(models.Compromisso).filter(
-            models.Compromisso.recorrencia['grupo_id'].astext == grupo_id
-        ).all()
-        
-        for comp in compromissos_serie:
-            for key, value in compromisso.dict(exclude={'data'}).items():
-                setattr(comp, key, value)
-    else:
-        # Atualiza apenas o compromisso específico
-        for key, value in compromisso.dict().items():
-            setattr(db_compromisso, key, value)
-        if db_compromisso.recorrencia:
-            db_compromisso.recorrencia = None
-
-    db.commit()
-    db.refresh(db_compromisso)
+    try:
+        if db_compromisso.regra:
+            # Edita uma única ocorrência: exceção na série + compromisso avulso substituto
+            excecao = _excluir_ocorrencia(db_compromisso, ocorrencia)
+            db_compromisso = models.Compromisso(**_campos_modelo(compromisso))
+            db.add(db_compromisso)
+            await db.flush()
+            excecao.substituto_id = db_compromisso.id
+        else:
+            # Atualiza apenas o compromisso específico
+            for key, value in _campos_modelo(compromisso).items():
+                setattr(db_compromisso, key, value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Erro de formato: {str(e)}")
+
+    await db.commit()
+    await db.refresh(db_compromisso)
+    await _invalidar(*alterados, db_compromisso.inicio)
     return db_compromisso
 
 @router.delete("/{compromisso_id}")
-def excluir_compromisso(
+async def excluir_compromisso(
     compromisso_id: int, 
     excluir_serie: bool = False,
-    db: Session = Depends(get_db)
+    ocorrencia: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    compromisso = db.query(models.Compromisso).filter(models.Compromisso.id == compromisso_id).first()
+    if excluir_serie:
+        # Exclui a série inteira com um único DELETE da regra; o ON DELETE CASCADE
+        # remove o compromisso base e as exceções
+        regras = models.Recorrencia.__table__
+        tabela = models.Compromisso.__table__
+        serie = select(tabela.c.recorrencia_id).where(tabela.c.id == compromisso_id).scalar_subquery()
+        if (await db.execute(delete(regras).where(regras.c.id == serie).returning(regras.c.id))).first():
+            await db.commit()
+            await _invalidar(None)
+            return {"message": "Compromisso(s) excluído(s) com sucesso"}
+
+    compromisso = await db.get(models.Compromisso, compromisso_id)
     if compromisso is None:
         raise HTTPException(status_code=404, detail="Compromisso não encontrado")
 
-    if excluir_serie and compromisso.recorrencia:
-        # Exclui todos os compromissos da série
-        grupo_id = compromisso.recorrencia.get('grupo_id')
-        db.query(models.Compromisso).filter(
-            models.Compromisso.recorrencia['grupo_id'].astext == grupo_id
-        ).delete(synchronize_session=False)
+    alterado = None if compromisso.regra else compromisso.inicio
+    if compromisso.regra:
+        # Exclui apenas uma ocorrência da série
+        try:
+            _excluir_ocorrencia(compromisso, ocorrencia)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Erro de formato: {str(e)}")
     else:
         # Exclui apenas o compromisso específico
-        db.delete(compromisso)
+        await db.delete(compromisso)
 
-    db.commit()
-    return {"message": "Compromisso(s) excluído(s) com sucesso"} 
\ No newline at end of file
+    await db.commit()
+    await _invalidar(alterado)
+    return {"message": "Compromisso(s) excluído(s) com sucesso"}
\ No newline at end of file
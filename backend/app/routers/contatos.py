@@ -1,50 +1,154 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from typing import Any, List, Optional
+from datetime import datetime, timedelta
+from itertools import islice
+import heapq
+from ..busca import filtro, relevancia
+from ..datas import inicio_do_dia
 from ..database import get_db
-from .. import models, schemas
+from ..paginacao import codificar_cursor, decodificar_cursor, limitar
+from .. import cache, lote, metricas, models, schemas, serializacao
+from .compromissos import _expandir
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.Contato)
-def criar_contato(contato: schemas.ContatoCreate, db: Session = Depends(get_db)):
+async def criar_contato(contato: schemas.ContatoCreate, db: AsyncSession = Depends(get_db)):
     db_contato = models.Contato(**contato.dict())
     db.add(db_contato)
-    db.commit()
-    db.refresh(db_contato)
+    await db.commit()
+    await db.refresh(db_contato)
+    await cache.invalidar_colecao("contatos")
     return db_contato
 
-@router.get("/", response_model=List[schemas.Contato])
-def listar_contatos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    contatos = db.query(models.Contato).offset(skip).limit(limit).all()
-    return contatos
+@router.post("/batch", response_model=List[schemas.ResultadoLote])
+async def processar_lote(operacoes: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    # Todas as operações válidas são gravadas em uma única transação; cada uma é validada
+    # em lote.preparar (schemas.OperacaoContato), para que uma inválida não recuse o lote inteiro
+    tabela = models.Contato.__table__
+    upserts, exclusoes, resultados = lote.preparar(
+        operacoes, schemas.OperacaoContato, lambda dados: {**dados.dict(), "data_criacao": datetime.now()})
+    await lote.gravar(db, tabela, upserts, resultados)
+    await lote.excluir(db, tabela, exclusoes, resultados)
+    await db.commit()
+    await cache.invalidar_colecao("contatos")
+    return lote.ordenar(resultados)
+
+@router.get("/", response_model=schemas.PaginaContatos)
+async def listar_contatos(request: Request, cursor: Optional[str] = None, limit: int = 100, db: AsyncSession = Depends(get_db)):
+    limit = limitar(limit)
+
+    async def produzir():
+        return serializacao.para_json(serializacao.PAGINA_CONTATOS, await _pagina_contatos(db, cursor, limit))
+
+    # Qualquer escrita pode deslocar as páginas ordenadas por nome: a coleção inteira é uma tag só
+    chave = f"contatos:lista:{cursor}:{limit}"
+    return await cache.responder(request, chave, ["contatos"], produzir)
+
+async def _pagina_contatos(db: AsyncSession, cursor: Optional[str], limit: int) -> dict:
+    query = select(*serializacao.COLUNAS_CONTATO)
+    if cursor:
+        # Keyset: continua a partir do último (nome, id) entregue
+        query = query.where(tuple_(models.Contato.nome, models.Contato.id) > decodificar_cursor(cursor, str, int))
+
+    query = query.order_by(models.Contato.nome, models.Contato.id).limit(limit + 1)
+    contatos = (await db.execute(query)).all()
+    next_cursor = None
+    if len(contatos) > limit:
+        contatos = contatos[:limit]
+        next_cursor = codificar_cursor(contatos[-1].nome, contatos[-1].id)
+    return {"itens": [serializacao.contato(linha) for linha in contatos], "next_cursor": next_cursor}
+
+async def aquecer(db: AsyncSession):
+    """Executa uma vez a listagem e a leitura por id, deixando o SQL compilado no cache do engine."""
+    await _pagina_contatos(db, None, 1)
+    await db.get(models.Contato, 0)
+
+@router.get("/search", response_model=List[schemas.Contato])
+async def buscar_contatos(q: str = Query(..., min_length=1), limit: int = 20, db: AsyncSession = Depends(get_db)):
+    colunas = (models.Contato.nome, models.Contato.telefone)
+    query = (
+        select(*serializacao.COLUNAS_CONTATO)
+        .where(filtro(q, *colunas))
+        .order_by(relevancia(q, *colunas).desc(), models.Contato.id)
+        .limit(limitar(limit))
+    )
+    linhas = (await db.execute(query)).all()
+    return serializacao.resposta_json(serializacao.CONTATOS, [serializacao.contato(linha) for linha in linhas])
 
 @router.get("/{contato_id}", response_model=schemas.Contato)
-def obter_contato(contato_id: int, db: Session = Depends(get_db)):
-    contato = db.query(models.Contato).filter(models.Contato.id == contato_id).first()
+async def obter_contato(contato_id: int, db: AsyncSession = Depends(get_db)):
+    contato = await db.get(models.Contato, contato_id)
     if contato is None:
         raise HTTPException(status_code=404, detail="Contato não encontrado")
     return contato
 
+@router.get("/{contato_id}/compromissos", response_model=List[schemas.Compromisso])
+async def listar_compromissos_do_contato(
+    contato_id: int,
+    de: Optional[str] = None,
+    ate: Optional[str] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db)
+):
+    contato = await db.get(models.Contato, contato_id)
+    if contato is None:
+        raise HTTPException(status_code=404, detail="Contato não encontrado")
+
+    # Janela [de, ate] em DD/MM/YYYY; sem `de`, lista apenas os próximos compromissos
+    try:
+        inicio = inicio_do_dia(de) if de else datetime.now()
+        fim = inicio_do_dia(ate) + timedelta(days=1) if ate else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Erro de formato: {str(e)}")
+
+    # O participante é ligado ao contato pelo nome; o GIN em participantes atende o @>
+    participa = models.Compromisso.participantes.contains([contato.nome])
+    avulsos = select(*serializacao.COLUNAS_COMPROMISSO).where(
+        participa, models.Compromisso.recorrencia_id.is_(None), models.Compromisso.inicio >= inicio,
+    )
+    series = (
+        select(models.Compromisso)
+        .join(models.Compromisso.regra)
+        .options(contains_eager(models.Compromisso.regra))
+        .where(participa, models.Recorrencia.ate_data >= inicio.date())
+    )
+    if fim:
+        avulsos = avulsos.where(models.Compromisso.inicio < fim)
+        series = series.where(models.Compromisso.inicio < fim)
+
+    limit = limitar(limit)
+    avulsos = avulsos.order_by(models.Compromisso.inicio, models.Compromisso.id).limit(limit)
+    fluxos = [[(linha.inicio, linha.id, serializacao.compromisso(*linha)) for linha in (await db.execute(avulsos)).all()]]
+    fluxos.extend(_expandir(comp, inicio, fim) for comp in (await db.scalars(series)).all())
+    with metricas.cronometrar(metricas.EXPANSAO):
+        itens = [item[2] for item in islice(heapq.merge(*fluxos, key=lambda item: item[:2]), limit)]
+    return serializacao.resposta_json(serializacao.COMPROMISSOS, itens)
+
 @router.put("/{contato_id}", response_model=schemas.Contato)
-def atualizar_contato(contato_id: int, contato: schemas.ContatoCreate, db: Session = Depends(get_db)):
-    db_contato = db.query(models.Contato).filter(models.Contato.id == contato_id).first()
+async def atualizar_contato(contato_id: int, contato: schemas.ContatoCreate, db: AsyncSession = Depends(get_db)):
+    db_contato = await db.get(models.Contato, contato_id)
     if db_contato is None:
         raise HTTPException(status_code=404, detail="Contato não encontrado")
-    
+
     for key, value in contato.dict().items():
         setattr(db_contato, key, value)
-    
-    db.commit()
-    db.refresh(db_contato)
+
+    await db.commit()
+    await db.refresh(db_contato)
+    await cache.invalidar_colecao("contatos")
     return db_contato
 
 @router.delete("/{contato_id}")
-def excluir_contato(contato_id: int, db: Session = Depends(get_db)):
-    contato = db.query(models.Contato).filter(models.Contato.id == contato_id).first()
+async def excluir_contato(contato_id: int, db: AsyncSession = Depends(get_db)):
+    contato = await db.get(models.Contato, contato_id)
     if contato is None:
         raise HTTPException(status_code=404, detail="Contato não encontrado")
-    
-    db.delete(contato)
-    db.commit()
-    return {"message": "Contato excluído com sucesso"} 
\ No newline at end of file
+
+    await db.delete(contato)
+    await db.commit()
+    await cache.invalidar_colecao("contatos")
+    return {"message": "Contato excluído com sucesso"}
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from datetime import timedelta
+from ..database import get_db
+from ..datas import PERIODO_INVALIDO, PERIODO_MAXIMO, inicio_do_dia
+from ..intervalos import livres, unir
+from .. import models, schemas
+from .compromissos import ocupacao
+
+router = APIRouter()
+
+@router.get("/", response_model=schemas.Disponibilidade)
+async def consultar_disponibilidade(
+    de: str,
+    ate: str,
+    participantes: List[str] = Query(...),
+    db: AsyncSession = Depends(get_db)
+):
+    # Aceita ?participantes=A&participantes=B ou ?participantes=A,B
+    nomes = [nome.strip() for valor in participantes for nome in valor.split(",") if nome.strip()]
+    if not nomes:
+        raise HTTPException(status_code=400, detail="Informe ao menos um participante")
+
+    # Janela [de, ate] em DD/MM/YYYY, com `ate` inclusivo
+    try:
+        inicio = inicio_do_dia(de)
+        fim = inicio_do_dia(ate) + timedelta(days=1)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Erro de formato: {str(e)}")
+    if fim <= inicio or fim - inicio > PERIODO_MAXIMO:
+        raise HTTPException(status_code=400, detail=PERIODO_INVALIDO)
+
+    participa = or_(*(models.Compromisso.participantes.contains([nome]) for nome in nomes))
+    ocupado = unir((max(i, inicio), min(f, fim)) for i, f, _ in await ocupacao(db, inicio, fim, participa))
+    return {
+        "participantes": nomes,
+        "ocupado": [{"inicio": i, "fim": f} for i, f in ocupado],
+        "livre": [{"inicio": i, "fim": f} for i, f in livres(ocupado, inicio, fim)],
+    }
@@ -0,0 +1,131 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import JSON, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from datetime import date
+import csv
+import io
+import json
+from ..database import abrir_sessao
+from ..datas import formatar_data, formatar_hora
+from .. import models, serializacao
+
+router = APIRouter()
+
+# Linhas lidas do cursor no servidor por vez; a memória usada não depende do tamanho da tabela
+TAMANHO_PARTE = 1000
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+COLUNAS_CONTATOS = ["id", "nome", "telefone", "email", "endereco", "data_criacao"]
+COLUNAS_COMPROMISSOS = [
+    "id", "titulo", "data", "hora_inicio", "hora_fim", "descricao", "participantes",
+    "recorrencia_tipo", "recorrencia_ate_data", "recorrencia_dias_semana", "recorrencia_excecoes",
+    "recorrencia_substitutos", "grupo_id", "data_criacao",
+]
+
+def _contato(linha) -> dict:
+    return {
+        "id": linha.id,
+        "nome": linha.nome,
+        "telefone": linha.telefone,
+        "email": linha.email,
+        "endereco": linha.endereco,
+        "data_criacao": linha.data_criacao.isoformat() if linha.data_criacao else None,
+    }
+
+def _compromisso(linha) -> dict:
+    # Mesmo formato de schemas.Compromisso (DD/MM/YYYY e HH:MM). A recorrência leva também
+    # as exceções, como nos arquivos do agenda.py, e o id do compromisso avulso que
+    # substitui cada ocorrência alterada (data -> substituto_id)
+    recorrencia = serializacao.recorrencia(linha.recorrencia_id, linha.tipo, linha.ate_data, linha.dias_semana)
+    if recorrencia is not None:
+        excecoes = [(formatar_data(date.fromisoformat(data)), substituto) for data, substituto in linha.excecoes or []]
+        recorrencia["excecoes"] = [data for data, _ in excecoes]
+        recorrencia["substitutos"] = {data: substituto for data, substituto in excecoes if substituto is not None}
+    return {
+        "id": linha.id,
+        "titulo": linha.titulo,
+        "data": formatar_data(linha.inicio),
+        "hora_inicio": formatar_hora(linha.inicio),
+        "hora_fim": formatar_hora(linha.fim) if linha.fim else None,
+        "descricao": linha.descricao,
+        "participantes": linha.participantes or [],
+        "recorrencia": recorrencia,
+        "data_criacao": linha.data_criacao.isoformat() if linha.data_criacao else None,
+    }
+
+def _linha_csv_compromisso(item: dict) -> list:
+    recorrencia = item["recorrencia"] or {}
+    return [
+        item["id"], item["titulo"], item["data"], item["hora_inicio"], item["hora_fim"], item["descricao"],
+        json.dumps(item["participantes"], ensure_ascii=False),
+        recorrencia.get("tipo"), recorrencia.get("ate_data"),
+        json.dumps(recorrencia["dias_semana"]) if recorrencia.get("dias_semana") is not None else None,
+        json.dumps(recorrencia["excecoes"]) if recorrencia else None,
+        json.dumps(recorrencia["substitutos"]) if recorrencia else None,
+        recorrencia.get("grupo_id"), item["data_criacao"],
+    ]
+
+async def _gerar(query, converter, formato: str, colunas: list, linha_csv):
+    # A sessão é aberta aqui, e não via Depends, para durar enquanto o corpo da resposta é enviado
+    async with abrir_sessao() as db:
+        resultado = await db.stream(query.execution_options(yield_per=TAMANHO_PARTE))
+        if formato == "csv":
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            escritor.writerow(colunas)
+            async for parte in resultado.partitions(TAMANHO_PARTE):
+                escritor.writerows(linha_csv(converter(linha)) for linha in parte)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            async for parte in resultado.partitions(TAMANHO_PARTE):
+                yield "".join(json.dumps(converter(linha), ensure_ascii=False) + "\n" for linha in parte)
+
+def _resposta(nome: str, formato: str, conteudo) -> StreamingResponse:
+    return StreamingResponse(
+        conteudo,
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{formato}"'},
+    )
+
+def _validar_formato(formato: str):
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {formato} (use ndjson ou csv)")
+
+@router.get("/contatos")
+async def exportar_contatos(formato: str = "ndjson"):
+    _validar_formato(formato)
+    query = select(*(models.Contato.__table__.c[coluna] for coluna in COLUNAS_CONTATOS)).order_by(models.Contato.id)
+    linha_csv = lambda item: [item[coluna] for coluna in COLUNAS_CONTATOS]
+    return _resposta("contatos", formato, _gerar(query, _contato, formato, COLUNAS_CONTATOS, linha_csv))
+
+@router.get("/compromissos")
+async def exportar_compromissos(formato: str = "ndjson"):
+    _validar_formato(formato)
+    compromisso = models.Compromisso.__table__.c
+    regra = models.Recorrencia.__table__.c
+    excecao = models.RecorrenciaExcecao.__table__.c
+    # [[data, substituto_id], ...] da série, em ordem de data (nulo nos compromissos avulsos)
+    excecoes = (
+        select(func.json_agg(aggregate_order_by(func.json_build_array(excecao.data, excecao.substituto_id),
+                                                excecao.data), type_=JSON))
+        .where(excecao.recorrencia_id == regra.id)
+        .scalar_subquery()
+    )
+    query = (
+        select(
+            compromisso.id, compromisso.titulo, compromisso.inicio, compromisso.fim, compromisso.descricao,
+            compromisso.participantes, compromisso.recorrencia_id, compromisso.data_criacao,
+            regra.tipo, regra.ate_data, regra.dias_semana, excecoes.label("excecoes"),
+        )
+        .select_from(models.Compromisso.__table__.outerjoin(models.Recorrencia.__table__))
+        .order_by(compromisso.id)
+    )
+    return _resposta("compromissos", formato, _gerar(query, _compromisso, formato, COLUNAS_COMPROMISSOS, _linha_csv_compromisso))
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import codecs
+import json
+from ..database import abrir_sessao
+from ..importacao import TAMANHO_PARTE, TIPOS_IMPORTACAO, Importacao
+from ..leitura import LeitorJSON
+
+router = APIRouter()
+
+class RespostaProgresso(StreamingResponse):
+    # O StreamingResponse do Starlette fica lendo `receive` em paralelo para detectar a
+    # desconexão do cliente e consumiria o corpo da requisição, que aqui ainda está
+    # sendo lido enquanto a resposta é enviada. Uma desconexão interrompe o envio com erro.
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+def _linha(dados: dict) -> str:
+    return json.dumps(dados, ensure_ascii=False) + "\n"
+
+async def _importar(request: Request, tipo: str):
+    # Corpo lido em pedaços: cada parte de TAMANHO_PARTE registros é gravada e
+    # confirmada antes de ler a próxima, e o progresso vai sendo enviado ao cliente
+    decodificador = codecs.getincrementaldecoder("utf-8")()
+    leitor = LeitorJSON()
+    parte = []
+    async with abrir_sessao() as db:
+        importacao = Importacao(db, tipo)
+        try:
+            async for pedaco in request.stream():
+                parte.extend(leitor.alimentar(decodificador.decode(pedaco)))
+                while len(parte) >= TAMANHO_PARTE:
+                    await importacao.processar(parte[:TAMANHO_PARTE])
+                    del parte[:TAMANHO_PARTE]
+                    yield _linha({"progresso": importacao.progresso()})
+            parte.extend(leitor.alimentar(decodificador.decode(b"", final=True)))
+            leitor.finalizar()
+            if parte:
+                await importacao.processar(parte)
+        except ValueError as e:
+            # JSON malformado: as partes já confirmadas permanecem gravadas
+            yield _linha({"concluido": False, "erro": str(e), **importacao.progresso()})
+            return
+        yield _linha({"concluido": True, **importacao.progresso()})
+
+@router.post("")
+async def importar(request: Request, tipo: str):
+    if tipo not in TIPOS_IMPORTACAO:
+        raise HTTPException(status_code=400, detail=f"Tipo inválido: {tipo} (use contatos ou compromissos)")
+    return RespostaProgresso(_importar(request, tipo), media_type="application/x-ndjson")
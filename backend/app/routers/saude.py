@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException
+from ..database import banco_disponivel
+
+router = APIRouter()
+
+@router.get("/live")
+async def vivo():
+    # Só indica que o worker responde; não depende do banco
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def pronto():
+    if not await banco_disponivel():
+        raise HTTPException(status_code=503, detail="Banco de dados indisponível")
+    return {"status": "ok"}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Optional, List, Literal
 from datetime import datetime
 
 class ContatoBase(BaseModel):
@@ -18,6 +18,21 @@ class Contato(ContatoBase):
     class Config:
         from_attributes = True
 
+class OperacaoContato(BaseModel):
+    acao: Literal["upsert", "delete"]
+    id: Optional[int] = None
+    dados: Optional[ContatoCreate] = None
+
+class PaginaContatos(BaseModel):
+    itens: List[Contato]
+    next_cursor: Optional[str] = None
+
+class Recorrencia(BaseModel):
+    tipo: str
+    ate_data: str
+    dias_semana: Optional[List[int]] = None
+    grupo_id: Optional[str] = None
+
 class CompromissoBase(BaseModel):
     titulo: str
     data: str
@@ -25,7 +40,7 @@ class CompromissoBase(BaseModel):
     hora_fim: Optional[str] = None
     descricao: Optional[str] = None
     participantes: Optional[List[str]] = []
-    recorrencia: Optional[Dict] = None
+    recorrencia: Optional[Recorrencia] = None
 
 class CompromissoCreate(CompromissoBase):
     pass
@@ -35,4 +50,46 @@ class Compromisso(CompromissoBase):
     data_criacao: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class PaginaCompromissos(BaseModel):
+    itens: List[Compromisso]
+    next_cursor: Optional[str] = None
+
+class Conflito(BaseModel):
+    # Ocorrência do compromisso proposto e a ocorrência existente com que ela conflita
+    data: str
+    hora_inicio: str
+    hora_fim: Optional[str] = None
+    compromisso: Compromisso
+
+class Intervalo(BaseModel):
+    inicio: datetime
+    fim: datetime
+
+class Disponibilidade(BaseModel):
+    participantes: List[str]
+    ocupado: List[Intervalo]
+    livre: List[Intervalo]
+
+class Resumo(BaseModel):
+    # Compromissos (ocorrências de séries inclusive) com início no grupo que começa em `data`
+    data: str
+    compromissos: int
+    minutos_ocupados: int
+
+class CompromissoCriado(BaseModel):
+    id: int
+    grupo_id: Optional[str] = None
+    ocorrencias: int 
+
+class OperacaoCompromisso(BaseModel):
+    acao: Literal["upsert", "delete"]
+    id: Optional[int] = None
+    dados: Optional[CompromissoCreate] = None
+
+class ResultadoLote(BaseModel):
+    indice: int
+    id: Optional[int] = None
+    status: str
+    erro: Optional[str] = None
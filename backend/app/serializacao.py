@@ -0,0 +1,136 @@
+"""Serialização das listagens sem passar pelo ORM nem pela validação do Pydantic.
+
+As listagens selecionam só as colunas necessárias (linhas do Core), montam
+dicionários já no formato da API e os convertem em JSON com TypeAdapters
+compilados uma única vez. Os dados vêm do banco e não precisam ser validados
+de novo; os TypedDicts abaixo apenas descrevem a saída para o serializador.
+
+Os TypedDicts espelham schemas.Contato e schemas.Compromisso, e os
+dicionários são montados na mesma ordem de campos dos schemas, de modo que o
+JSON gerado é idêntico ao da serialização pelo response_model
+(benchmarks/serializacao.py compara as duas saídas).
+"""
+from datetime import datetime
+from typing import List, Optional
+from fastapi import Response
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+from . import metricas, models
+from .datas import formatar_data, formatar_hora
+
+
+class RecorrenciaSaida(TypedDict):
+    tipo: str
+    ate_data: str
+    dias_semana: Optional[List[int]]
+    grupo_id: Optional[str]
+
+
+class ContatoSaida(TypedDict):
+    nome: str
+    telefone: str
+    email: Optional[str]
+    endereco: Optional[str]
+    id: int
+    data_criacao: datetime
+
+
+class CompromissoSaida(TypedDict):
+    titulo: str
+    data: str
+    hora_inicio: str
+    hora_fim: Optional[str]
+    descricao: Optional[str]
+    participantes: Optional[List[str]]
+    recorrencia: Optional[RecorrenciaSaida]
+    id: int
+    data_criacao: datetime
+
+
+class PaginaContatosSaida(TypedDict):
+    itens: List[ContatoSaida]
+    next_cursor: Optional[str]
+
+
+class PaginaCompromissosSaida(TypedDict):
+    itens: List[CompromissoSaida]
+    next_cursor: Optional[str]
+
+
+class ResumoSaida(TypedDict):
+    data: str
+    compromissos: int
+    minutos_ocupados: int
+
+
+CONTATOS = TypeAdapter(List[ContatoSaida])
+COMPROMISSOS = TypeAdapter(List[CompromissoSaida])
+PAGINA_CONTATOS = TypeAdapter(PaginaContatosSaida)
+PAGINA_COMPROMISSOS = TypeAdapter(PaginaCompromissosSaida)
+RESUMO = TypeAdapter(List[ResumoSaida])
+
+# Colunas lidas pelas listagens, na ordem esperada por contato() e compromisso()
+COLUNAS_CONTATO = (
+    models.Contato.nome, models.Contato.telefone, models.Contato.email,
+    models.Contato.endereco, models.Contato.id, models.Contato.data_criacao,
+)
+COLUNAS_COMPROMISSO = (
+    models.Compromisso.id, models.Compromisso.titulo, models.Compromisso.inicio, models.Compromisso.fim,
+    models.Compromisso.descricao, models.Compromisso.participantes, models.Compromisso.data_criacao,
+)
+# Para consultas que trazem também séries: exigem OUTER JOIN com recorrencias
+COLUNAS_REGRA = (
+    models.Compromisso.recorrencia_id, models.Recorrencia.tipo,
+    models.Recorrencia.ate_data, models.Recorrencia.dias_semana,
+)
+
+
+def contato(linha) -> dict:
+    nome, telefone, email, endereco, id, data_criacao = linha
+    return {
+        "nome": nome,
+        "telefone": telefone,
+        "email": email,
+        "endereco": endereco,
+        "id": id,
+        "data_criacao": data_criacao,
+    }
+
+
+def compromisso(id, titulo, inicio, fim, descricao, participantes, data_criacao, recorrencia=None) -> dict:
+    return {
+        "titulo": titulo,
+        "data": formatar_data(inicio),
+        "hora_inicio": formatar_hora(inicio),
+        "hora_fim": formatar_hora(fim) if fim is not None else None,
+        "descricao": descricao,
+        "participantes": participantes,
+        "recorrencia": recorrencia,
+        "id": id,
+        "data_criacao": data_criacao,
+    }
+
+
+def recorrencia(recorrencia_id, tipo, ate_data, dias_semana) -> Optional[dict]:
+    if recorrencia_id is None:
+        return None
+    return {
+        "tipo": tipo,
+        "ate_data": formatar_data(ate_data),
+        "dias_semana": dias_semana,
+        "grupo_id": str(recorrencia_id),
+    }
+
+
+def compromisso_com_regra(linha) -> dict:
+    """Linha com COLUNAS_COMPROMISSO seguidas de COLUNAS_REGRA."""
+    return compromisso(*linha[:7], recorrencia=recorrencia(*linha[7:]))
+
+
+def para_json(adaptador: TypeAdapter, dados) -> bytes:
+    with metricas.cronometrar(metricas.SERIALIZACAO):
+        return adaptador.dump_json(dados)
+
+
+def resposta_json(adaptador: TypeAdapter, dados) -> Response:
+    return Response(content=para_json(adaptador, dados), media_type="application/json")
@@ -0,0 +1,161 @@
+"""Micro-benchmarks da classe Agenda (agenda.py) com 1 mil, 100 mil ou 1 milhão de registros.
+
+A partir de backend/:
+
+    python -m benchmarks.agenda
+    python -m benchmarks.agenda --tamanhos 1000,100000,1000000 --armazenamentos sqlite --saida agenda.json
+
+Para cada tamanho e armazenamento (json, sqlite), gera os arquivos da agenda
+em um diretório temporário (1% dos compromissos são séries) e mede carregar,
+adicionar, listar por período, buscar, verificar conflitos, editar uma série
+e salvar (só json). No sqlite, a primeira abertura migra os arquivos JSON e
+é medida à parte. A saída pode ser comparada entre commits com
+benchmarks.relatorio.
+"""
+from datetime import date, timedelta
+import argparse
+import builtins
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from . import relatorio
+
+# agenda.py fica na raiz do repositório e importa os módulos compartilhados como backend.app.*
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, RAIZ)
+import agenda  # noqa: E402
+from backend.app.datas import formatar_data  # noqa: E402
+
+TITULOS = ["Reunião", "Consulta", "Almoço", "Treino", "Entrevista", "Revisão", "Aula", "Viagem"]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Íris", "João"]
+
+
+def gerar_arquivos(total: int, semente: int = 42):
+    """Grava contatos.json e compromissos.json no diretório atual."""
+    aleatorio = random.Random(semente)
+    hoje = date.today()
+    contatos = [{
+        "id": i,
+        "nome": f"{aleatorio.choice(NOMES)} {i}",
+        "telefone": f"11 9{i:08d}",
+        "email": f"contato{i}@exemplo.com",
+        "endereco": "",
+        "data_criacao": "01/01/2024 10:00:00",
+    } for i in range(1, max(100, total // 10) + 1)]
+
+    compromissos = []
+    for i in range(1, total + 1):
+        dia = hoje + timedelta(days=aleatorio.randrange(-30, 365))
+        hora = aleatorio.randrange(7, 20)
+        compromisso = {
+            "id": i,
+            "titulo": f"{aleatorio.choice(TITULOS)} {i}",
+            "data": formatar_data(dia),
+            "hora_inicio": f"{hora:02d}:00",
+            "hora_fim": f"{hora:02d}:45",
+            "descricao": "",
+            "participantes": aleatorio.sample(NOMES, 2),
+            "data_criacao": "01/01/2024 10:00:00",
+        }
+        if i % 100 == 0:
+            compromisso["recorrencia"] = {
+                "tipo": aleatorio.choice(["diaria", "semanal"]),
+                "ate_data": formatar_data(dia + timedelta(days=90)),
+                "dias_semana": None,
+                "excecoes": [],
+                "grupo_id": f"serie-{i}",
+            }
+        compromissos.append(compromisso)
+
+    with open("contatos.json", "w") as arquivo:
+        json.dump(contatos, arquivo)
+    with open("compromissos.json", "w") as arquivo:
+        json.dump(compromissos, arquivo)
+
+
+def medir(funcao, repeticoes: int) -> dict:
+    tempos = []
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        antes = time.perf_counter()
+        funcao(i)
+        tempos.append(time.perf_counter() - antes)
+    return relatorio.resumir(tempos, time.perf_counter() - inicio)
+
+
+def executar(total: int, armazenamento: str, repeticoes: int, repeticoes_carga: int) -> dict:
+    aleatorio = random.Random(7)
+    amanha = formatar_data(date.today() + timedelta(days=1))
+    resultados = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        anterior = os.getcwd()
+        os.chdir(diretorio)
+        entrada = builtins.input
+        try:
+            gerar_arquivos(total)
+            abrir = agenda.ArmazenamentoJSON if armazenamento == "json" else agenda.ArmazenamentoSQLite
+            if armazenamento == "sqlite":
+                resultados["migrar"] = medir(lambda _: abrir().fechar(), 1)
+            instancias = []
+
+            def carregar(_):
+                nova = agenda.Agenda(abrir())
+                if instancias:
+                    instancias.pop().fechar()
+                instancias.append(nova)
+
+            resultados["carregar"] = medir(carregar, repeticoes_carga)
+            a = instancias[0]
+            series = [c.id for c in a.armazenamento.series()]
+
+            resultados["adicionar_compromisso"] = medir(
+                lambda i: a.adicionar_compromisso(f"Novo {i}", amanha, f"{8 + i % 10:02d}:00", f"{8 + i % 10:02d}:30"),
+                repeticoes)
+            resultados["adicionar_contato"] = medir(
+                lambda i: a.adicionar_contato(f"Novo {i}", f"21 9{i:08d}"), repeticoes)
+            for periodo in ("hoje", "semana", "mes"):
+                resultados[f"listar_{periodo}"] = medir(lambda _: a.listar_compromissos(periodo), repeticoes)
+            resultados["buscar_compromisso"] = medir(
+                lambda i: a.buscar_compromisso(f"{TITULOS[i % len(TITULOS)]} {aleatorio.randrange(1, total)}"),
+                repeticoes)
+            resultados["buscar_contato"] = medir(lambda i: a.buscar_contato(NOMES[i % len(NOMES)]), repeticoes)
+            resultados["verificar_conflitos"] = medir(
+                lambda i: a.verificar_conflitos(amanha, f"{8 + i % 10:02d}:00", f"{9 + i % 10:02d}:00"), repeticoes)
+            # editar_compromisso pergunta se a alteração vale para a série inteira
+            builtins.input = lambda *_: "s"
+            resultados["editar_serie"] = medir(
+                lambda i: a.editar_compromisso(series[i % len(series)], titulo=f"Série editada {i}"), repeticoes)
+            if armazenamento == "json":
+                resultados["salvar"] = medir(lambda _: a.armazenamento.compactar(), repeticoes_carga)
+            a.fechar()
+        finally:
+            builtins.input = entrada
+            os.chdir(anterior)
+    return {f"{armazenamento}/{total}/{nome}": resultado for nome, resultado in resultados.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", default="1000,100000", help="quantidades de compromissos, separadas por vírgula")
+    parser.add_argument("--armazenamentos", default="json,sqlite", help="json, sqlite ou ambos")
+    parser.add_argument("--repeticoes", type=int, default=200, help="execuções de cada operação rápida")
+    parser.add_argument("--repeticoes-carga", type=int, default=3, help="execuções de carregar e salvar")
+    parser.add_argument("--saida", help="grava o relatório em JSON")
+    args = parser.parse_args()
+
+    tamanhos = [int(tamanho) for tamanho in args.tamanhos.split(",")]
+    resultados = {}
+    for total in tamanhos:
+        for armazenamento in args.armazenamentos.split(","):
+            resultados.update(executar(total, armazenamento, args.repeticoes, args.repeticoes_carga))
+    relatorio.imprimir(resultados)
+    if args.saida:
+        relatorio.salvar(args.saida, "agenda", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
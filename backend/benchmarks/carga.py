@@ -0,0 +1,204 @@
+"""Teste de carga HTTP de todos os endpoints de app/routers.
+
+A partir de backend/, contra um servidor já no ar:
+
+    python -m benchmarks.carga --url http://localhost:8000 --saida carga.json
+
+ou com a aplicação no próprio processo (usa o DATABASE_URL do ambiente):
+
+    python -m benchmarks.carga --local
+
+Primeiro popula o banco (--contatos, --compromissos) pelos endpoints de lote;
+depois dispara --requisicoes por endpoint com --concorrencia clientes
+simultâneos e mede latência (p50/p95/p99) e vazão de cada um. Exportação e
+importação, que percorrem a tabela inteira, recebem 1/20 das requisições.
+
+O SQLite não serve de substituto: os modelos usam JSONB, pg_trgm e
+ON CONFLICT do PostgreSQL. Para um banco local descartável, suba só o
+serviço db do docker-compose e aplique as migrações (alembic upgrade head). As listagens passam pelo cache de respostas;
+rode o servidor com CACHE_BACKEND=desativado para medir o caminho até o banco.
+"""
+from datetime import date, timedelta
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import random
+import time
+
+import httpx
+
+from . import relatorio
+
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Íris", "João"]
+TAMANHO_LOTE = 1000
+
+
+def _data(dias: int) -> str:
+    dia = date.today() + timedelta(days=dias)
+    return "%02d/%02d/%04d" % (dia.day, dia.month, dia.year)
+
+
+def _compromisso(aleatorio, i: int, **extras) -> dict:
+    hora = aleatorio.randrange(7, 20)
+    return {
+        "titulo": f"Reunião {i}",
+        "data": _data(aleatorio.randrange(1, 60)),
+        "hora_inicio": f"{hora:02d}:00",
+        "hora_fim": f"{hora:02d}:45",
+        "descricao": "Carga",
+        "participantes": aleatorio.sample(NOMES, 2),
+        **extras,
+    }
+
+
+async def _lote(cliente, caminho: str, dados: list) -> list:
+    ids = []
+    for inicio in range(0, len(dados), TAMANHO_LOTE):
+        operacoes = [{"acao": "upsert", "dados": item} for item in dados[inicio:inicio + TAMANHO_LOTE]]
+        resposta = await cliente.post(caminho, json=operacoes)
+        resposta.raise_for_status()
+        ids.extend(resultado["id"] for resultado in resposta.json() if resultado["status"] != "erro")
+    return ids
+
+
+async def popular(cliente, contatos: int, compromissos: int, extras: int, aleatorio) -> dict:
+    """Cria a massa de dados e os registros que as rotas de escrita vão alterar e excluir."""
+    ids_contatos = await _lote(cliente, "/api/contatos/batch", [
+        {"nome": f"{NOMES[i % len(NOMES)]} {i}" if i >= len(NOMES) else NOMES[i], "telefone": f"11 9{i:08d}"}
+        for i in range(contatos)
+    ])
+    # 1% dos compromissos são séries semanais
+    ids_compromissos = await _lote(cliente, "/api/compromissos/batch", [
+        _compromisso(aleatorio, i, recorrencia={"tipo": "semanal", "ate_data": _data(180)})
+        if i % 100 == 0 else _compromisso(aleatorio, i)
+        for i in range(compromissos)
+    ])
+    # Registros próprios para PUT e DELETE, para não esvaziar a massa medida
+    descartaveis_contatos = await _lote(cliente, "/api/contatos/batch", [
+        {"nome": f"Descartável {i}", "telefone": "0"} for i in range(extras)
+    ])
+    descartaveis_compromissos = await _lote(cliente, "/api/compromissos/batch", [
+        _compromisso(aleatorio, i) for i in range(extras)
+    ])
+    return {
+        "contatos": ids_contatos,
+        "compromissos": ids_compromissos,
+        "descartaveis_contatos": descartaveis_contatos,
+        "descartaveis_compromissos": descartaveis_compromissos,
+    }
+
+
+def cenarios(dados: dict, aleatorio) -> list:
+    """(nome, peso, função que monta a requisição i como (método, caminho, kwargs))."""
+    contatos, compromissos = dados["contatos"], dados["compromissos"]
+    excluir_contatos = iter(dados["descartaveis_contatos"])
+    excluir_compromissos = iter(dados["descartaveis_compromissos"])
+    atualizar_contatos = itertools.cycle(dados["descartaveis_contatos"][::-1])
+    atualizar_compromissos = itertools.cycle(dados["descartaveis_compromissos"][::-1])
+    importacao = "\n".join(json.dumps(_compromisso(aleatorio, i)) for i in range(100))
+    return [
+        ("contatos/criar", 1, lambda i: ("POST", "/api/contatos/", {"json": {"nome": f"Carga {i}", "telefone": "1"}})),
+        ("contatos/lote", 1, lambda i: ("POST", "/api/contatos/batch", {"json": [
+            {"acao": "upsert", "dados": {"nome": f"Lote {i}-{j}", "telefone": "1"}} for j in range(100)]})),
+        ("contatos/listar", 1, lambda i: ("GET", "/api/contatos/", {"params": {"limit": 100}})),
+        ("contatos/buscar", 1, lambda i: ("GET", "/api/contatos/search", {"params": {"q": NOMES[i % len(NOMES)][:3]}})),
+        ("contatos/obter", 1, lambda i: ("GET", f"/api/contatos/{aleatorio.choice(contatos)}", {})),
+        ("contatos/compromissos", 1, lambda i: (
+            "GET", f"/api/contatos/{contatos[i % len(NOMES)]}/compromissos", {"params": {"limit": 50}})),
+        ("contatos/atualizar", 1, lambda i: (
+            "PUT", f"/api/contatos/{next(atualizar_contatos)}", {"json": {"nome": f"Atualizado {i}", "telefone": "2"}})),
+        ("contatos/excluir", 1, lambda i: ("DELETE", f"/api/contatos/{next(excluir_contatos)}", {})),
+        ("compromissos/criar", 1, lambda i: ("POST", "/api/compromissos/", {"json": _compromisso(aleatorio, i)})),
+        ("compromissos/lote", 1, lambda i: ("POST", "/api/compromissos/batch", {"json": [
+            {"acao": "upsert", "dados": _compromisso(aleatorio, j)} for j in range(100)]})),
+        ("compromissos/listar_hoje", 1, lambda i: ("GET", "/api/compromissos/", {"params": {"periodo": "hoje"}})),
+        ("compromissos/listar_semana", 1, lambda i: ("GET", "/api/compromissos/", {"params": {"periodo": "semana"}})),
+        ("compromissos/listar_mes", 1, lambda i: ("GET", "/api/compromissos/", {"params": {"periodo": "mes"}})),
+        ("compromissos/resumo", 1, lambda i: ("GET", "/api/compromissos/resumo", {"params": {
+            "de": _data(1), "ate": _data(180), "granularidade": ("dia", "semana", "mes")[i % 3]}})),
+        ("compromissos/conflitos", 1, lambda i: ("POST", "/api/compromissos/conflitos", {"json": _compromisso(aleatorio, i)})),
+        ("compromissos/buscar", 1, lambda i: ("GET", "/api/compromissos/search", {"params": {"q": f"Reunião {i}"}})),
+        ("compromissos/obter", 1, lambda i: ("GET", f"/api/compromissos/{aleatorio.choice(compromissos)}", {})),
+        ("compromissos/atualizar", 1, lambda i: (
+            "PUT", f"/api/compromissos/{next(atualizar_compromissos)}", {"json": _compromisso(aleatorio, i)})),
+        ("compromissos/excluir", 1, lambda i: ("DELETE", f"/api/compromissos/{next(excluir_compromissos)}", {})),
+        ("disponibilidade", 1, lambda i: ("GET", "/api/disponibilidade/", {"params": {
+            "de": _data(1), "ate": _data(30), "participantes": ",".join(aleatorio.sample(NOMES, 3))}})),
+        ("exportar/contatos", 20, lambda i: ("GET", "/api/export/contatos", {})),
+        ("exportar/compromissos", 20, lambda i: ("GET", "/api/export/compromissos", {"params": {"formato": "csv"}})),
+        ("importar/compromissos", 20, lambda i: (
+            "POST", "/api/import", {"params": {"tipo": "compromissos"}, "content": importacao.encode()})),
+    ]
+
+
+async def medir(cliente, montar, requisicoes: int, concorrencia: int) -> dict:
+    tempos, erros = [], 0
+    fila = iter(range(requisicoes))
+
+    async def trabalhador():
+        nonlocal erros
+        for i in fila:
+            metodo, caminho, kwargs = montar(i)
+            antes = time.perf_counter()
+            try:
+                resposta = await cliente.request(metodo, caminho, **kwargs)
+                erro = resposta.status_code >= 400
+            except httpx.HTTPError:
+                erro = True
+            tempos.append(time.perf_counter() - antes)
+            erros += erro
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    return relatorio.resumir(tempos, time.perf_counter() - inicio, erros)
+
+
+async def executar(args) -> dict:
+    ciclo_de_vida = contextlib.nullcontext()
+    if args.local:
+        from app.main import app
+        # O ASGITransport não dispara o lifespan; sem ele o pool não seria aquecido
+        ciclo_de_vida = app.router.lifespan_context(app)
+        transporte = httpx.ASGITransport(app=app)
+        cliente = httpx.AsyncClient(transport=transporte, base_url="http://agenda", timeout=args.timeout)
+    else:
+        limites = httpx.Limits(max_connections=args.concorrencia)
+        cliente = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limites)
+
+    aleatorio = random.Random(42)
+    async with ciclo_de_vida, cliente:
+        print(f"Populando: {args.contatos} contatos e {args.compromissos} compromissos...")
+        dados = await popular(cliente, args.contatos, args.compromissos, args.requisicoes, aleatorio)
+        resultados = {}
+        for nome, peso, montar in cenarios(dados, aleatorio):
+            if args.filtro and args.filtro not in nome:
+                continue
+            requisicoes = max(1, args.requisicoes // peso)
+            resultados[nome] = await medir(cliente, montar, requisicoes, min(args.concorrencia, requisicoes))
+            print(f"  {nome}: p95 {resultados[nome]['p95_ms']:.1f} ms")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--local", action="store_true", help="executa a aplicação no próprio processo")
+    parser.add_argument("--contatos", type=int, default=1000)
+    parser.add_argument("--compromissos", type=int, default=10000)
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições por endpoint")
+    parser.add_argument("--concorrencia", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--filtro", help="mede só os endpoints cujo nome contém o texto")
+    parser.add_argument("--saida", help="grava o relatório em JSON")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(executar(args))
+    relatorio.imprimir(resultados)
+    if args.saida:
+        relatorio.salvar(args.saida, "carga", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
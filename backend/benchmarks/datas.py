@@ -0,0 +1,72 @@
+"""Compara datetime.strptime com app.datas na leitura e ordenação de compromissos.
+
+A partir de backend/:
+
+    python -m benchmarks.datas
+    python -m benchmarks.datas --compromissos 100000
+
+Os compromissos sintéticos se espalham por um ano, com horários em passos de
+15 minutos, como numa agenda real: as mesmas datas e horas se repetem muito.
+"""
+from datetime import date, datetime, timedelta
+import argparse
+import random
+import statistics
+import time
+
+from app import datas
+
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        datas.ler_data.cache_clear()
+        datas.ler_hora.cache_clear()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def _sinteticos(total):
+    aleatorio = random.Random(42)
+    hoje = date.today()
+    compromissos = []
+    for _ in range(total):
+        dia = hoje + timedelta(days=aleatorio.randrange(365))
+        minutos = aleatorio.randrange(7 * 4, 20 * 4) * 15
+        compromissos.append({
+            "data": datas.formatar_data(dia),
+            "hora_inicio": "%02d:%02d" % divmod(minutos, 60),
+        })
+    return compromissos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--compromissos", type=int, default=100000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    compromissos = _sinteticos(args.compromissos)
+    strptime = lambda c: datetime.strptime(f"{c['data']} {c['hora_inicio']}", "%d/%m/%Y %H:%M")
+    ler = lambda c: datas.ler_data_hora(c["data"], c["hora_inicio"])
+    inicios = [ler(c) for c in compromissos]
+    if [strptime(c) for c in compromissos] != inicios:
+        raise SystemExit("app.datas difere de strptime")
+
+    casos = [
+        ("leitura", lambda: [strptime(c) for c in compromissos], lambda: [ler(c) for c in compromissos]),
+        ("ordenação", lambda: sorted(compromissos, key=strptime), lambda: sorted(compromissos, key=ler)),
+        ("formatação", lambda: [d.strftime("%d/%m/%Y %H:%M") for d in inicios],
+         lambda: [datas.formatar_data_hora(d) for d in inicios]),
+    ]
+    print(f"{'operação':<14}{'itens':>8}{'strptime (ms)':>16}{'datas (ms)':>13}{'ganho':>8}")
+    for nome, antes, depois in casos:
+        tempo_antes, tempo_depois = _medir(antes, args.repeticoes), _medir(depois, args.repeticoes)
+        print(f"{nome:<14}{len(compromissos):>8}{tempo_antes * 1000:>16.1f}{tempo_depois * 1000:>13.1f}"
+              f"{tempo_antes / tempo_depois:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Partida a frio do backend: do início do processo às primeiras requisições atendidas.
+
+A partir de backend/, com o banco já migrado (alembic upgrade head):
+
+    python -m benchmarks.inicializacao --repeticoes 5 --saida inicializacao.json
+
+Cada repetição sobe um uvicorn novo em uma porta livre, com o DATABASE_URL e
+o DATABASE_ASYNC do ambiente, e mede a partir do spawn quando /health/live e
+/health/ready respondem pela primeira vez. Depois mede a latência da
+primeira e da segunda GET /api/compromissos/ do worker; a diferença entre
+as duas é o que o aquecimento do lifespan não cobriu. Rode o servidor com
+CACHE_BACKEND=desativado para que a segunda listagem também vá ao banco.
+"""
+from urllib.error import URLError
+from urllib.request import urlopen
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from . import relatorio
+
+DIRETORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as soquete:
+        soquete.bind(("127.0.0.1", 0))
+        return soquete.getsockname()[1]
+
+
+def _status(url: str) -> int:
+    try:
+        with urlopen(url, timeout=5) as resposta:
+            resposta.read()
+            return resposta.status
+    except URLError as e:
+        return getattr(e, "code", 0)
+    except OSError:
+        return 0
+
+
+def _aguardar(url: str, inicio: float, limite: float) -> float:
+    """Segundos desde inicio até url responder 200."""
+    while _status(url) != 200:
+        if time.perf_counter() - inicio > limite:
+            raise TimeoutError(f"{url} não respondeu em {limite:.0f} s")
+        time.sleep(0.005)
+    return time.perf_counter() - inicio
+
+
+def _latencia(url: str) -> float:
+    antes = time.perf_counter()
+    if _status(url) != 200:
+        raise RuntimeError(f"{url} falhou")
+    return time.perf_counter() - antes
+
+
+def executar(repeticoes: int, limite: float) -> dict:
+    tempos = {"health_live": [], "health_ready": [], "primeira_listagem": [], "segunda_listagem": []}
+    for _ in range(repeticoes):
+        porta = _porta_livre()
+        base = f"http://127.0.0.1:{porta}"
+        inicio = time.perf_counter()
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta), "--log-level", "warning"],
+            cwd=DIRETORIO,
+        )
+        try:
+            tempos["health_live"].append(_aguardar(f"{base}/health/live", inicio, limite))
+            tempos["health_ready"].append(_aguardar(f"{base}/health/ready", inicio, limite))
+            tempos["primeira_listagem"].append(_latencia(f"{base}/api/compromissos/"))
+            tempos["segunda_listagem"].append(_latencia(f"{base}/api/compromissos/"))
+        finally:
+            processo.terminate()
+            processo.wait()
+        print(f"  partida em {tempos['health_ready'][-1] * 1000:.0f} ms")
+    return {nome: relatorio.resumir(valores) for nome, valores in tempos.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--limite", type=float, default=60.0, help="segundos de espera pela partida")
+    parser.add_argument("--saida", help="grava o relatório em JSON")
+    args = parser.parse_args()
+
+    resultados = executar(args.repeticoes, args.limite)
+    relatorio.imprimir(resultados)
+    if args.saida:
+        relatorio.salvar(args.saida, "inicializacao", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Percentis, relatórios em JSON e comparação entre execuções dos benchmarks.
+
+Cada suíte grava um JSON com o commit, os parâmetros e, por operação, o total
+de amostras, erros, vazão e os percentis de latência. Dois desses arquivos
+podem ser comparados:
+
+    python -m benchmarks.relatorio base.json novo.json --tolerancia 0.15
+
+A comparação sai com código 1 se o p95 de alguma operação piorar mais que a
+tolerância, o que permite usá-la na CI.
+"""
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+
+def resumir(tempos, duracao=None, erros=0) -> dict:
+    """Resumo de uma operação a partir das latências (segundos) de cada execução."""
+    ordenados = sorted(tempos)
+    if len(ordenados) > 1:
+        cortes = statistics.quantiles(ordenados, n=100, method="inclusive")
+        p50, p95, p99 = cortes[49], cortes[94], cortes[98]
+    else:
+        p50 = p95 = p99 = ordenados[0] if ordenados else 0.0
+    duracao = duracao if duracao is not None else sum(ordenados)
+    return {
+        "amostras": len(ordenados),
+        "erros": erros,
+        "vazao_por_s": len(ordenados) / duracao if duracao else 0.0,
+        "media_ms": statistics.fmean(ordenados) * 1000 if ordenados else 0.0,
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "p99_ms": p99 * 1000,
+        "max_ms": ordenados[-1] * 1000 if ordenados else 0.0,
+    }
+
+
+def imprimir(resultados: dict):
+    largura = max([len(nome) for nome in resultados] + [8])
+    print(f"{'operação':<{largura}}{'amostras':>10}{'erros':>7}{'vazão/s':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+    for nome, r in resultados.items():
+        print(f"{nome:<{largura}}{r['amostras']:>10}{r['erros']:>7}{r['vazao_por_s']:>10.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}")
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def salvar(caminho: str, suite: str, parametros: dict, resultados: dict):
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({
+            "suite": suite,
+            "commit": _commit(),
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "parametros": parametros,
+            "resultados": resultados,
+        }, arquivo, indent=2, ensure_ascii=False)
+    print(f"Relatório gravado em {caminho}")
+
+
+def comparar(base: dict, novo: dict, tolerancia: float) -> list:
+    """Operações em comum com a variação do p95 e do p99; marca as regressões acima da tolerância."""
+    linhas = []
+    for nome, atual in novo["resultados"].items():
+        anterior = base["resultados"].get(nome)
+        if anterior is None:
+            continue
+        variacao = (atual["p95_ms"] - anterior["p95_ms"]) / anterior["p95_ms"] if anterior["p95_ms"] else 0.0
+        linhas.append({
+            "operacao": nome,
+            "p95_base": anterior["p95_ms"],
+            "p95_novo": atual["p95_ms"],
+            "p99_base": anterior["p99_ms"],
+            "p99_novo": atual["p99_ms"],
+            "variacao": variacao,
+            "regressao": variacao > tolerancia or atual["erros"] > anterior["erros"],
+        })
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois relatórios de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("novo")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="piora aceita no p95 (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as arquivo:
+        base = json.load(arquivo)
+    with open(args.novo, encoding="utf-8") as arquivo:
+        novo = json.load(arquivo)
+    if base["suite"] != novo["suite"]:
+        sys.exit(f"Suítes diferentes: {base['suite']} e {novo['suite']}")
+
+    print(f"{base['suite']}: {base['commit']} ({base['data']}) -> {novo['commit']} ({novo['data']})")
+    linhas = comparar(base, novo, args.tolerancia)
+    largura = max([len(linha["operacao"]) for linha in linhas] + [8])
+    print(f"{'operação':<{largura}}{'p95 base':>11}{'p95 novo':>11}{'p99 base':>11}{'p99 novo':>11}{'variação':>10}")
+    for linha in linhas:
+        marca = "  REGRESSÃO" if linha["regressao"] else ""
+        print(f"{linha['operacao']:<{largura}}{linha['p95_base']:>11.2f}{linha['p95_novo']:>11.2f}"
+              f"{linha['p99_base']:>11.2f}{linha['p99_novo']:>11.2f}{linha['variacao']:>+9.0%}{marca}")
+    if any(linha["regressao"] for linha in linhas):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
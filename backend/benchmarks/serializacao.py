@@ -0,0 +1,121 @@
+"""Compara a serialização das listagens pelo response_model com a de app.serializacao.
+
+A partir de backend/:
+
+    python -m benchmarks.serializacao                 # linhas sintéticas, sem banco
+    python -m benchmarks.serializacao --banco         # lê as linhas do DATABASE_URL
+
+"antes" é o caminho padrão do FastAPI: objetos do ORM validados com
+from_attributes e codificados pelo jsonable_encoder + json.dumps. "depois"
+são linhas do Core convertidas em dicionários e serializadas pelos
+TypeAdapters. O script confere que as duas saídas são idênticas byte a byte.
+"""
+from datetime import datetime, timedelta
+from typing import List
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import select
+
+from app import models, schemas, serializacao
+from app.database import SessionLocal
+
+
+def _medir(funcao, repeticoes):
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def _antes(tipo, objetos):
+    campo = create_response_field(name="resposta", type_=List[tipo])
+    conteudo = asyncio.run(serialize_response(field=campo, response_content=objetos))
+    return JSONResponse(conteudo).body
+
+
+def _sinteticos(linhas):
+    agora = datetime.now().replace(microsecond=123456)
+    compromissos, contatos = [], []
+    for i in range(linhas):
+        inicio = agora + timedelta(hours=i)
+        compromissos.append((i, f"Reunião {i}", inicio, inicio + timedelta(minutes=45), "Descrição",
+                             ["Maria", "João"], agora))
+        contatos.append((f"Contato {i}", f"11 9{i:08d}", f"c{i}@exemplo.com", None, i, agora))
+    return compromissos, contatos
+
+
+def _do_banco(linhas):
+    with SessionLocal() as db:
+        compromissos = db.execute(
+            select(*serializacao.COLUNAS_COMPROMISSO)
+            .where(models.Compromisso.recorrencia_id.is_(None))
+            .order_by(models.Compromisso.id).limit(linhas)
+        ).all()
+        contatos = db.execute(select(*serializacao.COLUNAS_CONTATO).order_by(models.Contato.id).limit(linhas)).all()
+    return compromissos, contatos
+
+
+def _objetos_orm(compromissos, contatos):
+    colunas = [coluna.key for coluna in serializacao.COLUNAS_COMPROMISSO]
+    objetos = [models.Compromisso(**dict(zip(colunas, linha)), regra=None) for linha in compromissos]
+    colunas = [coluna.key for coluna in serializacao.COLUNAS_CONTATO]
+    return objetos, [models.Contato(**dict(zip(colunas, linha))) for linha in contatos]
+
+
+def _carga_banco(linhas, repeticoes):
+    """Tempo de leitura: entidades do ORM (com a regra em JOIN) contra colunas do Core."""
+    def orm():
+        with SessionLocal() as db:
+            db.scalars(select(models.Compromisso).where(models.Compromisso.recorrencia_id.is_(None))
+                       .order_by(models.Compromisso.id).limit(linhas)).all()
+
+    def core():
+        with SessionLocal() as db:
+            db.execute(select(*serializacao.COLUNAS_COMPROMISSO).where(models.Compromisso.recorrencia_id.is_(None))
+                       .order_by(models.Compromisso.id).limit(linhas)).all()
+
+    return _medir(orm, repeticoes), _medir(core, repeticoes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=5000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--banco", action="store_true", help="usa linhas do banco em vez de sintéticas")
+    args = parser.parse_args()
+
+    compromissos, contatos = _do_banco(args.linhas) if args.banco else _sinteticos(args.linhas)
+    orm_compromissos, orm_contatos = _objetos_orm(compromissos, contatos)
+
+    casos = [
+        ("compromissos", len(compromissos),
+         lambda: _antes(schemas.Compromisso, orm_compromissos),
+         lambda: serializacao.COMPROMISSOS.dump_json([serializacao.compromisso(*linha) for linha in compromissos])),
+        ("contatos", len(contatos),
+         lambda: _antes(schemas.Contato, orm_contatos),
+         lambda: serializacao.CONTATOS.dump_json([serializacao.contato(linha) for linha in contatos])),
+    ]
+    print(f"{'listagem':<14}{'linhas':>8}{'antes (ms)':>13}{'depois (ms)':>13}{'ganho':>8}")
+    for nome, total, antes, depois in casos:
+        if antes() != depois():
+            raise SystemExit(f"{nome}: a saída otimizada difere da do response_model")
+        tempo_antes, tempo_depois = _medir(antes, args.repeticoes), _medir(depois, args.repeticoes)
+        print(f"{nome:<14}{total:>8}{tempo_antes * 1000:>13.1f}{tempo_depois * 1000:>13.1f}"
+              f"{tempo_antes / tempo_depois:>7.1f}x")
+
+    if args.banco:
+        orm, core = _carga_banco(args.linhas, args.repeticoes)
+        print(f"{'leitura':<14}{len(compromissos):>8}{orm * 1000:>13.1f}{core * 1000:>13.1f}{orm / core:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -53,6 +53,7 @@ const diasSemana = [
 
 function Compromissos() {
   const [compromissos, setCompromissos] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [openDialog, setOpenDialog] = useState(false);
   const [editingCompromisso, setEditingCompromisso] = useState(null);
   const [snackbar, setSnackbar] = useState({ open: false, message: '' });
@@ -75,12 +76,18 @@ function Compromissos() {
     fetchCompromissos();
   }, [filtroPeriodo]);
 
-  const fetchCompromissos = async () => {
+  const fetchCompromissos = async (cursor = null) => {
     try {
       const response = await axios.get(`${API_URL}/compromissos/`, {
-        params: { periodo: filtroPeriodo === 'todos' ? null : filtroPeriodo },
+        params: {
+          periodo: filtroPeriodo === 'todos' ? null : filtroPeriodo,
+          cursor,
+        },
       });
-      setCompromissos(response.data);
+      setCompromissos((prev) =>
+        cursor ? [...prev, ...response.data.itens] : response.data.itens
+      );
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Erro ao buscar compromissos:', error);
       setSnackbar({
@@ -163,7 +170,8 @@ function Compromissos() {
       if (editingCompromisso) {
         await axios.put(
           `${API_URL}/compromissos/${editingCompromisso.id}`,
-          compromissoData
+          compromissoData,
+          { params: { ocorrencia: editingCompromisso.data } }
         );
         setSnackbar({
           open: true,
@@ -187,7 +195,7 @@ function Compromissos() {
     }
   };
 
-  const handleDelete = async (id, recorrencia) => {
+  const handleDelete = async (id, recorrencia, ocorrencia) => {
     let excluirSerie = false;
     if (recorrencia) {
       excluirSerie = window.confirm(
@@ -197,7 +205,7 @@ function Compromissos() {
 
     try {
       await axios.delete(`${API_URL}/compromissos/${id}`, {
-        params: { excluir_serie: excluirSerie },
+        params: { excluir_serie: excluirSerie, ocorrencia },
       });
       setSnackbar({
         open: true,
@@ -257,7 +265,7 @@ function Compromissos() {
           </TableHead>
           <TableBody>
             {compromissos.map((compromisso) => (
-              <TableRow key={compromisso.id}>
+              <TableRow key={`${compromisso.id}-${compromisso.data}`}>
                 <TableCell>{compromisso.titulo}</TableCell>
                 <TableCell>{compromisso.data}</TableCell>
                 <TableCell>
@@ -288,7 +296,9 @@ function Compromissos() {
                   </IconButton>
                   <IconButton
                     color="error"
-                    onClick={() => handleDelete(compromisso.id, compromisso.recorrencia)}
+                    onClick={() =>
+                      handleDelete(compromisso.id, compromisso.recorrencia, compromisso.data)
+                    }
                   >
                     <DeleteIcon />
                   </IconButton>
@@ -299,6 +309,12 @@ function Compromissos() {
         </Table>
       </TableContainer>
 
+      {nextCursor && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+          <Button onClick={() => fetchCompromissos(nextCursor)}>Carregar mais</Button>
+        </Box>
+      )}
+
       <Dialog open={openDialog} onClose={handleCloseDialog} maxWidth="md" fullWidth>
         <DialogTitle>
           {editingCompromisso ? 'Editar Compromisso' : 'Novo Compromisso'}
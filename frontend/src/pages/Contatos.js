@@ -17,6 +17,7 @@ import {
   TextField,
   IconButton,
   Snackbar,
+  Box,
 } from '@mui/material';
 import {
   Add as AddIcon,
@@ -30,6 +31,7 @@ const API_URL = API_CONFIG.baseURL;
 
 function Contatos() {
   const [contatos, setContatos] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [openDialog, setOpenDialog] = useState(false);
   const [editingContato, setEditingContato] = useState(null);
   const [formData, setFormData] = useState({
@@ -44,10 +46,15 @@ function Contatos() {
     fetchContatos();
   }, []);
 
-  const fetchContatos = async () => {
+  const fetchContatos = async (cursor = null) => {
     try {
-      const response = await axios.get(`${API_URL}/contatos/`);
-      setContatos(response.data);
+      const response = await axios.get(`${API_URL}/contatos/`, {
+        params: { cursor },
+      });
+      setContatos((prev) =>
+        cursor ? [...prev, ...response.data.itens] : response.data.itens
+      );
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Erro ao buscar contatos:', error);
       setSnackbar({
@@ -187,6 +194,12 @@ function Contatos() {
         </Table>
       </TableContainer>
 
+      {nextCursor && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+          <Button onClick={() => fetchContatos(nextCursor)}>Carregar mais</Button>
+        </Box>
+      )}
+
       <Dialog open={openDialog} onClose={handleCloseDialog}>
         <DialogTitle>
           {editingContato ? 'Editar Contato' : 'Novo Contato'}
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# agenda.py importa backend.app.*; a API é importada como `app`, a partir de backend/
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, "backend")]
@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import agenda
+from conftest import RAIZ
+
+
+@pytest.fixture
+def nova_agenda(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    a = agenda.Agenda(agenda.ArmazenamentoJSON())
+    yield a
+    a.fechar()
+
+
+def test_recusa_serie_que_termina_antes_de_comecar(nova_agenda):
+    resultado = nova_agenda.adicionar_compromisso(
+        "Reunião", "10/12/2099", "08:00", recorrencia={"tipo": "diaria", "ate_data": "09/12/2099"})
+    assert resultado == "A data final da recorrência é anterior à data do compromisso."
+    assert list(nova_agenda.armazenamento.compromissos) == []
+
+
+def test_jornal_com_acentos_em_locale_nao_utf8(tmp_path):
+    # Locale C sem coerção para UTF-8: open() sem encoding usaria ASCII
+    ambiente = {**os.environ, "LC_ALL": "C", "LANG": "C", "PYTHONUTF8": "0", "PYTHONCOERCECLOCALE": "0",
+                "PYTHONPATH": RAIZ}
+    gravar = (
+        "import agenda\n"
+        "a = agenda.Agenda(agenda.ArmazenamentoJSON())\n"
+        "a.adicionar_contato('João', '123')\n"
+        "a.adicionar_compromisso('Reunião', '10/12/2099', '08:00', descricao='ação')\n"
+        "a.adicionar_contato('Zé', '456')\n"
+        "a.fechar()\n"
+    )
+    ler = (
+        "import agenda\n"
+        "a = agenda.Agenda(agenda.ArmazenamentoJSON())\n"
+        "print(ascii([c.nome for c in a.armazenamento.contatos]))\n"
+        "print(ascii([(c.titulo, c.descricao) for c in a.armazenamento.compromissos]))\n"
+    )
+    for nome, codigo in (("gravar.py", gravar), ("ler.py", ler)):
+        # Em arquivo: o código-fonte é lido como UTF-8 independentemente do locale
+        (tmp_path / nome).write_text(codigo, encoding="utf-8")
+        resultado = subprocess.run([sys.executable, nome], cwd=tmp_path, env=ambiente,
+                                   capture_output=True, text=True, check=True)
+    assert resultado.stdout.splitlines() == [ascii(["João", "Zé"]), ascii([("Reunião", "ação")])]
+    assert "João".encode("utf-8") in (tmp_path / "agenda.jornal").read_bytes()
+
+
+def test_jornal_descarta_so_a_ultima_linha_incompleta(tmp_path, monkeypatch):
+    monkeypatch.setattr(agenda.locale, "getpreferredencoding", lambda _=True: "cp1252")
+    caminho = tmp_path / "agenda.jornal"
+    entrada = lambda nome: json.dumps({"colecao": "contatos", "acao": "gravar",
+                                       "registro": {"id": 1, "nome": nome, "telefone": "1"}})
+    caminho.write_bytes(
+        entrada("Ana").encode() + b"\n"
+        + b"{ilegivel\n"
+        + entrada("João").encode("cp1252") + b"\n"  # gravado por versões antigas na codificação do sistema
+        + entrada("Zé").encode() + b"\n"
+        + b'{"colecao": "cont'
+    )
+    jornal = agenda.Jornal(str(caminho))
+    assert [e["registro"]["nome"] for e in jornal.ler()] == ["Ana", "João", "Zé"]
+    assert caminho.read_bytes().endswith(entrada("Zé").encode() + b"\n")
@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.main import app
+
+
+class SemBanco:
+    # As validações devem recusar a requisição antes de qualquer acesso ao banco
+    def __getattr__(self, nome):
+        raise AssertionError(f"acesso inesperado ao banco: {nome}")
+
+
+@pytest.fixture
+def cliente():
+    async def sem_banco():
+        yield SemBanco()
+
+    app.dependency_overrides[get_db] = sem_banco
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+SERIE_SEM_OCORRENCIAS = {
+    "titulo": "Reunião",
+    "data": "10/12/2099",
+    "hora_inicio": "08:00",
+    "recorrencia": {"tipo": "semanal", "ate_data": "09/12/2099"},
+}
+
+
+def test_criar_recusa_serie_que_termina_antes_de_comecar(cliente):
+    resposta = cliente.post("/api/compromissos/", json=SERIE_SEM_OCORRENCIAS)
+    assert resposta.status_code == 400
+    assert resposta.json() == {"detail": "A data final da recorrência é anterior à data do compromisso"}
+
+
+def test_conflitos_recusa_serie_que_termina_antes_de_comecar(cliente):
+    resposta = cliente.post("/api/compromissos/conflitos", json=SERIE_SEM_OCORRENCIAS)
+    assert resposta.status_code == 400
@@ -0,0 +1,22 @@
+import json
+
+from app.importacao import ler_jornal
+
+
+def test_ler_jornal_informa_entradas_malformadas_e_continua(tmp_path):
+    (tmp_path / "contatos.json").write_text("[]")
+    linhas = [
+        {"colecao": "contatos", "acao": "gravar", "registro": {"id": 1, "nome": "Ana", "telefone": "1"}},
+        {"colecao": "contatos", "acao": "gravar"},
+        {"acao": "excluir", "id": 2},
+        ["não", "é", "objeto"],
+        {"colecao": "compromissos", "acao": "excluir", "id": 9},
+        {"colecao": "contatos", "acao": "excluir", "id": 3},
+    ]
+    conteudo = "".join(json.dumps(linha) + "\n" for linha in linhas) + "{ilegivel\n"
+    (tmp_path / "agenda.jornal").write_text(conteudo, encoding="utf-8")
+
+    erros = []
+    alterados = ler_jornal(str(tmp_path / "contatos.json"), "contatos", lambda linha, mensagem: erros.append(linha))
+    assert alterados == {1: linhas[0]["registro"], 3: None}
+    assert erros == [2, 3, 4, 7]
@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app import metricas
+
+
+def test_comando_que_falha_nao_afeta_a_medicao_do_seguinte(monkeypatch):
+    engine = create_engine("sqlite://")
+    metricas.instrumentar_consultas(engine)
+    requisicao = metricas._SEM_REQUISICAO
+    with engine.connect() as conexao:
+        relogio = iter([0.0, 10.0, 11.5])
+        monkeypatch.setattr(metricas.time, "perf_counter", lambda: next(relogio))
+        consultas, tempo_db = requisicao.consultas, requisicao.tempo_db
+        with pytest.raises(OperationalError):
+            conexao.execute(text("SELECT * FROM tabela_inexistente"))
+        conexao.execute(text("SELECT 1"))
+    assert requisicao.consultas == consultas + 1
+    assert requisicao.tempo_db - tempo_db == pytest.approx(1.5)